@@ -4,9 +4,11 @@ from core.models.comments import Comment
 from core.models.interests import Interest
 from core.models.users import User
 from core.models.user_details import UserDetails
+from core.models.skills import Skill
 # Register your models here.
 admin.site.register(Post)
 admin.site.register(Comment)
 admin.site.register(Interest)   
 admin.site.register(User)
 admin.site.register(UserDetails)
+admin.site.register(Skill)
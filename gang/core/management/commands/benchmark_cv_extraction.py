@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from core.models.user_details import UserDetails
+from core.utils.cv_extractor import SUPPORTED_EXTENSIONS, extract_cv_text
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks CV text extraction over a corpus of sample CVs (files or directories, '
+        'or the uploaded CVs when none are given) and reports MB/s and peak RSS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='CV files or directories searched for PDF, DOC and DOCX files.')
+        parser.add_argument('--limit', type=int, default=200,
+                            help='Uploaded CVs to read when no paths are given (default: 200).')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Times the corpus is extracted (default: 1).')
+        parser.add_argument('--max-pages', type=int, default=None,
+                            help='PDF pages read per CV (default CV_EXTRACTION_MAX_PAGES).')
+        parser.add_argument('--max-chars', type=int, default=None,
+                            help='Characters kept per CV (default CV_EXTRACTION_MAX_CHARS).')
+        parser.add_argument('--time-limit', type=float, default=None,
+                            help='Seconds spent per CV (default CV_EXTRACTION_TIME_LIMIT).')
+
+    def corpus(self, paths, limit):
+        """(label, opener) pairs; opener returns a named, readable file."""
+        if not paths:
+            names = (
+                UserDetails.objects.exclude(cv_file__isnull=True).exclude(cv_file='')
+                .order_by('pk').values_list('cv_file', flat=True)[:limit]
+            )
+            return [
+                (name, lambda name=name: default_storage.open(name, 'rb'))
+                for name in names if name.lower().endswith(SUPPORTED_EXTENSIONS)
+            ]
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, filenames in os.walk(path):
+                    files.extend(
+                        os.path.join(root, filename) for filename in sorted(filenames)
+                        if filename.lower().endswith(SUPPORTED_EXTENSIONS)
+                    )
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f'{path} does not exist.')
+        return [(path, lambda path=path: File(open(path, 'rb'), name=path)) for path in files]
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+        corpus = self.corpus(options['paths'], options['limit'])
+        if not corpus:
+            raise CommandError('No CVs to benchmark.')
+        limits = {
+            'max_pages': options['max_pages'], 'max_chars': options['max_chars'],
+            'time_limit': options['time_limit'],
+        }
+
+        rss_before = peak_rss_mb()
+        read_bytes = chars = 0
+        elapsed = 0.0
+        slowest = (0.0, None)
+        for _ in range(options['repeat']):
+            for label, open_file in corpus:
+                with open_file() as f:
+                    size = f.size
+                    started = time.perf_counter()
+                    text = extract_cv_text(f, **limits)
+                    seconds = time.perf_counter() - started
+                elapsed += seconds
+                read_bytes += size
+                chars += len(text)
+                slowest = max(slowest, (seconds, label), key=lambda item: item[0])
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{label}: {size / 1024:.0f}KB, {len(text)} chars in {seconds * 1000:.1f}ms')
+
+        files = len(corpus) * options['repeat']
+        megabytes = read_bytes / (1024 * 1024)
+        self.stdout.write(
+            f'{files} CVs, {megabytes:.2f}MB, {chars} chars in {elapsed:.2f}s; '
+            f'slowest {slowest[1]} ({slowest[0] * 1000:.0f}ms).'
+        )
+        rss = peak_rss_mb()
+        memory = f'peak RSS {rss:.1f}MB ({rss_before:.1f}MB before extracting)' if rss is not None else 'peak RSS unavailable'
+        self.stdout.write(self.style.SUCCESS(
+            f'{megabytes / elapsed if elapsed else 0:.2f} MB/s, {files / elapsed if elapsed else 0:.1f} files/sec, {memory}.'
+        ))
@@ -0,0 +1,150 @@
+import re
+import json
+import random
+import logging
+import statistics
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models.user_details import UserDetails
+from core.models.users import User
+from core.serializers.profiles import UserDetailsSerializer
+from core.views.profiles import CVSearchView
+
+logger = logging.getLogger('core.views.profiles')
+
+WORDS = (
+    'python django flask react kotlin java rust golang sql postgres docker kubernetes aws '
+    'manager engineer developer designer analyst marketing sales finance nurse teacher '
+    'team lead senior junior project product agile scrum data machine learning research'
+).split()
+
+
+class LegacyUserDetailsSerializer(UserDetailsSerializer):
+    """UserDetailsSerializer as CV search used it, logging twice per row."""
+
+    def get_cv_url(self, obj):
+        url = super().get_cv_url(obj)
+        logger.info(f"Generated CV URL for user {obj.user.id}: {url}")
+        return url
+
+    def get_cv_original_filename(self, obj):
+        filename = super().get_cv_original_filename(obj)
+        logger.info(f"Original CV filename for user {obj.user.id}: {filename}")
+        return filename
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.records = 0
+
+    def emit(self, record):
+        # Formatting is part of what logging costs
+        self.format(record)
+        self.records += 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares CV search through CVSearchView (one ranked page, lean results) with the previous '
+        'path (LIKE OR-chain, every match through UserDetailsSerializer with per-row logging). '
+        'Synthetic profiles are created in a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', default=['python', 'senior python developer', 'nurse OR teacher'],
+                            help='Search queries to time.')
+        parser.add_argument('--profiles', type=int, default=2000,
+                            help='Synthetic profiles with a CV to search (default: 2000; 0 uses the existing ones).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query and path; the median is reported (default: 5).')
+        parser.add_argument('--page-size', type=int, default=20,
+                            help='Results per page for CVSearchView (default: 20).')
+
+    def create_profiles(self, count):
+        rng = random.Random(0)
+        users = User.objects.bulk_create([
+            User(username=f'cv_bench_{i}', email=f'cv_bench_{i}@example.com') for i in range(count)
+        ])
+        UserDetails.objects.bulk_create([
+            UserDetails(
+                user=user, full_name=f'Candidate {i}', location='Remote',
+                cv_file=f'user_{user.pk}/cv_{i}.pdf', cv_original_filename=f'cv_{i}.pdf',
+                cv_text=' '.join(rng.choice(WORDS) for _ in range(400)),
+            )
+            for i, user in enumerate(users)
+        ])
+
+    def legacy(self, request, query):
+        terms = re.findall(r'\w+', query.lower())
+        condition = Q()
+        for term in terms:
+            condition |= Q(cv_text__icontains=term) | Q(full_name__icontains=term) | Q(bio__icontains=term)
+        queryset = UserDetails.objects.filter(condition, cv_file__isnull=False).select_related('user')
+        total_cvs = UserDetails.objects.filter(cv_file__isnull=False).count()
+        logger.info(
+            f"CV search details: query {query}, {total_cvs} CVs, {queryset.count()} matching, first "
+            f"{[{'username': profile.user.username, 'has_cv': bool(profile.cv_file)} for profile in queryset[:3]]}"
+        )
+        return JSONRenderer().render(LegacyUserDetailsSerializer(queryset, many=True, context={'request': request}).data)
+
+    def current(self, request, query):
+        response = CVSearchView.as_view()(request)
+        return response.render().content
+
+    def measure(self, run, request, query, repeat, handler):
+        timings = []
+        for _ in range(repeat):
+            handler.records = 0
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                body = run(request, query)
+                timings.append(time.perf_counter() - started)
+        data = json.loads(body)
+        rows = len(data if isinstance(data, list) else data['results'])
+        return statistics.median(timings) * 1000, len(queries), handler.records, len(body), rows
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['profiles'] < 0:
+            raise CommandError('--repeat must be at least 1 and --profiles at least 0.')
+        handler = CountingHandler()
+        core_logger = logging.getLogger('core')
+        saved = core_logger.level, core_logger.propagate
+        core_logger.addHandler(handler)
+        # Count INFO records as a production INFO config would emit them, without printing them
+        core_logger.setLevel(logging.INFO)
+        core_logger.propagate = False
+        try:
+            with transaction.atomic():
+                self.run(options, handler)
+                transaction.set_rollback(True)
+        finally:
+            core_logger.removeHandler(handler)
+            core_logger.level, core_logger.propagate = saved
+
+    def run(self, options, handler):
+        if options['profiles']:
+            self.stdout.write(f'Creating {options["profiles"]} synthetic profiles...')
+            self.create_profiles(options['profiles'])
+        company = User(username='cv_bench_company', email='cv_bench_company@example.com', user_type='Company')
+        company.save()
+        # URLs are built for a host the site accepts
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        factory = APIRequestFactory(HTTP_HOST=hosts[0] if hosts else 'localhost')
+
+        for query in options['queries']:
+            request = factory.get('/api/cv-search/', {'q': query, 'page_size': options['page_size']})
+            force_authenticate(request, user=company)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{query!r}'))
+            for label, run in (('previous', self.legacy), ('current', self.current)):
+                ms, queries, records, size, rows = self.measure(run, request, query, options['repeat'], handler)
+                self.stdout.write(
+                    f'  {label:<9} {ms:9.1f}ms  {queries:3d} queries  {records:6d} log records  '
+                    f'{size / 1024:8.1f}KB  {rows} results'
+                )
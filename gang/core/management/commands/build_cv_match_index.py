@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.utils import cv_match
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the TF-IDF matrix of CV texts used by /cv-match/ and switches every worker to it. '
+        'Run it regularly (from cron) to fold in changed CVs and recompute term weights.'
+    )
+
+    def handle(self, *args, **options):
+        if not cv_match.MATCH_SUPPORT:
+            raise CommandError('NumPy and SciPy are required to build the CV match index.')
+        started = time.monotonic()
+        index = cv_match.build_from_database()
+        built = time.monotonic() - started
+        directory = cv_match.write_build(index)
+        matrix = index.matrix
+        size = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        rate = len(index.ids) / built if built else len(index.ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index.ids)} CVs ({len(index.vocabulary)} terms, {matrix.nnz} entries, '
+            f'{size / 1024 / 1024:.1f}MB) in {built:.2f}s ({rate:.0f} CVs/sec) into {directory}.'
+        ))
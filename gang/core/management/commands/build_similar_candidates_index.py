@@ -0,0 +1,107 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.models.user_details import UserDetails
+from core.utils import similar_candidates
+
+if similar_candidates.SIMILAR_SUPPORT:
+    import numpy as np
+
+
+def _init_worker():
+    django.setup()
+
+
+def _vectorize(rows):
+    return similar_candidates.vectorize_rows(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the nearest-neighbour index of profile vectors (CV text, skills, interests) used by '
+        '/users/<username>/similar/, vectorizing CVs in parallel, and switches every worker to it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes computing vectors (default: one per CPU).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Profiles read and vectorized per batch (default: 500).')
+        parser.add_argument('--lists', type=int,
+                            help='Inverted lists (default: SIMILAR_CANDIDATES_LISTS, else the square root '
+                                 'of the number of profiles).')
+        parser.add_argument('--evaluate', type=int, default=0, metavar='N',
+                            help='Afterwards, compare N sample queries with an exact search: recall and '
+                                 'latency for several probe counts.')
+
+    def handle(self, *args, **options):
+        if not similar_candidates.SIMILAR_SUPPORT:
+            raise CommandError('NumPy is required to build the similar candidates index.')
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+        if options['lists'] is not None and options['lists'] < 1:
+            raise CommandError('--lists must be at least 1.')
+
+        rows = UserDetails.objects.filter(cv_file__isnull=False).exclude(cv_file='')
+        total = rows.count()
+        self.stdout.write(f'{total} profiles to vectorize with {options["workers"]} workers...')
+        started = time.monotonic()
+        ids, vectors = [], []
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            # A few batches per worker in flight, so the CV texts held in memory stay bounded
+            pending = deque()
+            while True:
+                batch = list(
+                    rows.filter(pk__gt=last_id).order_by('pk')
+                    .values_list('pk', 'user_id', 'cv_text')[:options['batch_size']]
+                )
+                if batch:
+                    batch_rows = similar_candidates.profile_rows(batch)
+                    # Workers forked for this batch must not share the parent's database connections
+                    connections.close_all()
+                    pending.append(executor.submit(_vectorize, batch_rows))
+                    last_id = batch[-1][0]
+                if pending and (not batch or len(pending) >= 2 * options['workers']):
+                    batch_ids, batch_vectors = pending.popleft().result()
+                    ids.append(batch_ids)
+                    vectors.append(batch_vectors)
+                    self.stdout.write(f'Vectorized {sum(len(i) for i in ids)} profiles...')
+                if not batch and not pending:
+                    break
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        vectors = np.vstack(vectors) if vectors else np.empty((0, similar_candidates.DIMENSIONS), dtype=np.float32)
+        vectorized = time.monotonic() - started
+
+        index = similar_candidates.IVFIndex.build(ids, vectors, options['lists'])
+        directory = similar_candidates.write_index(index)
+        elapsed = time.monotonic() - started
+        rate = len(ids) / vectorized if vectorized else len(ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(ids)} profiles in {index.lists} lists in {elapsed:.2f}s '
+            f'({rate:.0f} profiles/sec vectorized) into {directory}.'
+        ))
+        if options['evaluate'] and len(ids):
+            self.evaluate(index, ids, vectors, options['evaluate'])
+
+    def evaluate(self, index, ids, vectors, count, k=10):
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), min(count, len(vectors)), replace=False)]
+        started = time.perf_counter()
+        exact = [set(ids[np.argsort(-(vectors @ query))[:k]].tolist()) for query in queries]
+        exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        self.stdout.write(f'  exact search   {exact_ms:7.2f}ms per query')
+        probes = 1
+        while True:
+            started = time.perf_counter()
+            found = [{pk for pk, _ in index.search(query, k, probes)} for query in queries]
+            ms = (time.perf_counter() - started) * 1000 / len(queries)
+            recall = sum(len(a & b) for a, b in zip(exact, found)) / sum(len(a) for a in exact)
+            self.stdout.write(f'  probes {probes:<7d} {ms:7.2f}ms per query  recall@{k} {recall:.3f}')
+            if probes >= index.lists:
+                break
+            probes = min(probes * 2, index.lists)
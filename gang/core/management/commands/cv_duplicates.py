@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from core.models.cv_signature_bands import CVSignatureBand
+from core.models.user_details import UserDetails
+from core.utils.cv_duplicates import DUPLICATES_SUPPORT, similarity, update_duplicates
+
+
+class Command(BaseCommand):
+    help = (
+        'Lists clusters of near-duplicate CVs, largest first. With --rebuild, every CV is signed '
+        'and clustered again first, one batch after the other, as at extraction time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute the signatures and clusters of all CVs.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='CVs signed per transaction with --rebuild (default: 500).')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Clusters listed (default: 20).')
+        parser.add_argument('--members', type=int, default=10,
+                            help='Profiles listed per cluster (default: 10).')
+
+    def handle(self, *args, **options):
+        if not DUPLICATES_SUPPORT:
+            raise CommandError('NumPy is required to detect near-duplicate CVs.')
+        if min(options['batch_size'], options['limit'], options['members']) < 1:
+            raise CommandError('--batch-size, --limit and --members must be at least 1.')
+        if options['rebuild']:
+            self.rebuild(options['batch_size'])
+
+        clusters = (
+            UserDetails.objects.filter(cv_cluster_id__isnull=False).values('cv_cluster_id')
+            .annotate(size=Count('id')).filter(size__gt=1).order_by('-size', 'cv_cluster_id')
+        )
+        total = clusters.count()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{total} clusters of near-duplicate CVs'))
+        for cluster in clusters[:options['limit']]:
+            members = list(
+                UserDetails.objects.filter(cv_cluster_id=cluster['cv_cluster_id']).order_by('pk')
+                .values_list('pk', 'user__username', 'cv_original_filename', 'cv_minhash')[:options['members']]
+            )
+            first = bytes(members[0][3]) if members[0][3] is not None else None
+            self.stdout.write(f"Cluster {cluster['cv_cluster_id']}: {cluster['size']} CVs")
+            for pk, username, filename, minhash in members:
+                estimate = similarity(first, bytes(minhash)) if first and minhash is not None else 0
+                self.stdout.write(f'  {pk:>8}  {username:<30} {estimate:5.2f}  {filename or ""}')
+            if cluster['size'] > len(members):
+                self.stdout.write(f"  ... and {cluster['size'] - len(members)} more")
+
+    def rebuild(self, batch_size):
+        rows = UserDetails.objects.filter(cv_file__isnull=False).exclude(cv_file='')
+        total = rows.count()
+        self.stdout.write(f'Signing {total} CVs...')
+        started = time.monotonic()
+        # Clusters are formed again from scratch
+        CVSignatureBand.objects.all().delete()
+        UserDetails.objects.filter(cv_cluster_id__isnull=False).update(cv_cluster_id=None, cv_minhash=None)
+        signed = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'cv_text')[:batch_size])
+            if not batch:
+                break
+            update_duplicates(dict(batch))
+            signed += len(batch)
+            last_id = batch[-1][0]
+            self.stdout.write(f'Signed {signed}/{total} CVs...')
+        elapsed = time.monotonic() - started
+        rate = signed / elapsed if elapsed else signed
+        self.stdout.write(self.style.SUCCESS(f'Signed {signed} CVs in {elapsed:.2f}s ({rate:.0f} CVs/sec).'))
@@ -0,0 +1,102 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.cv_jobs import (
+    claim_next, complete, extracted_text, fail, queue_counts, release_stale, start_child
+)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued CV text extraction jobs, each in its own process, with retries and a time limit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Jobs run at the same time (default CV_EXTRACTION_WORKERS).')
+        parser.add_argument('--timeout', type=float, default=None,
+                            help='Seconds before a job is killed and retried (default CV_EXTRACTION_TIMEOUT).')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Seconds between queue checks while idle.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due instead of waiting for more.')
+        parser.add_argument('--status', action='store_true',
+                            help='Print the number of jobs per status and exit.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            counts = queue_counts()
+            self.stdout.write(', '.join(f'{status}: {count}' for status, count in counts.items()))
+            return
+
+        workers = options['workers'] or getattr(settings, 'CV_EXTRACTION_WORKERS', 2)
+        timeout = options['timeout'] or getattr(settings, 'CV_EXTRACTION_TIMEOUT', 60)
+        if workers <= 0 or timeout <= 0:
+            raise CommandError('--workers and --timeout must be > 0.')
+
+        self.stdout.write(f'CV extraction worker started with {workers} processes and a {timeout:g}s time limit.')
+        running = {}
+        done = failed = 0
+        started = time.monotonic()
+        try:
+            while True:
+                released = release_stale(timeout)
+                if released:
+                    self.stdout.write(self.style.WARNING(f'Re-queued {released} jobs left running by a stopped worker.'))
+                while len(running) < workers:
+                    job = claim_next()
+                    if job is None:
+                        break
+                    text = extracted_text(job)
+                    if text is not None:
+                        complete(job, text)
+                        done += 1
+                        self.stdout.write(self.style.SUCCESS(
+                            f'Job {job.pk}: reused {len(text)} chars extracted from the same file.'
+                        ))
+                        continue
+                    process, conn = start_child(job)
+                    running[job.pk] = (job, process, conn, time.monotonic() + timeout)
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                for job_id, (job, process, conn, deadline) in list(running.items()):
+                    # Checked before polling: a child that sent its result and exited in between is
+                    # then seen with its result, not as a crash
+                    alive = process.is_alive()
+                    if conn.poll():
+                        try:
+                            outcome, result = conn.recv()
+                        except EOFError:
+                            outcome, result = 'error', f'Extraction process exited with code {process.exitcode}'
+                    elif not alive:
+                        outcome, result = 'error', f'Extraction process exited with code {process.exitcode}'
+                    elif time.monotonic() > deadline:
+                        process.terminate()
+                        outcome, result = 'error', f'Timed out after {timeout:g}s'
+                    else:
+                        continue
+                    process.join()
+                    conn.close()
+                    del running[job_id]
+                    if outcome == 'ok':
+                        complete(job, result)
+                        done += 1
+                        self.stdout.write(self.style.SUCCESS(f'Job {job.pk}: extracted {len(result)} chars.'))
+                    else:
+                        fail(job, result)
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'Job {job.pk}: {result}'))
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            for job, process, conn, deadline in running.values():
+                process.terminate()
+                process.join()
+                fail(job, 'Worker stopped while running the job')
+        elapsed = time.monotonic() - started
+        counts = queue_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {done + failed} jobs ({done} done, {failed} failed attempts) in {elapsed:.2f}s; '
+            f"queue now has {counts['pending']} pending, {counts['failed']} failed."
+        ))
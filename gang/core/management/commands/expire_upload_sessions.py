@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked upload sessions that have been idle too long, with their staged data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Idle time in hours (default UPLOAD_SESSION_EXPIRY_HOURS).')
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        if hours is None:
+            hours = getattr(settings, 'UPLOAD_SESSION_EXPIRY_HOURS', 24)
+        if hours < 0:
+            raise CommandError('--hours must be >= 0.')
+        expired = expire_sessions(hours)
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} upload sessions idle for over {hours:g} hours.'))
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.models.user_details import UserDetails
+from core.utils.skill_extractor import build_matcher, save_user_skills
+
+
+class Command(BaseCommand):
+    help = (
+        'Finds the skills (names and aliases in the Skill table) mentioned in every extracted CV text '
+        'and stores them as UserSkill rows. Run it after changing the skills.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Profiles scanned and written per batch (default: 500).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        # Built afresh: skills updated in bulk do not change the version get_matcher() checks
+        matcher = build_matcher()
+        rows = UserDetails.objects.exclude(cv_text__isnull=True).exclude(cv_text='')
+        total = rows.count()
+        self.stdout.write(f'{total} CV texts to scan for {len(matcher.skill_ids)} skill names...')
+
+        started = time.monotonic()
+        scanned = found = 0
+        last_id = 0
+        while True:
+            batch = list(
+                rows.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'user_id', 'cv_text')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            skills = {user_id: matcher.find(text) for pk, user_id, text in batch}
+            save_user_skills(skills)
+            scanned += len(batch)
+            found += sum(len(counts) for counts in skills.values())
+            last_id = batch[-1][0]
+            self.stdout.write(f'Scanned {scanned}/{total} CV texts...')
+        elapsed = time.monotonic() - started
+        rate = scanned / elapsed if elapsed else scanned
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {found} skills in {scanned} CV texts in {elapsed:.2f}s ({rate:.1f} CVs/sec).'
+        ))
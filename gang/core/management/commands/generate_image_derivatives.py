@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.utils.image_derivatives import IMAGE_FIELDS, render, save_variants, store_derivatives
+
+
+def _init_worker():
+    # Worker processes only render images to bytes; the parent stores the files (whose
+    # MediaBlob references are database writes) and records them, so SQLite has one writer
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Renders missing or outdated image derivatives for existing uploads, in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes rendering images (default: one per CPU).')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render derivatives that are already up to date.')
+
+    def pending_jobs(self, force):
+        for label, field_name in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+            for pk, source, variants in rows.values_list('pk', field_name, f'{field_name}_variants').iterator():
+                if force or (variants or {}).get('source') != source:
+                    yield label, pk, field_name, source
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        jobs = list(self.pending_jobs(options['force']))
+        self.stdout.write(f'{len(jobs)} images to process with {options["workers"]} workers...')
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        started = time.monotonic()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(render, label, field_name, source): (label, pk, field_name, source)
+                for label, pk, field_name, source in jobs
+            }
+            for future in as_completed(futures):
+                label, pk, field_name, source = futures[future]
+                try:
+                    images = future.result()
+                    if images is not None:
+                        variants = store_derivatives(label, field_name, source, images)
+                        save_variants(apps.get_model(label), pk, field_name, variants)
+                except Exception as e:
+                    # Anything but an unreadable image (a Pillow bug, a crashed worker) skips this image only
+                    images = None
+                    self.stdout.write(self.style.ERROR(f'{label} {pk}.{field_name}: {type(e).__name__}: {str(e)}'))
+                if images is None:
+                    failed += 1
+                else:
+                    done += 1
+                if (done + failed) % 100 == 0:
+                    self.stdout.write(f'Processed {done + failed}/{len(jobs)} images...')
+        elapsed = time.monotonic() - started
+        rate = (done + failed) / elapsed if elapsed else done + failed
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered derivatives for {done} images ({failed} failed or unreadable) in {elapsed:.2f}s '
+            f'({rate:.1f} images/sec).'
+        ))
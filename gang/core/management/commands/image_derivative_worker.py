@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.utils.image_derivatives import (
+    claim_next, complete, fail, heartbeat, is_current, queue_counts, release_stale, render, store_derivatives
+)
+
+
+def _init_worker():
+    # Worker processes only render images to bytes; the parent stores the files (whose
+    # MediaBlob references are database writes) and records them, so SQLite has one writer
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Renders queued image derivatives in worker processes, with retries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Images rendered at the same time (default IMAGE_DERIVATIVE_WORKERS).')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Seconds between queue checks while idle.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due instead of waiting for more.')
+        parser.add_argument('--status', action='store_true',
+                            help='Print the number of jobs per status and exit.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            counts = queue_counts()
+            self.stdout.write(', '.join(f'{status}: {count}' for status, count in counts.items()))
+            return
+
+        workers = options['workers'] or getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2)
+        timeout = getattr(settings, 'IMAGE_DERIVATIVE_TIMEOUT', 120)
+        if workers <= 0:
+            raise CommandError('--workers must be > 0.')
+
+        self.stdout.write(f'Image derivative worker started with {workers} processes.')
+        running = {}
+        # Future -> monotonic time by which its render must finish
+        deadlines = {}
+        done = failed = 0
+        started = time.monotonic()
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        try:
+            while True:
+                # Jobs held here stay locked, so other workers never take them for abandoned ones
+                heartbeat(running.values())
+                released = release_stale(timeout)
+                if released:
+                    self.stdout.write(self.style.WARNING(f'Re-queued {released} jobs left running by a stopped worker.'))
+                while len(running) < workers:
+                    job = claim_next()
+                    if job is None:
+                        break
+                    if not is_current(job):
+                        # Replaced or deleted since it was queued
+                        complete(job, None)
+                        continue
+                    future = executor.submit(render, job.model_label, job.field_name, job.source)
+                    running[future] = job
+                    deadlines[future] = time.monotonic() + timeout
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                finished, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                timed_out = [
+                    future for future in running if future not in finished and deadlines[future] < time.monotonic()
+                ]
+                for future in timed_out:
+                    job = running.pop(future)
+                    del deadlines[future]
+                    future.cancel()
+                    fail(job, f'Timed out after {timeout}s')
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Job {job.pk}: timed out after {timeout}s.'))
+                if timed_out:
+                    # A running render cannot be stopped: leave its process to finish (its result is
+                    # dropped, nothing was written) and render further jobs in a fresh pool. Jobs
+                    # already in the old pool still finish there.
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                for future in finished:
+                    job = running.pop(future)
+                    del deadlines[future]
+                    try:
+                        images = future.result()
+                        variants = None if images is None else store_derivatives(
+                            job.model_label, job.field_name, job.source, images
+                        )
+                    except Exception as e:
+                        fail(job, f'{type(e).__name__}: {str(e)}')
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'Job {job.pk}: {type(e).__name__}: {str(e)}'))
+                        continue
+                    complete(job, variants)
+                    done += 1
+                    if variants is None:
+                        self.stdout.write(self.style.WARNING(f'Job {job.pk}: {job.source} is not a readable image.'))
+        except KeyboardInterrupt:
+            for future, job in running.items():
+                future.cancel()
+                fail(job, 'Worker stopped while running the job')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.monotonic() - started
+        counts = queue_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {done + failed} jobs ({done} done, {failed} failed attempts) in {elapsed:.2f}s; '
+            f"queue now has {counts['pending']} pending, {counts['failed']} failed."
+        ))
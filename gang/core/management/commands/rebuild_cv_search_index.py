@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.utils import cv_search, post_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the FTS5 full-text index used by CV search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Profiles indexed per transaction (default 5000).')
+
+    def handle(self, *args, **options):
+        if not post_search.fts5_supported():
+            raise CommandError(
+                'This database does not support SQLite FTS5; CV search will keep using LIKE scans.'
+            )
+        # Recreates the table and triggers if they are missing
+        cv_search.create_index()
+
+        started = time.monotonic()
+        total = 0
+        for indexed in cv_search.rebuild_index(batch_size=options['batch_size']):
+            total += indexed
+            self.stdout.write(f'Indexed {total} profiles...')
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} profiles with a CV in {elapsed:.2f}s ({rate:.0f} profiles/sec).'
+        ))
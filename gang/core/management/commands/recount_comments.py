@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from core.models.posts import Post
+from core.models.comments import Comment
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Post.comment_count and Comment.reply_count in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows recounted per transaction (default 500).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed_posts = self.recount(
+            Post, 'comment_count', 'post_id', batch_size
+        )
+        self.stdout.write(f'Posts with a corrected comment_count: {fixed_posts}')
+        fixed_comments = self.recount(
+            Comment, 'reply_count', 'parent_comment_id', batch_size
+        )
+        self.stdout.write(f'Comments with a corrected reply_count: {fixed_comments}')
+        self.stdout.write(self.style.SUCCESS('Counters recomputed.'))
+
+    def recount(self, model, counter_field, group_field, batch_size):
+        fixed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    model.objects.filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', counter_field)[:batch_size]
+                )
+                if not batch:
+                    return fixed
+                last_id = batch[-1].id
+                counts = dict(
+                    Comment.objects.filter(
+                        **{f'{group_field}__in': [row.id for row in batch]},
+                        is_deleted=False
+                    ).values_list(group_field).annotate(n=Count('id'))
+                )
+                stale = []
+                for row in batch:
+                    actual = counts.get(row.id, 0)
+                    if getattr(row, counter_field) != actual:
+                        setattr(row, counter_field, actual)
+                        stale.append(row)
+                if stale:
+                    # bulk_update skips save(), so the counter is written directly
+                    model.objects.bulk_update(stale, [counter_field])
+                    fixed += len(stale)
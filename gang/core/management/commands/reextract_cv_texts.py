@@ -1,31 +1,186 @@
-from django.core.management.base import BaseCommand
+import os
+import json
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from core.models.cv_extraction_jobs import CVExtractionJob
 from core.models.user_details import UserDetails
-from core.utils.cv_extractor import extract_cv_text
+from core.utils.content_storage import is_blob
+from core.utils.cv_extractor import SUPPORTED_EXTENSIONS
+from core.utils.cv_jobs import extract, text_hash
+from core.utils.skill_extractor import update_user_skills
+from core.utils.cv_duplicates import update_duplicates
+
+
+def _init_worker():
+    # Worker processes only read files; the parent writes the results to the database
+    django.setup()
+
+
+def _reextract(name, stored_hash, force):
+    """(cv_text_hash, text) for the CV stored as `name`; text is None if it is unchanged since stored_hash."""
+    current_hash = text_hash(name)
+    if current_hash == stored_hash and not force:
+        return current_hash, None
+    with default_storage.open(name, 'rb') as f:
+        return current_hash, extract(f)
+
 
 class Command(BaseCommand):
-    help = 'Re-extracts and saves cv_text for all users with a PDF CV.'
+    help = (
+        'Re-extracts cv_text for every uploaded CV (PDF, DOC, DOCX) in parallel. CVs whose content '
+        'has not changed since their text was extracted are skipped, and an interrupted run resumes '
+        'from its checkpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes extracting text (default: one per CPU).')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Profiles read, extracted and written per batch (default: 200).')
+        parser.add_argument('--since',
+                            help='Only profiles updated on or after this date or datetime (ISO 8601).')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-extract CVs whose text is already up to date.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of an earlier, interrupted run.')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.reextract_cv_texts.json'),
+                            help='File recording the progress of the current run.')
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'--since must be an ISO 8601 date or datetime, not {value!r}.')
+            since = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def read_checkpoint(self, path, run):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Checkpoint {path} is unreadable; run again with --restart.')
+        if checkpoint.get('run') != run:
+            self.stdout.write(self.style.WARNING('Ignoring the checkpoint of a run with other options.'))
+            return 0
+        return checkpoint['last_id']
+
+    def write_checkpoint(self, path, run, last_id):
+        # Written aside and renamed, so an interruption never leaves half a checkpoint
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({'run': run, 'last_id': last_id}, f)
+        os.replace(f'{path}.tmp', path)
 
     def handle(self, *args, **options):
-        users_with_pdf = UserDetails.objects.filter(cv_file__iendswith='.pdf')
-        if not users_with_pdf.exists():
-            self.stdout.write(self.style.WARNING('No users with PDF CVs found.'))
-            return
-        for user_detail in users_with_pdf:
-            username = user_detail.user.username if user_detail.user else '(no user)'
-            self.stdout.write(self.style.SUCCESS(f'Processing user: {username}'))
-            try:
-                # Open the file from storage
-                cv_file = user_detail.cv_file
-                if not cv_file:
-                    self.stdout.write(self.style.WARNING('No cv_file found.'))
-                    continue
-                cv_file.open('rb')
-                text = extract_cv_text(cv_file)
-                cv_file.close()
-                user_detail.cv_text = text
-                user_detail.save()
-                self.stdout.write(f'Extracted text length: {len(text)}')
-                self.stdout.write(f'Sample text: {text[:200]}')
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Error processing {username}: {str(e)}'))
-            self.stdout.write('-' * 60) 
\ No newline at end of file
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        since = self.parse_since(options['since'])
+        force = options['force']
+        checkpoint = options['checkpoint']
+        run = {'since': since.isoformat() if since else None, 'force': force}
+        last_id = 0 if options['restart'] else self.read_checkpoint(checkpoint, run)
+
+        extensions = Q()
+        for ext in SUPPORTED_EXTENSIONS:
+            extensions |= Q(cv_file__iendswith=ext)
+        rows = UserDetails.objects.filter(extensions)
+        if since:
+            rows = rows.filter(updated_at__gte=since)
+        total = rows.filter(pk__gt=last_id).count()
+        if last_id:
+            self.stdout.write(f'Resuming after profile {last_id}.')
+        self.stdout.write(f'{total} CVs to check with {options["workers"]} workers...')
+
+        started = time.monotonic()
+        extracted = unchanged = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            while True:
+                batch = list(
+                    rows.filter(pk__gt=last_id).order_by('pk')
+                    .values_list('pk', 'cv_file', 'cv_text_hash')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                # Blob names are the content's digest, so unchanged blobs are skipped without opening them
+                pending = [
+                    row for row in batch
+                    if force or not is_blob(row[1]) or text_hash(row[1]) != row[2]
+                ]
+                unchanged += len(batch) - len(pending)
+
+                # Workers forked for this batch must not share the parent's database connections
+                connections.close_all()
+                futures = [executor.submit(_reextract, name, stored_hash, force) for pk, name, stored_hash in pending]
+                results = {}
+                for (pk, name, stored_hash), future in zip(pending, futures):
+                    try:
+                        current_hash, text = future.result()
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'Error processing {name}: {type(e).__name__}: {str(e)}'))
+                        failed += 1
+                        continue
+                    if text is None:
+                        unchanged += 1
+                    else:
+                        results[pk] = (name, current_hash, text)
+                extracted += self.save_texts(results, options['batch_size'])
+
+                last_id = batch[-1][0]
+                self.write_checkpoint(checkpoint, run, last_id)
+                self.stdout.write(f'Processed {extracted + unchanged + failed}/{total} CVs...')
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.monotonic() - started
+        processed = extracted + unchanged + failed
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(self.style.SUCCESS(
+            f'Extracted text from {extracted} CVs ({unchanged} unchanged, {failed} failed) in {elapsed:.2f}s '
+            f'({rate:.1f} files/sec).'
+        ))
+
+    def save_texts(self, results, batch_size):
+        """bulk_update the extracted texts; returns how many were written."""
+        if not results:
+            return 0
+        # A CV replaced while the batch was extracted keeps the text of its own extraction job
+        current = {
+            pk: (name, user_id)
+            for pk, name, user_id in UserDetails.objects.filter(pk__in=results).values_list('pk', 'cv_file', 'user_id')
+        }
+        now = timezone.now()
+        updated = []
+        texts = {}
+        for pk, (name, current_hash, text) in results.items():
+            if pk in current and current[pk][0] == name:
+                updated.append(UserDetails(
+                    # As for extraction jobs, an empty text is never recorded as up to date
+                    pk=pk, cv_text=text, cv_text_hash=current_hash if text else '',
+                    cv_extraction_status=CVExtractionJob.DONE, updated_at=now
+                ))
+                texts[pk] = (current[pk][1], text)
+        with transaction.atomic():
+            UserDetails.objects.bulk_update(
+                updated, ['cv_text', 'cv_text_hash', 'cv_extraction_status', 'updated_at'], batch_size=batch_size
+            )
+            update_user_skills({user_id: text for user_id, text in texts.values()})
+            update_duplicates({pk: text for pk, (user_id, text) in texts.items()})
+        return len(updated)
@@ -6,10 +6,15 @@ class Migration(migrations.Migration):
         ('core', '0001_initial'),
     ]
 
+    # 0001_initial already creates the column, so only the migration state is updated
     operations = [
-        migrations.AddField(
-            model_name='userdetails',
-            name='cv_file',
-            field=models.FileField(blank=True, help_text='Upload your CV (PDF, DOC, DOCX)', null=True, upload_to='user_%(user_id)s/'),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='userdetails',
+                    name='cv_file',
+                    field=models.FileField(blank=True, help_text='Upload your CV (PDF, DOC, DOCX)', null=True, upload_to='user_%(user_id)s/'),
+                ),
+            ],
         ),
     ] 
\ No newline at end of file
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+def backfill_thread_paths(apps, schema_editor):
+    Comment = apps.get_model('core', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_comment_id'))
+    paths = {}
+
+    def path_for(comment_id):
+        # Walk up to the first ancestor whose path is already known
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents.get(comment_id)
+        prefix = paths[comment_id] if comment_id is not None else ''
+        for ancestor_id in reversed(chain):
+            prefix += f"{ancestor_id:010d}/"
+            paths[ancestor_id] = prefix
+        return prefix
+
+    batch = []
+    for comment in Comment.objects.only('id').order_by('id').iterator(chunk_size=1000):
+        comment.thread_path = path_for(comment.id)
+        comment.depth = comment.thread_path.count('/') - 1
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['thread_path', 'depth'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['thread_path', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_userdetails_cv_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=512),
+        ),
+        migrations.RunPython(backfill_thread_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 01:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Comment = apps.get_model('core', 'Comment')
+    live_comments = Comment.objects.filter(is_deleted=False)
+    Post.objects.update(comment_count=Coalesce(Subquery(
+        live_comments.filter(post=OuterRef('pk'))
+        .values('post').annotate(n=Count('id')).values('n')
+    ), 0))
+    Comment.objects.update(reply_count=Coalesce(Subquery(
+        live_comments.filter(parent_comment=OuterRef('pk'))
+        .values('parent_comment').annotate(n=Count('id')).values('n')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_comment_thread_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
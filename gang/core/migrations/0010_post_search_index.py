@@ -0,0 +1,77 @@
+from django.db import migrations, OperationalError
+
+# Frozen copy of core.utils.post_search.CREATE_SQL / DROP_SQL at the time of this migration
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts
+        USING fts5(title, content, username, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts
+        WHEN new.is_deleted = 0
+        BEGIN
+            INSERT INTO posts_fts(rowid, title, content, username)
+            VALUES (new.id, new.title, new.content, (SELECT username FROM users WHERE id = new.user_id));
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_update
+        AFTER UPDATE OF title, content, user_id, is_deleted ON posts
+        BEGIN
+            DELETE FROM posts_fts WHERE rowid = old.id;
+            INSERT INTO posts_fts(rowid, title, content, username)
+            SELECT new.id, new.title, new.content, username FROM users
+            WHERE id = new.user_id AND new.is_deleted = 0;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts
+        BEGIN
+            DELETE FROM posts_fts WHERE rowid = old.id;
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_username AFTER UPDATE OF username ON users
+        BEGIN
+            UPDATE posts_fts SET username = new.username
+            WHERE rowid IN (SELECT id FROM posts WHERE user_id = new.id);
+        END""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_fts_username',
+    'DROP TRIGGER IF EXISTS posts_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_fts_update',
+    'DROP TRIGGER IF EXISTS posts_fts_insert',
+    'DROP TABLE IF EXISTS posts_fts',
+]
+
+
+def create_post_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            for statement in CREATE_SQL:
+                cursor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5: SearchPostView keeps using LIKE scans
+            return
+        cursor.execute(
+            """INSERT INTO posts_fts(rowid, title, content, username)
+               SELECT p.id, p.title, p.content, u.username
+               FROM posts p JOIN users u ON u.id = p.user_id
+               WHERE p.is_deleted = 0"""
+        )
+
+
+def drop_post_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_timelines'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_post_search_index, drop_post_search_index),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['post', 'created_at', 'id'], name='comment_live_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['parent_comment', 'created_at', 'id'], name='comment_live_reply_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'created_at', 'id'], name='comment_live_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['user', 'updated_at', 'id'], name='comment_deleted_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notification_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at', 'id'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='post_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['interest', 'created_at', 'id'], name='post_live_interest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'created_at', 'id'], name='post_live_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['user', 'updated_at', 'id'], name='post_deleted_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(condition=models.Q(('cv_file__isnull', False)), fields=['updated_at', 'id'], name='user_details_cv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinterest',
+            index=models.Index(fields=['interest', 'user'], name='user_interest_follower_idx'),
+        ),
+    ]
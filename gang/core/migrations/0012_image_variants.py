@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-18 02:07
+
+from importlib import import_module
+from django.db import migrations, models
+
+# Adding a column with a callable default makes SQLite rebuild the posts table, which
+# fails while the posts_fts_username trigger refers to posts and drops the triggers on
+# posts. Take the post search triggers down around the rebuild and put them back after.
+search_index = import_module('core.migrations.0010_post_search_index')
+TRIGGER_SQL = [statement for statement in search_index.CREATE_SQL if 'CREATE TRIGGER' in statement]
+
+
+def has_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+        return cursor.fetchone() is not None
+
+
+def drop_search_triggers(apps, schema_editor):
+    if not has_search_index(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in search_index.DROP_SQL:
+            if statement.startswith('DROP TRIGGER'):
+                cursor.execute(statement)
+
+
+def create_search_triggers(apps, schema_editor):
+    if not has_search_index(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in TRIGGER_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='comment',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='background_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdetails',
+            name='cv_extraction_status',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CVExtractionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cv_file', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField()),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user_details', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cv_extraction_jobs', to='core.userdetails')),
+            ],
+            options={
+                'verbose_name': 'CV Extraction Job',
+                'verbose_name_plural': 'CV Extraction Jobs',
+                'db_table': 'cv_extraction_jobs',
+                'indexes': [models.Index(fields=['status', 'run_after', 'id'], name='cv_job_status_idx')],
+            },
+        ),
+    ]
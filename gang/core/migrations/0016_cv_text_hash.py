@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_cv_extraction_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdetails',
+            name='cv_text_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=80),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, OperationalError
+
+# Frozen copy of core.utils.cv_search.CREATE_SQL / DROP_SQL at the time of this migration
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS cv_fts
+        USING fts5(full_name, bio, cv_text, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS cv_fts_insert AFTER INSERT ON user_details
+        WHEN new.cv_file IS NOT NULL AND new.cv_file != ''
+        BEGIN
+            INSERT INTO cv_fts(rowid, full_name, bio, cv_text)
+            VALUES (new.id, new.full_name, new.bio, new.cv_text);
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS cv_fts_update
+        AFTER UPDATE OF full_name, bio, cv_text, cv_file ON user_details
+        WHEN old.full_name IS NOT new.full_name OR old.bio IS NOT new.bio
+            OR old.cv_text IS NOT new.cv_text OR old.cv_file IS NOT new.cv_file
+        BEGIN
+            DELETE FROM cv_fts WHERE rowid = old.id;
+            INSERT INTO cv_fts(rowid, full_name, bio, cv_text)
+            SELECT new.id, new.full_name, new.bio, new.cv_text
+            WHERE new.cv_file IS NOT NULL AND new.cv_file != '';
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS cv_fts_delete AFTER DELETE ON user_details
+        BEGIN
+            DELETE FROM cv_fts WHERE rowid = old.id;
+        END""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS cv_fts_delete',
+    'DROP TRIGGER IF EXISTS cv_fts_update',
+    'DROP TRIGGER IF EXISTS cv_fts_insert',
+    'DROP TABLE IF EXISTS cv_fts',
+]
+
+
+def create_cv_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            for statement in CREATE_SQL:
+                cursor.execute(statement)
+        except OperationalError:
+            # SQLite built without FTS5: CVSearchView keeps using LIKE scans
+            return
+        cursor.execute(
+            """INSERT INTO cv_fts(rowid, full_name, bio, cv_text)
+               SELECT id, full_name, bio, cv_text FROM user_details
+               WHERE cv_file IS NOT NULL AND cv_file != ''"""
+        )
+
+
+def drop_cv_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_cv_text_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cv_search_index, drop_cv_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_cv_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='aliases',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userskill',
+            name='cv_mentions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
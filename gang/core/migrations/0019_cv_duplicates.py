@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_skill_extraction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'CV Signature Band',
+                'verbose_name_plural': 'CV Signature Bands',
+                'db_table': 'cv_signature_bands',
+            },
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='cv_cluster_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='cv_minhash',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(fields=['cv_text_hash'], name='user_details_cv_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(fields=['cv_cluster_id'], name='user_details_cv_cluster_idx'),
+        ),
+        migrations.AddField(
+            model_name='cvsignatureband',
+            name='user_details',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cv_signature_bands', to='core.userdetails'),
+        ),
+        migrations.AddIndex(
+            model_name='cvsignatureband',
+            index=models.Index(fields=['band', 'bucket'], name='cv_signature_bucket_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_cv_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field_name', models.CharField(max_length=100)),
+                ('source', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField()),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Image Derivative Job',
+                'verbose_name_plural': 'Image Derivative Jobs',
+                'db_table': 'image_derivative_jobs',
+                'indexes': [models.Index(fields=['status', 'run_after', 'id'], name='image_job_status_idx'), models.Index(fields=['model_label', 'object_id', 'field_name'], name='image_job_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 02:56
+
+import core.models.user_files
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_image_derivative_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_type', models.CharField(max_length=50)),
+                ('file', models.FileField(max_length=255, upload_to=core.models.user_files.user_file_path)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User File',
+                'verbose_name_plural': 'User Files',
+                'db_table': 'user_files',
+            },
+        ),
+    ]
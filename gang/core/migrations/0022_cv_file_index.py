@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_user_files'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(fields=['cv_file'], name='user_details_cv_file_idx'),
+        ),
+    ]
@@ -7,5 +7,12 @@ from .user_interests import UserInterest
 from .company_interests import CompanyInterest
 from .notifications import Notification
 from .posts import Post
-from .comments import Comment 
+from .comments import Comment
+from .timelines import TimelineEntry 
 from .user_details import UserDetails
+from .media_blobs import MediaBlob
+from .upload_sessions import UploadSession, UploadChunk
+from .cv_extraction_jobs import CVExtractionJob
+from .cv_signature_bands import CVSignatureBand
+from .image_derivative_jobs import ImageDerivativeJob
+from .user_files import UserFile
@@ -1,27 +1,63 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete
 from .users import User
 from .posts import Post
 import os
 from django.conf import settings
+from core.utils.feed_cache import bump_feed_version
+from core.utils.image_derivatives import queue_derivatives
+from core.utils.content_storage import replaced_files, release_on_commit, release_stored_files
 
 def comment_image_path(instance, filename):
     # Create directory structure: media/comments/{user_id}/{post_id}_{comment_id}_{filename}
     return os.path.join('comments', str(instance.user.id), f"{instance.post.id}_{instance.id}_{filename}")
 
+def thread_path_segment(comment_id):
+    # Fixed-width ids keep string order equal to thread (depth-first) order
+    return f"{comment_id:010d}/"
+
+def thread_path_upper_bound(thread_path):
+    # Every descendant path starts with thread_path followed by digits, which sort below '~'
+    return thread_path + '~'
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     image = models.ImageField(upload_to=comment_image_path, blank=True, null=True)
+    # Resized copies of image, written by the derivative worker: {'source': image name, size: name}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
+    # Materialized path of ancestor ids ending with this comment's id, e.g. "0000000042/0000000057/"
+    thread_path = models.CharField(max_length=512, blank=True, default='', db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Non-deleted direct replies, maintained by save() and delete()
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         db_table = 'comments'
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
+        # Partial indexes match the is_deleted filter of each list, so pages are read in key order
+        indexes = [
+            models.Index(
+                fields=['post', 'created_at', 'id'], condition=Q(is_deleted=False), name='comment_live_post_idx'
+            ),
+            models.Index(
+                fields=['parent_comment', 'created_at', 'id'], condition=Q(is_deleted=False),
+                name='comment_live_reply_idx'
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'], condition=Q(is_deleted=False), name='comment_live_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at', 'id'], condition=Q(is_deleted=True), name='comment_deleted_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on post {self.post.id}"
@@ -30,8 +66,72 @@ class Comment(models.Model):
         # Override delete to implement soft delete
         if kwargs.pop('hard_delete', False):
             # If hard_delete is True, perform an actual delete
-            super().delete(*args, **kwargs)
+            with transaction.atomic():
+                # Replies are removed by the cascade, so take them out of the post's count too
+                removed = Comment.objects.filter(
+                    thread_path__gte=self.thread_path,
+                    thread_path__lt=thread_path_upper_bound(self.thread_path),
+                    is_deleted=False
+                ).count()
+                if removed:
+                    Post.objects.filter(pk=self.post_id).update(comment_count=F('comment_count') - removed)
+                if self.parent_comment_id and not self.is_deleted:
+                    Comment.objects.filter(pk=self.parent_comment_id).update(reply_count=F('reply_count') - 1)
+                super().delete(*args, **kwargs)
+                bump_feed_version()
         else:
             # Otherwise, just mark as deleted
             self.is_deleted = True
-            self.save() 
\ No newline at end of file
+            self.save()
+
+    def adjust_counters(self, delta):
+        # Atomic increments, so concurrent writers never lose an update
+        Post.objects.filter(pk=self.post_id).update(comment_count=F('comment_count') + delta)
+        if self.parent_comment_id:
+            Comment.objects.filter(pk=self.parent_comment_id).update(reply_count=F('reply_count') + delta)
+
+    def save(self, *args, **kwargs):
+        is_new = self.id is None
+        with transaction.atomic():
+            if is_new:
+                super().save(*args, **kwargs)
+                # The path ends with our own id, so it can only be set after the insert
+                if self.parent_comment_id is None:
+                    self.thread_path = thread_path_segment(self.id)
+                    self.depth = 0
+                else:
+                    self.thread_path = self.parent_comment.thread_path + thread_path_segment(self.id)
+                    self.depth = self.parent_comment.depth + 1
+                Comment.objects.filter(pk=self.pk).update(thread_path=self.thread_path, depth=self.depth)
+                if not self.is_deleted:
+                    self.adjust_counters(1)
+                    # comment_count is part of every feed page
+                    bump_feed_version()
+                queue_derivatives(self, 'image')
+                return
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # Never write back a possibly stale reply_count or image_variants
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in ('reply_count', 'image_variants')
+                ]
+            flipped = 0
+            if update_fields is None or 'is_deleted' in update_fields:
+                # Only the writer that actually flips is_deleted adjusts the counters
+                flipped = Comment.objects.filter(pk=self.pk).exclude(
+                    is_deleted=self.is_deleted
+                ).update(is_deleted=self.is_deleted)
+            replaced = replaced_files(self, 'image')
+            super().save(*args, **kwargs)
+            release_on_commit(replaced)
+            if flipped:
+                self.adjust_counters(-1 if self.is_deleted else 1)
+            # Any comment change can show on a cached page, so edits invalidate them too
+            bump_feed_version()
+            queue_derivatives(self, 'image')
+
+
+# Hard deletes and cascades release the image and its derivatives
+post_delete.connect(release_stored_files, sender=Comment)
@@ -0,0 +1,41 @@
+from django.db import models
+from .user_details import UserDetails
+
+class CVExtractionJob(models.Model):
+    """
+    A queued CV text extraction, run by `manage.py cv_extraction_worker`.
+    Workers claim jobs with a conditional update, so no broker is needed.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user_details = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='cv_extraction_jobs')
+    # Stored name of the CV when the job was queued; results for a replaced CV are dropped
+    cv_file = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not claimed before this moment; moves forward after each failed attempt
+    run_after = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cv_extraction_jobs'
+        verbose_name = 'CV Extraction Job'
+        verbose_name_plural = 'CV Extraction Jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='cv_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"CV extraction {self.id} ({self.status}) for {self.user_details_id}"
@@ -0,0 +1,23 @@
+from django.db import models
+from .user_details import UserDetails
+
+class CVSignatureBand(models.Model):
+    """
+    One LSH band of a CV's MinHash signature: CVs sharing a (band, bucket)
+    are candidate near-duplicates, found without comparing every pair.
+    """
+    user_details = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='cv_signature_bands')
+    band = models.PositiveSmallIntegerField()
+    # Hash of the signature values in the band
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'cv_signature_bands'
+        verbose_name = 'CV Signature Band'
+        verbose_name_plural = 'CV Signature Bands'
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='cv_signature_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"Band {self.band} of CV {self.user_details_id}"
@@ -0,0 +1,45 @@
+from django.db import models
+
+class ImageDerivativeJob(models.Model):
+    """
+    A queued rendering of one uploaded image's derivatives, run by
+    `manage.py image_derivative_worker`. Like CV extraction jobs, workers
+    claim them with a conditional update.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # The image field, e.g. core.Post / 42 / image
+    model_label = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=100)
+    # Stored name of the image when the job was queued; jobs for a replaced image are dropped
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not claimed before this moment; moves forward after each failed attempt
+    run_after = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'image_derivative_jobs'
+        verbose_name = 'Image Derivative Job'
+        verbose_name_plural = 'Image Derivative Jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='image_job_status_idx'),
+            models.Index(fields=['model_label', 'object_id', 'field_name'], name='image_job_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"Image derivatives {self.id} ({self.status}) for {self.model_label} {self.object_id}.{self.field_name}"
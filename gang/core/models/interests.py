@@ -3,6 +3,8 @@ from django.db import models
 class Interest(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.CharField(max_length=255, blank=True, null=True)
+    # Too many followers to fan posts out on write; timelines merge its posts on read
+    fanout_on_read = models.BooleanField(default=False)
 
     class Meta:
         db_table = 'interests'
@@ -0,0 +1,17 @@
+from django.db import models
+
+class MediaBlob(models.Model):
+    # Stored name under the content-addressed storage, e.g. blobs/3f/a2/3fa2...c9.png
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # File fields and derivative variants pointing at this blob; the file goes at zero
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
@@ -12,6 +12,13 @@ class Notification(models.Model):
         db_table = 'notifications'
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_user_idx'),
+            # Unread badge counts and lists only touch unread rows
+            models.Index(
+                fields=['user', 'created_at', 'id'], condition=models.Q(is_read=False), name='notification_unread_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:50]}" 
\ No newline at end of file
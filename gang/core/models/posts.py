@@ -1,32 +1,51 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete
 from .users import User
 from .interests import Interest
+from .timelines import TimelineEntry
 import os
 from django.conf import settings
+from core.utils.feed_cache import bump_feed_version
+from core.utils.image_derivatives import queue_derivatives
+from core.utils.content_storage import replaced_files, release_on_commit, release_stored_files
 
 def post_image_path(instance, filename):
-    # Create directory structure: media/posts/{user_id}/{post_id}_{filename}
-    if instance.id is None:
-        # If post doesn't have an ID yet, use a temporary name
-        return os.path.join('posts', str(instance.user.id), f"temp_{filename}")
-    return os.path.join('posts', str(instance.user.id), f"{instance.id}_{filename}")
+    # The storage files uploads by content, so only the extension of this name is kept
+    return os.path.join('posts', str(instance.user.id), filename)
 
 class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=255)
     content = models.TextField()
     image_url = models.URLField(max_length=255, blank=True, null=True)
-    # New image field that uses the storage path function
     image = models.ImageField(upload_to=post_image_path, blank=True, null=True)
+    # Resized copies of image, written by the derivative worker: {'source': image name, size: name}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     interest = models.ForeignKey(Interest, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
+    # Non-deleted comments at any depth, maintained by Comment.save() and Comment.delete()
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Delivered to followers' timelines on write; False means it is merged in on read
+    fanned_out = models.BooleanField(default=False, editable=False)
 
     class Meta:
         db_table = 'posts'
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        # Partial indexes match the is_deleted filter of each list, so pages are read in key order
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=Q(is_deleted=False), name='post_live_created_idx'),
+            models.Index(
+                fields=['interest', 'created_at', 'id'], condition=Q(is_deleted=False), name='post_live_interest_idx'
+            ),
+            models.Index(fields=['user', 'created_at', 'id'], condition=Q(is_deleted=False), name='post_live_user_idx'),
+            models.Index(
+                fields=['user', 'updated_at', 'id'], condition=Q(is_deleted=True), name='post_deleted_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Post by {self.user.username}: {self.title[:50]}"
@@ -36,23 +55,34 @@ class Post(models.Model):
         if kwargs.pop('hard_delete', False):
             # If hard_delete is True, perform an actual delete
             super().delete(*args, **kwargs)
+            bump_feed_version()
         else:
             # Otherwise, just mark as deleted
             self.is_deleted = True
             self.save()
 
+    def fan_out(self):
+        if TimelineEntry.fan_out(self):
+            Post.objects.filter(pk=self.pk).update(fanned_out=True)
+            self.fanned_out = True
+
     def save(self, *args, **kwargs):
-        # If this is a new post and has an image
-        if self.id is None and self.image:
-            # Save the post first to get an ID
-            super().save(*args, **kwargs)
-            # Update the image path with the new post ID
-            if self.image.name.startswith('posts/'):
-                old_path = self.image.path
-                new_name = f"{self.id}_{os.path.basename(self.image.name)}"
-                new_path = os.path.join(os.path.dirname(old_path), new_name)
-                os.rename(old_path, new_path)
-                self.image.name = os.path.join('posts', str(self.user.id), new_name)
-                super().save(update_fields=['image'])
-        else:
-            super().save(*args, **kwargs) 
\ No newline at end of file
+        is_new = self.id is None
+        if not is_new and kwargs.get('update_fields') is None:
+            # Never write back a possibly stale comment_count or image_variants
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('comment_count', 'image_variants')
+            ]
+        replaced = replaced_files(self, 'image')
+        super().save(*args, **kwargs)
+        release_on_commit(replaced)
+        bump_feed_version()
+        if is_new and self.interest_id is not None:
+            # Deliver to followers' timelines once the post is committed
+            transaction.on_commit(self.fan_out)
+        queue_derivatives(self, 'image')
+
+
+# Hard deletes and cascades release the image and its derivatives
+post_delete.connect(release_stored_files, sender=Post)
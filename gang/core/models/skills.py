@@ -3,6 +3,10 @@ from django.db import models
 class Skill(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.CharField(max_length=255, blank=True, null=True)
+    # Other names the skill goes by in CVs, e.g. ["js", "ecmascript"] for JavaScript
+    aliases = models.JSONField(default=list, blank=True)
+    # Part of the version that tells the CV skill matchers to rebuild (core.utils.skill_extractor)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'skills'
@@ -10,4 +14,5 @@ class Skill(models.Model):
         verbose_name_plural = 'Skills'
 
     def __str__(self):
-        return self.name 
\ No newline at end of file
+        return self.name
+
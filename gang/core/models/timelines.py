@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .users import User
+from .interests import Interest
+from .user_interests import UserInterest
+
+class TimelineEntry(models.Model):
+    """
+    A post delivered to a follower's personalized timeline at write time.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey('core.Post', on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copied from the post so the timeline is read from this table's index alone
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'timeline_entries'
+        verbose_name = 'Timeline Entry'
+        verbose_name_plural = 'Timeline Entries'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'post'], name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.user_id}'s timeline"
+
+    @classmethod
+    def fan_out(cls, post):
+        """
+        Deliver a new post to every follower of its interest.
+
+        Interests with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers are
+        switched to fan-out-on-read instead: their posts stay unmaterialized
+        and are merged into timelines when they are read.
+        """
+        if post.interest_id is None or post.is_deleted:
+            return False
+        max_followers = getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 1000)
+        followers = UserInterest.objects.filter(interest_id=post.interest_id).exclude(user_id=post.user_id)
+        if Interest.objects.filter(pk=post.interest_id, fanout_on_read=True).exists() or \
+                followers.count() > max_followers:
+            Interest.objects.filter(pk=post.interest_id).update(fanout_on_read=True)
+            return False
+
+        batch_size = getattr(settings, 'TIMELINE_FANOUT_BATCH_SIZE', 500)
+        batch = []
+        for user_id in followers.values_list('user_id', flat=True).iterator(chunk_size=batch_size):
+            batch.append(cls(user_id=user_id, post_id=post.id, created_at=post.created_at))
+            if len(batch) >= batch_size:
+                cls.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            cls.objects.bulk_create(batch, ignore_conflicts=True)
+        return True
+
+
+@receiver(post_delete, sender=UserInterest)
+def leave_interest(sender, instance, **kwargs):
+    """Take the posts of an interest out of the timeline of a user who stopped following it."""
+    TimelineEntry.objects.filter(user_id=instance.user_id, post__interest_id=instance.interest_id).delete()
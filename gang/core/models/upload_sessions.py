@@ -0,0 +1,58 @@
+import uuid
+from django.db import models
+from .users import User
+
+class UploadSession(models.Model):
+    """
+    A resumable upload sent as numbered chunks, which are written straight
+    into one staging file at their offsets (see core.utils.uploads).
+    """
+    # Random ids, so sessions cannot be guessed from one another
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_type = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Stored name of the assembled file once the session is completed
+    file = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Moves with every chunk; sessions idle past UPLOAD_SESSION_EXPIRY_HOURS are collected
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        verbose_name = 'Upload Session'
+        verbose_name_plural = 'Upload Sessions'
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload of {self.filename} by {self.user_id}"
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+    def chunk_length(self, index):
+        """Expected byte length of chunk `index`; only the last one may be short."""
+        if index == self.chunk_count - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'upload_chunks'
+        verbose_name = 'Upload Chunk'
+        verbose_name_plural = 'Upload Chunks'
+        unique_together = ('session', 'index')
+
+    def __str__(self):
+        return f"Chunk {self.index} of upload {self.session_id}"
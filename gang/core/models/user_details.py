@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models.signals import post_delete
 import os
 from django.conf import settings
 from .users import User
+from core.utils.image_derivatives import queue_derivatives
+from core.utils.content_storage import replaced_files, release_on_commit, release_stored_files
+from core.utils.cv_jobs import queue_cv_extraction
 
 def get_upload_path(instance, filename):
     # File will be uploaded to MEDIA_ROOT/user_<id>/<filename>
@@ -11,12 +15,24 @@ class UserDetails(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='details')
     full_name = models.CharField(max_length=200, blank=True, null=True)
     profile_picture = models.ImageField(upload_to=get_upload_path, blank=True, null=True)
+    # Resized copies of the images, written by the derivative worker: {'source': image name, size: name}
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     cv_file = models.FileField(upload_to=get_upload_path, blank=True, null=True, help_text='Upload your CV (PDF, DOC, DOCX)')
+    # Stored names are content hashes, so the name the CV was uploaded under is kept here
+    cv_original_filename = models.CharField(max_length=255, blank=True, null=True, editable=False)
     cv_text = models.TextField(blank=True, null=True, help_text='Extracted text from CV file')
+    # '<extractor version>:<SHA-256 of the CV>' cv_text was extracted from; unchanged CVs are not parsed again
+    cv_text_hash = models.CharField(max_length=80, blank=True, default='', editable=False)
+    # State of the latest CVExtractionJob for cv_file: pending, running, done or failed
+    cv_extraction_status = models.CharField(max_length=20, blank=True, default='', editable=False)
+    # MinHash signature of cv_text, and the id of the first profile of its near-duplicate cluster
+    cv_minhash = models.BinaryField(null=True, editable=False)
+    cv_cluster_id = models.BigIntegerField(null=True, blank=True, editable=False)
     bio = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=100, blank=True, null=True)
     date_of_birth = models.DateTimeField(null=True, blank=True)
     background_image = models.ImageField(upload_to=get_upload_path, blank=True, null=True)
+    background_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     theme = models.CharField(max_length=50, blank=True, null=True)
     font_style = models.CharField(max_length=50, blank=True, null=True)
     social_links = models.JSONField(default=dict, blank=True)
@@ -27,9 +43,39 @@ class UserDetails(models.Model):
         db_table = 'user_details'
         verbose_name = 'User Detail'
         verbose_name_plural = 'User Details'
+        # Only profiles with a CV take part in CV counts, search and re-extraction
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], condition=models.Q(cv_file__isnull=False), name='user_details_cv_idx'
+            ),
+            # Finding CV text already extracted from the same file, and the members of a duplicate cluster
+            models.Index(fields=['cv_text_hash'], name='user_details_cv_hash_idx'),
+            models.Index(fields=['cv_cluster_id'], name='user_details_cv_cluster_idx'),
+            # Media requests look up whether a file is someone's CV
+            models.Index(fields=['cv_file'], name='user_details_cv_file_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s details"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and kwargs.get('update_fields') is None:
+            # Never write back possibly stale derivatives; the worker updates them directly
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.name.endswith('_variants')
+            ]
+        cv_uploaded = bool(self.cv_file) and not self.cv_file._committed
+        if cv_uploaded:
+            self.cv_original_filename = os.path.basename(self.cv_file.name)
+            # The text is extracted by the CV extraction worker
+            self.cv_extraction_status = 'pending'
+        replaced = replaced_files(self, 'profile_picture', 'background_image', 'cv_file')
+        super().save(*args, **kwargs)
+        release_on_commit(replaced)
+        if cv_uploaded:
+            queue_cv_extraction(self)
+        queue_derivatives(self, 'profile_picture', 'background_image')
         
     @property
     def profile_picture_url(self):
@@ -47,4 +93,8 @@ class UserDetails(models.Model):
     def cv_file_url(self):
         if self.cv_file:
             return f"{settings.MEDIA_URL}{self.cv_file}"
-        return None 
\ No newline at end of file
+        return None
+
+
+# Deleting a profile (or its user) releases the CV, the images and their derivatives
+post_delete.connect(release_stored_files, sender=UserDetails)
@@ -0,0 +1,32 @@
+from django.db import models
+from django.db.models.signals import post_delete
+from .users import User
+from core.utils.content_storage import release_stored_files
+
+def user_file_path(instance, filename):
+    # The storage files uploads by content, so only the extension of this name is kept
+    return f'user_{instance.user_id}/{instance.file_type}/{filename}'
+
+class UserFile(models.Model):
+    """
+    A file uploaded through /files/upload/ or a completed upload session.
+    The row holds the file's reference in the content-addressed storage, so
+    deleting it (or its user) releases the file.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='files')
+    file_type = models.CharField(max_length=50)
+    file = models.FileField(upload_to=user_file_path, max_length=255)
+    original_filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'user_files'
+        verbose_name = 'User File'
+        verbose_name_plural = 'User Files'
+
+    def __str__(self):
+        return f"{self.original_filename} uploaded by {self.user_id}"
+
+
+post_delete.connect(release_stored_files, sender=UserFile)
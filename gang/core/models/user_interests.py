@@ -12,6 +12,10 @@ class UserInterest(models.Model):
         verbose_name = 'User Interest'
         verbose_name_plural = 'User Interests'
         unique_together = ('user', 'interest')
+        # Followers of an interest are read from the index alone during fan-out
+        indexes = [
+            models.Index(fields=['interest', 'user'], name='user_interest_follower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s {self.interest.name} interest" 
\ No newline at end of file
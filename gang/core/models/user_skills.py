@@ -6,6 +6,8 @@ class UserSkill(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills')
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE)
     proficiency_level = models.IntegerField()
+    # Times the skill is mentioned in the user's CV, kept by the skill extractor; 0 if it isn't
+    cv_mentions = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,60 @@
+import os
+from django.conf import settings
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from core.models.upload_sessions import UploadSession
+from core.utils.uploads import check_upload
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    file_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'file_type', 'filename', 'size', 'chunk_size', 'chunk_count',
+            'received_chunks', 'file_url', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'chunk_size', 'created_at', 'updated_at']
+
+    def get_received_chunks(self, obj):
+        if obj.file:
+            return list(range(obj.chunk_count))
+        return sorted(obj.chunks.values_list('index', flat=True))
+
+    def get_file_url(self, obj):
+        if not obj.file:
+            return None
+        url = default_storage.url(obj.file)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_filename(self, value):
+        # Only the name is kept, never a client supplied path
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError("A file name is required")
+        return value
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Size must be at least 1 byte")
+        return value
+
+    def validate(self, attrs):
+        if attrs['file_type'] not in settings.UPLOAD_SESSION_FILE_TYPES:
+            raise serializers.ValidationError({
+                'file_type': f"Chunked uploads are available for: {', '.join(settings.UPLOAD_SESSION_FILE_TYPES)}"
+            })
+        error = check_upload(attrs['file_type'], attrs['filename'], attrs['size'])
+        if error:
+            raise serializers.ValidationError({'error': error})
+        request = self.context.get('request')
+        max_open = getattr(settings, 'UPLOAD_SESSION_MAX_OPEN', 5)
+        if request and UploadSession.objects.filter(user=request.user, file='').count() >= max_open:
+            raise serializers.ValidationError({
+                'error': f"Too many uploads in progress (max {max_open}); complete or cancel one first"
+            })
+        attrs['chunk_size'] = settings.UPLOAD_CHUNK_SIZE
+        return attrs
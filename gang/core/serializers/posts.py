@@ -1,22 +1,57 @@
 from rest_framework import serializers
+from django.urls import reverse
 from core.models.posts import Post
 from core.models.comments import Comment
 from django.contrib.auth import get_user_model
 from core.models.interests import Interest
+from core.utils.image_derivatives import variant_urls
 import json
 
 User = get_user_model()
 
-class CommentSerializer(serializers.ModelSerializer):
+class ExpandableFieldsMixin:
+    """
+    Leave out fields the client did not ask for before any of them are computed.
+
+    context['fields'] is a whitelist of output fields (?fields=), and
+    expandable_fields maps each ?expand= name to the fields it brings in,
+    which are left out unless named in context['expand'].
+    """
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get('expand') or ()
+        for name, field_names in self.expandable_fields.items():
+            if name not in expand:
+                for field_name in field_names:
+                    fields.pop(field_name)
+        only = self.context.get('fields')
+        if only:
+            for name in list(fields):
+                if name not in only:
+                    fields.pop(name)
+        return fields
+
+    def get_nested_context(self):
+        # Nested comments always carry their replies and ignore the top-level whitelist
+        return {**self.context, 'fields': None, 'expand': {'replies'}}
+
+class CommentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
+    more_replies = serializers.SerializerMethodField()
+    expandable_fields = {'replies': ('replies', 'more_replies')}
     
     class Meta:
         model = Comment
         fields = ['id', 'user', 'username', 'content', 'parent_comment', 'created_at', 
-                 'updated_at', 'image', 'image_url', 'is_deleted', 'replies']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'username', 'image_url', 'replies']
+                 'updated_at', 'image', 'image_url', 'image_variants', 'is_deleted', 'depth',
+                 'reply_count', 'replies', 'more_replies']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'username', 'image_url', 'image_variants',
+                            'depth', 'reply_count', 'replies', 'more_replies']
     
     def get_username(self, obj):
         return obj.user.username
@@ -29,12 +64,32 @@ class CommentSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_variants(self, obj):
+        # Thumbnail, feed and full size URLs, once the derivative worker has made them
+        return variant_urls(obj, 'image', self.context.get('request'))
+
     def get_replies(self, obj):
-        # Get all non-deleted replies for this comment
-        replies = obj.replies.filter(is_deleted=False).order_by('created_at')
-        serializer = CommentSerializer(replies, many=True, context=self.context)
+        # Use the prefetched tree when the view supplied one
+        tree = self.context.get('comment_tree')
+        if tree is not None:
+            replies = tree.replies(obj.id)
+        else:
+            # Get all non-deleted replies for this comment
+            replies = obj.replies.filter(is_deleted=False).select_related('user').order_by('created_at')
+        serializer = CommentSerializer(replies, many=True, context=self.get_nested_context())
         return serializer.data
 
+    def get_more_replies(self, obj):
+        # Link to the rest of a branch that was cut off at the requested depth
+        tree = self.context.get('comment_tree')
+        if tree is None or not tree.is_truncated(obj.id):
+            return None
+        url = reverse('comment-thread', kwargs={'pk': obj.id})
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         # Ensure content is properly encoded
@@ -42,10 +97,12 @@ class CommentSerializer(serializers.ModelSerializer):
             data['content'] = data['content']
         return data
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
     comments = serializers.SerializerMethodField()
+    expandable_fields = {'comments': ('comments',)}
     image_full_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     interest = serializers.PrimaryKeyRelatedField(
         queryset=Interest.objects.all(),
         required=False,
@@ -59,11 +116,12 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ['id', 'user', 'username', 'title', 'content', 'image_url', 'image', 
-                 'image_full_url', 'interest', 'created_at', 'updated_at', 'comments', 
-                 'is_deleted']
+                 'image_full_url', 'image_variants', 'interest', 'created_at', 'updated_at',
+                 'comment_count', 'comments', 'is_deleted']
         
         read_only_fields = [
-            'id', 'user', 'created_at', 'updated_at', 'username', 'image_full_url'
+            'id', 'user', 'created_at', 'updated_at', 'username', 'image_full_url',
+            'image_variants', 'comment_count'
         ] 
 
     def get_username(self, obj):
@@ -76,11 +134,22 @@ class PostSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return obj.image.url
         return obj.image_url  # Return the URL string if using the URL field
+
+    def get_image_variants(self, obj):
+        # Thumbnail, feed and full size URLs, once the derivative worker has made them
+        return variant_urls(obj, 'image', self.context.get('request'))
     
     def get_comments(self, obj):
-        # Get all non-deleted top-level comments
-        comments = obj.comments.filter(is_deleted=False, parent_comment=None).order_by('-created_at')
-        serializer = CommentSerializer(comments, many=True, context=self.context)
+        # Use the prefetched tree when the view supplied one
+        tree = self.context.get('comment_tree')
+        if tree is not None:
+            comments = tree.roots(obj.id)
+        else:
+            # Get all non-deleted top-level comments
+            comments = obj.comments.filter(
+                is_deleted=False, parent_comment=None
+            ).select_related('user').order_by('-created_at')
+        serializer = CommentSerializer(comments, many=True, context=self.get_nested_context())
         return serializer.data
 
     def to_representation(self, instance):
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from core.models.user_details import UserDetails
 from core.models.users import User
+from core.utils.uploads import upload_rules
+from core.utils.image_derivatives import variant_urls
+from core.utils.media_urls import cv_url
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,8 @@ class UserDetailsSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     profile_picture_url = serializers.SerializerMethodField()
     background_image_url = serializers.SerializerMethodField()
+    profile_picture_variants = serializers.SerializerMethodField()
+    background_image_variants = serializers.SerializerMethodField()
     cv_url = serializers.SerializerMethodField()
     cv_original_filename = serializers.SerializerMethodField()
     cv_file_url = serializers.SerializerMethodField()
@@ -23,11 +28,12 @@ class UserDetailsSerializer(serializers.ModelSerializer):
         model = UserDetails
         fields = [
             'id', 'user', 'full_name', 'profile_picture', 'profile_picture_url', 
-            'bio', 'location', 'date_of_birth', 'background_image', 
-            'background_image_url', 'theme', 'font_style', 'social_links',
-            'cv_file', 'cv_url', 'cv_original_filename', 'cv_file_url', 'created_at', 'updated_at'
+            'profile_picture_variants', 'bio', 'location', 'date_of_birth', 'background_image', 
+            'background_image_url', 'background_image_variants', 'theme', 'font_style', 'social_links',
+            'cv_file', 'cv_url', 'cv_original_filename', 'cv_file_url', 'cv_extraction_status',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at', 'profile_picture_url', 'background_image_url', 'cv_url', 'cv_original_filename', 'cv_file_url']
+        read_only_fields = ['id', 'user', 'created_at', 'updated_at', 'profile_picture_url', 'background_image_url', 'profile_picture_variants', 'background_image_variants', 'cv_url', 'cv_original_filename', 'cv_file_url']
     
     def get_profile_picture_url(self, obj):
         if obj.profile_picture:
@@ -45,42 +51,45 @@ class UserDetailsSerializer(serializers.ModelSerializer):
             return obj.background_image.url
         return None
 
+    def get_profile_picture_variants(self, obj):
+        # Thumbnail, feed and full size URLs, once the derivative worker has made them
+        return variant_urls(obj, 'profile_picture', self.context.get('request'))
+
+    def get_background_image_variants(self, obj):
+        return variant_urls(obj, 'background_image', self.context.get('request'))
+
     def get_cv_url(self, obj):
-        try:
-            if obj.cv_file:
-                request = self.context.get('request')
-                if request:
-                    url = request.build_absolute_uri(obj.cv_file.url)
-                    logger.info(f"Generated CV URL for user {obj.user.id}: {url}")
-                    return url
-                url = obj.cv_file.url
-                logger.info(f"Generated CV URL for user {obj.user.id}: {url}")
-                return url
-            logger.info(f"No CV file found for user {obj.user.id}")
-            return None
-        except Exception as e:
-            logger.error(f"Error generating CV URL for user {obj.user.id}: {str(e)}")
-            return None
+        # Opened in a browser, so signed; None for users who may not read the CV
+        return cv_url(obj, self.context.get('request'))
 
     def get_cv_original_filename(self, obj):
-        try:
-            if obj.cv_file:
-                filename = obj.cv_file.name.split('/')[-1]
-                logger.info(f"Original CV filename for user {obj.user.id}: {filename}")
-                return filename
-            logger.info(f"No CV file found for user {obj.user.id}")
-            return None
-        except Exception as e:
-            logger.error(f"Error getting CV filename for user {obj.user.id}: {str(e)}")
+        if not obj.cv_file:
             return None
+        return obj.cv_original_filename or obj.cv_file.name.split('/')[-1]
 
     def get_cv_file_url(self, obj):
-        request = self.context.get('request')
-        if obj.cv_file and hasattr(obj.cv_file, 'url'):
-            if request:
-                return request.build_absolute_uri(obj.cv_file.url)
-            return obj.cv_file.url
-        return None
+        return cv_url(obj, self.context.get('request'))
+
+class CVSearchResultSerializer(serializers.Serializer):
+    """
+    One CV search hit: just what a result list shows, read from the columns
+    CVSearchView loads. `score` (BM25, higher is better) and `snippet` are set
+    on each instance by the view; both are None without the full-text index.
+    """
+    id = serializers.IntegerField()
+    username = serializers.CharField(source='user.username')
+    full_name = serializers.CharField()
+    location = serializers.CharField()
+    cv_url = serializers.SerializerMethodField()
+    score = serializers.FloatField()
+    snippet = serializers.CharField()
+
+    def get_cv_url(self, obj):
+        return cv_url(obj, self.context.get('request'))
+
+class CVMatchResultSerializer(CVSearchResultSerializer):
+    """One CV match: `score` is the cosine similarity (0 to 1) of the CV to the job description."""
+    snippet = None
 
 class UserDetailsUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -88,17 +97,19 @@ class UserDetailsUpdateSerializer(serializers.ModelSerializer):
         fields = [
             'full_name', 'profile_picture', 'bio', 'location', 
             'date_of_birth', 'background_image', 'theme', 
-            'font_style', 'social_links', 'cv_file'
+            'font_style', 'social_links', 'cv_file', 'cv_extraction_status'
         ]
+        read_only_fields = ['cv_extraction_status']
 
     def validate_profile_picture(self, value):
         if value:
             # Validate file type
             if not value.name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
                 raise serializers.ValidationError("Only image files are allowed")
-            # Validate file size (limit to 5MB)
-            if value.size > 5 * 1024 * 1024:
-                raise serializers.ValidationError("Image file too large (> 5MB)")
+            # Validate file size (UPLOAD_FILE_TYPES limit, 5MB by default)
+            max_size = upload_rules('profile_picture')['max_size']
+            if value.size > max_size:
+                raise serializers.ValidationError(f"Image file too large (> {max_size // (1024 * 1024)}MB)")
         return value
     
     def validate_background_image(self, value):
@@ -106,9 +117,10 @@ class UserDetailsUpdateSerializer(serializers.ModelSerializer):
             # Validate file type
             if not value.name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
                 raise serializers.ValidationError("Only image files are allowed")
-            # Validate file size (limit to 10MB)
-            if value.size > 10 * 1024 * 1024:
-                raise serializers.ValidationError("Image file too large (> 10MB)")
+            # Validate file size (UPLOAD_FILE_TYPES limit, 10MB by default)
+            max_size = upload_rules('background_image')['max_size']
+            if value.size > max_size:
+                raise serializers.ValidationError(f"Image file too large (> {max_size // (1024 * 1024)}MB)")
         return value
 
     def validate_cv_file(self, value):
@@ -116,8 +128,9 @@ class UserDetailsUpdateSerializer(serializers.ModelSerializer):
             # Validate file type
             if not value.name.lower().endswith(('.pdf', '.doc', '.docx')):
                 raise serializers.ValidationError("Only PDF, DOC, and DOCX files are allowed")
-            # Validate file size (limit to 10MB)
-            if value.size > 10 * 1024 * 1024:
-                raise serializers.ValidationError("CV file too large (> 10MB)")
+            # Validate file size (UPLOAD_FILE_TYPES limit, 10MB by default)
+            max_size = upload_rules('cv')['max_size']
+            if value.size > max_size:
+                raise serializers.ValidationError(f"CV file too large (> {max_size // (1024 * 1024)}MB)")
             logger.info(f"Validated CV file: {value.name}, size: {value.size} bytes")
         return value 
\ No newline at end of file
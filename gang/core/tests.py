@@ -1,3 +1,430 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from collections import Counter
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import User, Post, Comment, Interest, UserInterest, Notification, UserDetails, MediaBlob, UserFile, Skill
+from core.utils.media_urls import signed_url
+from core.utils import cv_match, similar_candidates
+from core.utils.skill_extractor import SkillMatcher, get_matcher
+from core.views.media import parse_range
 
-# Create your tests here.
+# Tables the hot read paths touch; a plain "SCAN <table>" on one of them is a full table scan
+HOT_TABLES = {'posts', 'comments', 'notifications', 'user_interests', 'user_details', 'timeline_entries'}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class QueryPlanTests(TestCase):
+    """
+    Every query behind the hot post, comment, timeline and profile endpoints
+    must be answered from an index: no full table scans and no temporary
+    B-tree sorts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', email='reader@example.com', password='pass')
+        cls.author = User.objects.create_user(username='author', email='author@example.com', password='pass')
+        cls.interest = Interest.objects.create(name='Python')
+        UserInterest.objects.create(user=cls.user, interest=cls.interest)
+        UserDetails.objects.create(user=cls.author, cv_file='user_2/cv.pdf', cv_text='python django')
+        for i in range(30):
+            # Run the fan-out to followers' timelines
+            with cls.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    user=cls.author, title=f'Post {i}', content='Python tips', interest=cls.interest
+                )
+            root = Comment.objects.create(user=cls.user, post=post, content='First')
+            Comment.objects.create(user=cls.author, post=post, content='Reply', parent_comment=root)
+            Notification.objects.create(user=cls.user, message=f'New post {i}', type='post')
+        cls.post = post
+        cls.comment = root
+        cls.deleted_post = Post.objects.create(user=cls.user, title='Gone', content='Gone')
+        cls.deleted_post.delete()
+        Comment.objects.create(user=cls.user, post=cls.post, content='Gone').delete()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexedPlans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        for query in queries.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for detail in explain(query['sql']):
+                scan = re.match(r'SCAN (\w+)$', detail)
+                self.assertFalse(
+                    scan and scan.group(1) in HOT_TABLES,
+                    f'{url}: full table scan ({detail}) in {query["sql"]}'
+                )
+                self.assertNotIn('TEMP B-TREE', detail, f'{url}: sort without an index in {query["sql"]}')
+        return response
+
+    def assertIndexedPages(self, url):
+        # The first page reads from the start of the index, later pages seek past a cursor
+        response = self.assertIndexedPlans(url)
+        next_url = response.data['next']
+        self.assertIsNotNone(next_url, url)
+        self.assertIndexedPlans(next_url)
+
+    def test_post_lists(self):
+        self.assertIndexedPages('/api/posts/?page_size=10')
+        self.assertIndexedPages(f'/api/posts/?interest={self.interest.id}&page_size=10')
+        self.assertIndexedPages('/api/posts/user/author/?page_size=10')
+        self.assertIndexedPages('/api/posts/?page_size=10&expand=comments')
+
+    def test_deleted_lists(self):
+        self.assertIndexedPlans('/api/posts/deleted/')
+        self.assertIndexedPlans('/api/comments/deleted/')
+
+    def test_for_you_timeline(self):
+        self.assertIndexedPages('/api/posts/for-you/?page_size=10')
+
+    def test_post_detail(self):
+        self.assertIndexedPlans(f'/api/posts/{self.post.id}/')
+        self.assertIndexedPlans(f'/api/posts/{self.post.id}/?expand=comments')
+
+    def test_comment_lists(self):
+        self.assertIndexedPlans(f'/api/posts/{self.post.id}/comments/')
+        self.assertIndexedPlans(f'/api/posts/{self.post.id}/comments/?include_replies=true')
+        self.assertIndexedPages('/api/comments/user/reader/?page_size=10')
+
+    def test_comment_detail(self):
+        self.assertIndexedPlans(f'/api/comments/{self.comment.id}/')
+        self.assertIndexedPlans(f'/api/comments/{self.comment.id}/thread/')
+
+    def test_profiles(self):
+        self.assertIndexedPlans('/api/me/')
+        self.assertIndexedPlans('/api/users/author/')
+
+    def test_notification_queries(self):
+        # No endpoint lists notifications yet; check the queries one would run
+        unread = Notification.objects.filter(user=self.user, is_read=False).order_by('-created_at', '-id')
+        for queryset in (unread[:20], Notification.objects.filter(user=self.user).order_by('-created_at', '-id')[:20]):
+            for detail in explain(str(queryset.query)):
+                self.assertNotRegex(detail, r'^SCAN notifications$')
+                self.assertNotIn('TEMP B-TREE', detail)
+
+    def test_fan_out_followers(self):
+        followers = UserInterest.objects.filter(interest=self.interest).exclude(user=self.author)
+        for detail in explain(str(followers.values('user_id').query)):
+            self.assertNotRegex(detail, r'^SCAN user_interests$')
+
+
+class BlobReferenceTests(TestCase):
+    """
+    Every row pointing at a stored file holds one reference to its blob, and
+    the file goes when the last reference is released, however the rows are
+    deleted.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVES_ASYNC=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+
+    def create_post(self, content=b'GIF89a same bytes'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                user=self.user, title='Photo', content='Photo', image=ContentFile(content, name='photo.gif')
+            )
+
+    def blob(self, name):
+        return MediaBlob.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def assertStored(self, name, references):
+        self.assertEqual(self.blob(name), references)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+    def assertReleased(self, name):
+        self.assertIsNone(self.blob(name))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
+
+    def test_identical_uploads_share_a_blob(self):
+        first, second = self.create_post(), self.create_post()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertStored(first.image.name, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete(hard_delete=True)
+        self.assertStored(second.image.name, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete(hard_delete=True)
+        self.assertReleased(second.image.name)
+
+    def test_soft_delete_keeps_the_reference(self):
+        post = self.create_post()
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertStored(post.image.name, 1)
+
+    def test_cascades_release_references(self):
+        post = self.create_post()
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(
+                user=self.user, post=post, content='Reply', image=ContentFile(b'GIF89a reply', name='reply.gif')
+            )
+            upload = UserFile.objects.create(
+                user=self.user, file_type='other', file=ContentFile(b'notes', name='notes.txt'),
+                original_filename='notes.txt', size=5
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        for name in (post.image.name, comment.image.name, upload.file.name):
+            self.assertReleased(name)
+
+    def test_replacing_releases_the_old_file(self):
+        post = self.create_post()
+        old_name = post.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.image = ContentFile(b'GIF89a other bytes', name='photo.gif')
+            post.save()
+        self.assertReleased(old_name)
+        self.assertStored(post.image.name, 1)
+
+    def test_new_reference_after_release_restores_the_file(self):
+        post = self.create_post()
+        name = post.image.name
+        # Released but not yet unlinked: a new upload of the same bytes must keep the file
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            post.delete(hard_delete=True)
+        again = self.create_post()
+        for callback in callbacks:
+            callback()
+        self.assertEqual(again.image.name, name)
+        self.assertStored(name, 1)
+
+
+class ParseRangeTests(unittest.TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        # Ends past the file are cut to its size
+        self.assertEqual(parse_range('bytes=500-5000', 1000), (500, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=5-1', 'bytes=0-1,5-9', 'items=0-1'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable(self):
+        self.assertIs(parse_range('bytes=1000-', 1000), False)
+        self.assertIs(parse_range('bytes=-0', 1000), False)
+
+
+class MediaViewTests(TestCase):
+    """Media needs a signed-in user, and CVs go only to their owner and to companies."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='candidate', email='candidate@example.com', password='pass')
+        cls.other = User.objects.create_user(username='someone', email='someone@example.com', password='pass')
+        cls.company = User.objects.create_user(
+            username='company', email='company@example.com', password='pass', user_type='Company'
+        )
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_REQUIRE_AUTH=True, MEDIA_SENDFILE=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.details = UserDetails.objects.create(
+                user=self.owner, cv_file=ContentFile(b'%PDF-1.4 the cv', name='cv.pdf')
+            )
+            self.post = Post.objects.create(
+                user=self.owner, title='Photo', content='Photo', image=ContentFile(bytes(range(256)), name='photo.gif')
+            )
+        self.client = Client()
+
+    def get(self, name, user=None, **headers):
+        if user is not None:
+            self.client.force_login(user)
+        return self.client.get(f'/media/{name}', **headers)
+
+    def test_signed_in_users_only(self):
+        self.assertEqual(self.get(self.post.image.name).status_code, 404)
+        response = self.get(self.post.image.name, self.other)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_bearer_token(self):
+        token = AccessToken.for_user(self.other)
+        response = self.get(self.post.image.name, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cv_owner_and_companies_only(self):
+        name = self.details.cv_file.name
+        self.assertEqual(self.get(name, self.other).status_code, 404)
+        with override_settings(MEDIA_REQUIRE_AUTH=False):
+            self.client.logout()
+            self.assertEqual(self.get(name).status_code, 404)
+        self.assertEqual(self.get(name, self.owner).status_code, 200)
+        self.assertEqual(self.get(name, self.company).status_code, 200)
+
+    def test_signed_cv_url(self):
+        url = signed_url(self.details.cv_file)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url[:-1] + ('A' if url[-1] != 'A' else 'B')).status_code, 404)
+        # A signature is good for its own file only
+        signature = url.split('?sig=')[1]
+        self.assertEqual(self.get(f'{self.post.image.name}?sig={signature}').status_code, 404)
+        with override_settings(MEDIA_SIGNED_URL_MAX_AGE=-1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_profile_etag_follows_signed_cv_url(self):
+        client = APIClient()
+        url = reverse('public-profile', args=['candidate'])
+        with override_settings(MEDIA_SIGNED_URL_MAX_AGE=100), mock.patch('core.utils.media_urls.time.time') as now:
+            now.return_value = 1000
+            client.force_authenticate(self.company)
+            response = client.get(url)
+            cv_url, etag = response.data['cv_url'], response['ETag']
+            self.assertIsNotNone(cv_url)
+            now.return_value = 1049
+            self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # A new signing period gets a new URL, still valid for half the max age
+            now.return_value = 1050
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.data['cv_url'], cv_url)
+            client.force_authenticate(self.other)
+            response = client.get(url)
+            self.assertIsNone(response.data['cv_url'])
+
+    def test_hidden_files_after_normalization(self):
+        os.makedirs(os.path.join(self.media_root, 'blobs', 'tmp'), exist_ok=True)
+        with open(os.path.join(self.media_root, 'blobs', 'tmp', 'partial'), 'wb') as f:
+            f.write(b'half written')
+        for name in ('blobs/tmp/partial', 'blobs//tmp/partial', 'blobs/./tmp/partial', 'blobs/x/../tmp/partial'):
+            self.assertEqual(self.get(name, self.owner).status_code, 404, name)
+
+    def test_byte_ranges(self):
+        name = self.post.image.name
+        response = self.get(name, self.other, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/256')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        response = self.get(name, self.other, HTTP_RANGE='bytes=300-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */256')
+        # A stale If-Range gets the whole file
+        response = self.get(name, self.other, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 256)
+
+
+class SkillMatcherTests(unittest.TestCase):
+    """Skills match whole words only, ignoring case and runs of whitespace."""
+
+    def setUp(self):
+        self.matcher = SkillMatcher([
+            ('Java', 1), ('JavaScript', 2), ('js', 2), ('Go', 3), ('C++', 4), ('.NET', 5), ('machine learning', 6),
+        ])
+
+    def test_word_boundaries(self):
+        self.assertEqual(self.matcher.find('JavaScript and Java'), Counter({2: 1, 1: 1}))
+        self.assertEqual(self.matcher.find('good golang'), Counter())
+        self.assertEqual(self.matcher.find('Go, go!'), Counter({3: 2}))
+        self.assertEqual(self.matcher.find('node.js'), Counter({2: 1}))
+
+    def test_symbols_and_whitespace(self):
+        self.assertEqual(self.matcher.find('C++/.NET'), Counter({4: 1, 5: 1}))
+        self.assertEqual(self.matcher.find('Machine\n  Learning'), Counter({6: 1}))
+        self.assertEqual(self.matcher.lookup(' JS '), 2)
+
+
+class SkillVersionTests(TestCase):
+    """Matchers rebuild after any change to the Skill table, including bulk deletes."""
+
+    def test_rebuilds_after_changes(self):
+        python = Skill.objects.create(name='Python')
+        rust = Skill.objects.create(name='Rust')
+        self.assertEqual(get_matcher().find('python and rust'), Counter({python.pk: 1, rust.pk: 1}))
+        # As the admin's "delete selected" does, without Skill.delete()
+        Skill.objects.filter(name='Rust').delete()
+        self.assertEqual(get_matcher().find('python and rust'), Counter({python.pk: 1}))
+        python.aliases = ['py']
+        python.save()
+        self.assertEqual(get_matcher().find('py'), Counter({python.pk: 1}))
+
+
+@unittest.skipUnless(similar_candidates.SIMILAR_SUPPORT, 'Similar candidates need NumPy')
+class SimilarCandidatesViewTests(TestCase):
+    """A small index still answers with the default probes; explicit values are checked."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = User.objects.create_user(
+            username='company', email='company@example.com', password='pass', user_type='Company'
+        )
+        cls.profiles = [
+            UserDetails.objects.create(
+                user=User.objects.create_user(username=f'dev{i}', email=f'dev{i}@example.com', password='pass'),
+                cv_file=f'cvs/dev{i}.pdf', cv_text=f'python django developer {"rust" if i % 2 else "go"}',
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        settings_override = override_settings(SIMILAR_CANDIDATES_INDEX_DIR=index_dir, SIMILAR_CANDIDATES_PROBES=8)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        rows = similar_candidates.profile_rows([(p.id, p.user_id, p.cv_text) for p in self.profiles])
+        similar_candidates.write_index(similar_candidates.IVFIndex.build(*similar_candidates.vectorize_rows(rows)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.company)
+        self.url = reverse('similar-candidates', args=['dev0'])
+
+    def test_default_probes_capped_at_lists(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['probes'], response.data['lists'])
+        self.assertEqual(response.data['results'][0]['username'], 'dev2')
+
+    def test_explicit_probes_out_of_range(self):
+        self.assertEqual(self.client.get(self.url, {'probes': 8}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'probes': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'probes': 1}).status_code, 200)
+
+
+@unittest.skipUnless(cv_match.MATCH_SUPPORT, 'CV matching needs NumPy and SciPy')
+class CVMatchIndexTests(unittest.TestCase):
+    """Updates swap in a new snapshot; queries holding the old one are unaffected."""
+
+    def test_update_swaps_snapshot(self):
+        index = cv_match.CVMatchIndex.build([(1, 'python django'), (2, 'rust embedded')], timezone.now())
+        before = index.snapshot
+        index.update({1: None, 3: 'python flask'})
+        self.assertEqual(index.snapshot[0].tolist(), [0, 1])
+        self.assertEqual(before[0].tolist(), [1, 1])
+        self.assertEqual([pk for pk, _ in index.top('python', 5)], [3])
+        self.assertEqual(len(index), 2)
+        # A term new since the build is only in the delta
+        self.assertEqual([pk for pk, _ in index.top('flask', 5)], [3])
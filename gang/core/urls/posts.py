@@ -3,6 +3,8 @@
 from django.urls import path
 from core.views.posts import (
     PostListCreateView,
+    FeedCacheStatsView,
+    ForYouPostListView,
     PostDetailView,
     UserPostListView,
     CommentListCreateView,
@@ -12,6 +14,7 @@ from core.views.posts import (
     PostRestoreView,
     SearchPostView,
     CommentDetailView,
+    CommentThreadView,
     CommentHardDeleteView,
     DeletedCommentListView,
     CommentRestoreView,
@@ -23,6 +26,8 @@ from core.views.posts import (
 urlpatterns = [
     # Post endpoints
     path('posts/', PostListCreateView.as_view(), name='post-list-create'),
+    path('posts/for-you/', ForYouPostListView.as_view(), name='for-you-posts'),
+    path('posts/cache-stats/', FeedCacheStatsView.as_view(), name='feed-cache-stats'),
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('posts/user/<str:username>/', UserPostListView.as_view(), name='user-posts'),
     path('posts/search/', SearchPostView.as_view(), name='search-posts'),
@@ -36,6 +41,7 @@ urlpatterns = [
     
     # Comment endpoints
     path('comments/<int:pk>/', CommentDetailView.as_view(), name='comment-detail'),
+    path('comments/<int:pk>/thread/', CommentThreadView.as_view(), name='comment-thread'),
     path('comments/user/<str:username>/', UserCommentListView.as_view(), name='user-comments'),
     path('comments/deleted/', DeletedCommentListView.as_view(), name='deleted-comments'),
     path('comments/<int:pk>/restore/', CommentRestoreView.as_view(), name='restore-comment'),
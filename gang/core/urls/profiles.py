@@ -4,13 +4,27 @@ from django.urls import path
 from core.views.profiles import (
     UserProfileView,
     PublicUserProfileView,
-    CVSearchView
+    CVSearchView,
+    CVMatchView,
+    SimilarCandidatesView
+)
+from core.views.files import (
+    FileUploadView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadChunkView,
+    UploadSessionCompleteView
 )
-from core.views.files import FileUploadView
 
 urlpatterns = [
     path('me/', UserProfileView.as_view(), name='user-profile'),
     path('users/<str:username>/', PublicUserProfileView.as_view(), name='public-profile'),
+    path('users/<str:username>/similar/', SimilarCandidatesView.as_view(), name='similar-candidates'),
     path('cv-search/', CVSearchView.as_view(), name='cv-search'),
+    path('cv-match/', CVMatchView.as_view(), name='cv-match'),
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
 ] 
\ No newline at end of file
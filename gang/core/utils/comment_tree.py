@@ -0,0 +1,103 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Q
+from core.models.comments import Comment, thread_path_upper_bound
+
+
+def get_thread_depth(request):
+    """Reply depth requested with ?depth=, clamped to the configured maximum."""
+    default_depth = getattr(settings, 'COMMENT_THREAD_DEPTH', 5)
+    max_depth = getattr(settings, 'COMMENT_THREAD_MAX_DEPTH', 20)
+    try:
+        depth = int(request.query_params['depth'])
+    except (KeyError, ValueError):
+        return default_depth
+    return max(0, min(depth, max_depth))
+
+
+class CommentTree:
+    """
+    Non-deleted comments for a set of posts or threads, fetched up front and
+    grouped by parent in memory.
+
+    Pass it to PostSerializer / CommentSerializer as context['comment_tree']
+    so nested comments and replies are read from here instead of being queried
+    per post and per comment.
+    """
+
+    def __init__(self, comments, truncated=()):
+        self._roots = defaultdict(list)
+        self._replies = defaultdict(list)
+        # Comments at the depth limit that still have replies we did not fetch
+        self._truncated = set(truncated)
+        for comment in comments:
+            if comment.parent_comment_id is None:
+                self._roots[comment.post_id].append(comment)
+            else:
+                self._replies[comment.parent_comment_id].append(comment)
+        # Comments arrive oldest first; top-level comments are shown newest first
+        for roots in self._roots.values():
+            roots.reverse()
+
+    @classmethod
+    def for_posts(cls, post_ids, depth):
+        """All threads of the given posts, down to `depth` reply levels."""
+        comments = list(
+            Comment.objects.filter(
+                post_id__in=list(post_ids),
+                is_deleted=False,
+                depth__lte=depth
+            ).select_related('user')
+        )
+        # Sorted here: across several posts an ORDER BY cannot follow the index
+        comments.sort(key=lambda comment: (comment.created_at, comment.id))
+        # reply_count tells which comments at the limit have replies we left out
+        truncated = [
+            comment.id for comment in comments
+            if comment.depth == depth and comment.reply_count
+        ]
+        return cls(comments, truncated)
+
+    @classmethod
+    def for_threads(cls, comments, depth):
+        """
+        Replies under the given comments, down to `depth` levels below each.
+
+        Each subtree is one range scan on the thread_path index. Branches cut
+        off at the depth limit are reported by is_truncated().
+        """
+        comments = list(comments)
+        if not comments:
+            return cls([])
+
+        subtrees = Q()
+        for comment in comments:
+            subtrees |= Q(
+                thread_path__gt=comment.thread_path,
+                thread_path__lt=thread_path_upper_bound(comment.thread_path),
+                depth__lte=comment.depth + depth,
+            )
+        replies = list(
+            Comment.objects.filter(subtrees, is_deleted=False)
+            .select_related('user')
+            .order_by('thread_path')
+        )
+
+        limits = {comment.id: comment.depth + depth for comment in comments}
+        truncated = [comment.id for comment in comments if depth == 0 and comment.reply_count]
+        for reply in replies:
+            ancestor_ids = [int(segment) for segment in reply.thread_path.split('/')[:-2]]
+            # The closest requested ancestor allows the deepest branch
+            limit = next(limits[a] for a in reversed(ancestor_ids) if a in limits)
+            if reply.depth >= limit and reply.reply_count:
+                truncated.append(reply.id)
+        return cls(replies, truncated)
+
+    def roots(self, post_id):
+        return self._roots.get(post_id, [])
+
+    def replies(self, comment_id):
+        return self._replies.get(comment_id, [])
+
+    def is_truncated(self, comment_id):
+        return comment_id in self._truncated
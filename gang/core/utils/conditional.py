@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Strong ETag over the values a response is built from."""
+    raw = '|'.join(str(part) for part in parts).encode('utf-8')
+    return quote_etag(hashlib.md5(raw).hexdigest())
+
+
+def queryset_state(queryset):
+    """
+    (row count, newest updated_at) of a queryset, read with one aggregate
+    query instead of loading the rows.
+    """
+    state = queryset.order_by().aggregate(count=Count('id'), updated=Max('updated_at'))
+    return state['count'], state['updated']
+
+
+def row_state(queryset, *fields):
+    """Values of `fields` for the first row of queryset, or () when it is empty."""
+    rows = list(queryset.values_list(*fields)[:1])
+    return rows[0] if rows else ()
+
+
+class ConditionalGetMixin:
+    """
+    Answer GETs with 304 Not Modified while the client's If-None-Match /
+    If-Modified-Since validators are still current.
+
+    Views implement get_validator_state(), returning the cheap values (update
+    timestamps, counters) their response is built from, read without loading
+    or serializing the objects themselves. The ETag hashes them together with
+    the URL, user and format; Last-Modified is the newest timestamp among them,
+    unless get_last_modified() says otherwise.
+    """
+
+    def get_validator_state(self):
+        raise NotImplementedError('Views using ConditionalGetMixin must implement get_validator_state()')
+
+    def get_last_modified(self, state):
+        """Newest timestamp in the validator state as a Unix time, or None to send no Last-Modified."""
+        timestamps = [value for value in state if isinstance(value, datetime)]
+        return int(max(timestamps).timestamp()) if timestamps else None
+
+    def get(self, request, *args, **kwargs):
+        state = self.get_validator_state()
+        etag = make_etag(
+            request.get_full_path(), request.user.pk, request.accepted_renderer.format, *state
+        )
+        last_modified = self.get_last_modified(state)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep the body but must revalidate before reusing it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
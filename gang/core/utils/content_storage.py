@@ -0,0 +1,189 @@
+import os
+import hashlib
+import tempfile
+from functools import partial
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(digest, ext):
+    # Two levels of two hex characters keep directories small: blobs/3f/a2/3fa2...c9.png
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return name.startswith(f'{BLOB_PREFIX}/')
+
+
+def content_hash(storage, name):
+    """SHA-256 hex digest of a stored file; free for blobs, whose name is the digest."""
+    if is_blob(name):
+        return os.path.splitext(os.path.basename(name))[0]
+    digest = hashlib.sha256()
+    with storage.open(name, 'rb') as f:
+        for chunk in f.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps each distinct file once.
+
+    Uploads are hashed (SHA-256) while they are streamed to disk and stored
+    under blobs/<aa>/<bb>/<digest><ext>; the name asked for by upload_to only
+    contributes the extension. Every save() adds a reference to the blob's
+    MediaBlob row and every delete() drops one, so the file is only removed
+    when nothing points at it any more. Names stored before this storage was
+    introduced are read and deleted as plain files.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content, so the requested one never needs a suffix
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large uploads, assembled chunked uploads): hash it and move it into place
+            return self._store(ext, content.temporary_file_path(), *self._hash(content), move=True)
+
+        temp_dir = self.path(f'{BLOB_PREFIX}/tmp')
+        self._makedirs(temp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            return self._store(ext, temp_path, digest, size)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _hash(self, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        return digest, size
+
+    def _store(self, ext, path, digest, size, move=False):
+        """
+        Put the file at `path` in place as the blob for `digest` unless an
+        identical one is stored already, and add a reference to it. A file
+        that is not moved is left for its owner to clean up.
+        """
+        name = blob_name(digest.hexdigest(), ext)
+        full_path = self.path(name)
+        with transaction.atomic():
+            # The reference is taken first and holds the row's write lock, so a concurrent
+            # _delete_unreferenced either finishes before the check below or leaves the file alone
+            self._add_reference(name, size)
+            if not os.path.exists(full_path):
+                self._makedirs(os.path.dirname(full_path))
+                if move:
+                    # Copies instead when the file lives on another file system
+                    file_move_safe(path, full_path, allow_overwrite=True)
+                else:
+                    os.replace(path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+    def _add_reference(self, name, size):
+        MediaBlob = apps.get_model('core', 'MediaBlob')
+        if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, size=size, ref_count=1)
+        except IntegrityError:
+            # Created by a concurrent upload of the same content
+            MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        if not is_blob(name):
+            return super().delete(name)
+        MediaBlob = apps.get_model('core', 'MediaBlob')
+        MediaBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        # The file only goes once the release is committed, and only if nothing took a reference since
+        transaction.on_commit(partial(self._delete_unreferenced, name))
+
+    def _delete_unreferenced(self, name):
+        MediaBlob = apps.get_model('core', 'MediaBlob')
+        with transaction.atomic():
+            # Deleting the row holds its write lock until the file is gone, so a concurrent
+            # _store adds its reference (and puts the file back) only afterwards
+            if MediaBlob.objects.filter(name=name, ref_count=0).delete()[0]:
+                super().delete(name)
+
+
+def replaced_files(instance, *field_names):
+    """
+    (storage, stored name) of the files on instance that are about to be
+    replaced by new uploads. Call before saving; only fields holding an
+    uncommitted upload cost a query.
+    """
+    uploads = [
+        field_name for field_name in field_names
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+    if instance.pk is None or not uploads:
+        return []
+    row = type(instance)._base_manager.filter(pk=instance.pk).values(*uploads).first()
+    if row is None:
+        return []
+    return [
+        (instance._meta.get_field(field_name).storage, row[field_name])
+        for field_name in uploads if row[field_name]
+    ]
+
+
+def release_on_commit(files):
+    """Drop the references to (storage, name) pairs once the current transaction commits."""
+    for storage, name in files:
+        transaction.on_commit(partial(storage.delete, name))
+
+
+def stored_files(instance):
+    """(storage, stored name) of every file a row references: its file fields and their derivatives."""
+    files = []
+    for field in instance._meta.concrete_fields:
+        if not isinstance(field, models.FileField):
+            continue
+        name = getattr(instance, field.attname).name
+        if name:
+            files.append((field.storage, name))
+        variants = getattr(instance, f'{field.name}_variants', None) or {}
+        files.extend((field.storage, variant) for size, variant in variants.items() if size != 'source')
+    return files
+
+
+def release_stored_files(sender, instance, **kwargs):
+    """
+    post_delete receiver for models with stored files: hard deletes, bulk
+    deletes and cascades all drop the row's references once they commit.
+    """
+    release_on_commit(stored_files(instance))
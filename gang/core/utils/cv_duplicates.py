@@ -0,0 +1,129 @@
+import zlib
+import hashlib
+import logging
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from core.utils.cv_match import TOKEN_RE
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    DUPLICATES_SUPPORT = True
+except ImportError:
+    DUPLICATES_SUPPORT = False
+    logger.warning("NumPy not installed. Near-duplicate CV detection will not be available.")
+
+# Signatures of NUM_PERMUTATIONS minimums, split into BANDS bands of ROWS values. Two CVs
+# share a band, and get compared, with probability 1 - (1 - J^ROWS)^BANDS for a Jaccard
+# similarity J of their shingles: ~0.98 at J = 0.8, ~0.08 at J = 0.5.
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+# Shingles are runs of this many words
+SHINGLE_WORDS = 3
+
+if DUPLICATES_SUPPORT:
+    # Multiply-shift hash functions: the high 32 bits of a * x + b (mod 2**64), a odd
+    _rng = np.random.default_rng(20261018)
+    _A = _rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    _B = _rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text):
+    words = TOKEN_RE.findall((text or '').lower())
+    if len(words) < SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """MinHash signature of text as bytes, or None for text without words."""
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles(text)), dtype=np.uint64)
+    if not len(hashes):
+        return None
+    # Overflow is the modulo
+    with np.errstate(over='ignore'):
+        values = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype('<u4').tobytes()
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the shingles behind two signatures."""
+    return float(np.mean(np.frombuffer(first, dtype='<u4') == np.frombuffer(second, dtype='<u4')))
+
+
+def buckets(minhash):
+    """(band, bucket) of each band of a signature."""
+    size = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(minhash[band * size:(band + 1) * size], digest_size=8).digest(),
+                              'little', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def candidates(minhash, exclude):
+    """(id, cv_minhash, cv_cluster_id) of the profiles sharing a band with a signature."""
+    UserDetails = apps.get_model('core', 'UserDetails')
+    CVSignatureBand = apps.get_model('core', 'CVSignatureBand')
+    condition = Q()
+    for band, bucket in buckets(minhash):
+        condition |= Q(band=band, bucket=bucket)
+    # One lookup on the (band, bucket) index per band
+    profile_ids = CVSignatureBand.objects.filter(condition).exclude(user_details_id=exclude).values('user_details_id')
+    return UserDetails.objects.filter(pk__in=profile_ids).values_list('id', 'cv_minhash', 'cv_cluster_id')
+
+
+def update_duplicates(texts):
+    """
+    Sign the new CV texts of some profiles (texts maps profile id to
+    cv_text) and put each in the cluster of its near-duplicates, those with
+    an estimated similarity of at least CV_DUPLICATE_THRESHOLD among the CVs
+    sharing an LSH band with it. A CV that joins several clusters merges
+    them. A cluster's id is its lowest profile id. Every CV is compared
+    with its candidates only, never with all CVs.
+    """
+    if not DUPLICATES_SUPPORT or not texts:
+        return
+    UserDetails = apps.get_model('core', 'UserDetails')
+    CVSignatureBand = apps.get_model('core', 'CVSignatureBand')
+    threshold = getattr(settings, 'CV_DUPLICATE_THRESHOLD', 0.8)
+    with transaction.atomic():
+        previous = dict(UserDetails.objects.filter(pk__in=texts).values_list('id', 'cv_cluster_id'))
+        CVSignatureBand.objects.filter(user_details_id__in=texts).delete()
+        # One profile after the other, so duplicates within texts find each other
+        for profile_id, text in texts.items():
+            if profile_id not in previous:
+                continue
+            if previous[profile_id] == profile_id:
+                # The rest of its cluster keeps together; this CV joins it again below if still similar
+                reroot(profile_id)
+            minhash = signature(text)
+            cluster = None
+            if minhash is not None:
+                clusters = {
+                    other_cluster or other_id
+                    for other_id, other_minhash, other_cluster in candidates(minhash, profile_id)
+                    if other_minhash is not None and similarity(minhash, bytes(other_minhash)) >= threshold
+                }
+                cluster = min(clusters | {profile_id})
+                merged = clusters - {cluster}
+                if merged:
+                    UserDetails.objects.filter(cv_cluster_id__in=merged).update(cv_cluster_id=cluster)
+                CVSignatureBand.objects.bulk_create([
+                    CVSignatureBand(user_details_id=profile_id, band=band, bucket=bucket)
+                    for band, bucket in buckets(minhash)
+                ])
+            UserDetails.objects.filter(pk=profile_id).update(cv_minhash=minhash, cv_cluster_id=cluster)
+
+
+def reroot(cluster):
+    """Give the rest of a cluster whose first profile left it the id of its next one."""
+    UserDetails = apps.get_model('core', 'UserDetails')
+    members = UserDetails.objects.filter(cv_cluster_id=cluster).exclude(pk=cluster)
+    first = members.order_by('pk').values_list('pk', flat=True).first()
+    if first is not None:
+        members.update(cv_cluster_id=first)
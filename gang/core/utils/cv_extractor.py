@@ -1,5 +1,9 @@
+import re
+import time
 import logging
-from typing import Optional
+import unicodedata
+from typing import Iterable, Iterator, Optional
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -13,59 +17,183 @@ except ImportError:
 
 try:
     import docx
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
     DOCX_SUPPORT = True
 except ImportError:
     DOCX_SUPPORT = False
     logger.warning("python-docx not installed. DOCX extraction will not be available.")
 
-def extract_text_from_pdf(file) -> str:
+# CV formats extract_cv_text() reads
+SUPPORTED_EXTENSIONS = ('.pdf', '.doc', '.docx')
+
+# Bump when extraction changes, so `reextract_cv_texts` parses every CV again
+EXTRACTOR_VERSION = 3
+
+
+class CVExtractionError(Exception):
+    """A CV that could not be read; raised instead of returning "" when asked for with raise_errors."""
+
+# Soft hyphens, zero-width spaces and joiners, byte order marks
+INVISIBLE_CHARACTERS = dict.fromkeys(map(ord, '\u00ad\u200b\u200c\u200d\u2060\ufeff'))
+SPACES_RE = re.compile(r'[^\S\n]+')
+LINE_EDGES_RE = re.compile(r' ?\n ?')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def normalize_text(text: str) -> str:
+    """
+    NFKC-normalize (splits ligatures such as 'ﬁ', folds full-width letters
+    and non-breaking spaces), drop invisible characters and collapse runs of
+    whitespace, keeping at most one blank line in a row.
+    """
+    text = unicodedata.normalize('NFKC', text).translate(INVISIBLE_CHARACTERS)
+    text = SPACES_RE.sub(' ', text.replace('\r\n', '\n').replace('\r', '\n'))
+    return BLANK_LINES_RE.sub('\n\n', LINE_EDGES_RE.sub('\n', text)).strip()
+
+
+def collect_text(chunks: Iterable[str], source: str, max_chars: int, time_limit: float) -> str:
+    """
+    Join normalized chunks (pages, paragraphs, table rows) until the text
+    reaches max_chars or time_limit seconds have passed; whatever was read by
+    then is returned. The time limit is checked between chunks, so a single
+    pathological page can still overrun it; the extraction worker's
+    CV_EXTRACTION_TIMEOUT is the hard limit.
+    """
+    deadline = time.monotonic() + time_limit
+    parts = []
+    length = 0
+    truncated = None
+    for chunk in chunks:
+        chunk = normalize_text(chunk) if chunk else ''
+        if chunk:
+            if length + len(chunk) > max_chars:
+                if length < max_chars:
+                    parts.append(chunk[:max_chars - length])
+                length = max_chars
+                truncated = f'{max_chars} characters'
+                break
+            parts.append(chunk)
+            length += len(chunk) + 1
+        if time.monotonic() > deadline:
+            truncated = f'{time_limit}s'
+            break
+    if truncated:
+        logger.warning(f"Stopped extracting {source} after {truncated}")
+    text = '\n'.join(parts)
+    logger.debug(f"Extracted {len(text)} chars from {source}")
+    return text
+
+
+def iter_pdf_pages(file, max_pages: int) -> Iterator[str]:
+    """Text of each page in turn, up to max_pages; nothing past the last page read is parsed."""
+    reader = PyPDF2.PdfReader(file)
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        logger.warning(f"Only reading the first {max_pages} of {page_count} pages of {getattr(file, 'name', file)}")
+    for index in range(min(page_count, max_pages)):
+        yield reader.pages[index].extract_text() or ''
+
+
+def iter_docx_blocks(file, tables: bool = True, headers: bool = True) -> Iterator[str]:
+    """
+    Paragraphs and, optionally, table rows (one line per row) in
+    document order, preceded by the text of the section headers and
+    followed by that of the footers.
+    """
+    document = docx.Document(file)
+    if headers:
+        for section in document.sections:
+            for paragraph in section.header.paragraphs:
+                yield paragraph.text
+    for child in document.element.body.iterchildren():
+        if child.tag == qn('w:p'):
+            yield Paragraph(child, document).text
+        elif child.tag == qn('w:tbl') and tables:
+            for row in Table(child, document).rows:
+                cells = []
+                for cell in row.cells:
+                    # Merged cells are repeated once per grid column they span
+                    if not cells or cell._tc is not cells[-1]._tc:
+                        cells.append(cell)
+                yield ' '.join(cell.text for cell in cells)
+    if headers:
+        for section in document.sections:
+            for paragraph in section.footer.paragraphs:
+                yield paragraph.text
+
+
+def extraction_limits(max_pages=None, max_chars=None, time_limit=None):
+    return (
+        max_pages if max_pages is not None else getattr(settings, 'CV_EXTRACTION_MAX_PAGES', 30),
+        max_chars if max_chars is not None else getattr(settings, 'CV_EXTRACTION_MAX_CHARS', 100000),
+        time_limit if time_limit is not None else getattr(settings, 'CV_EXTRACTION_TIME_LIMIT', 20),
+    )
+
+
+def unreadable(message: str, raise_errors: bool) -> str:
+    if raise_errors:
+        raise CVExtractionError(message)
+    logger.warning(message)
+    return ""
+
+
+def extract_text_from_pdf(file, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                          time_limit: Optional[float] = None, raise_errors: bool = False) -> str:
     """Extract text from a PDF file."""
     if not PDF_SUPPORT:
-        logger.warning("PDF extraction not available - PyPDF2 not installed")
-        return ""
+        return unreadable("PDF extraction not available - PyPDF2 not installed", raise_errors)
+    max_pages, max_chars, time_limit = extraction_limits(max_pages, max_chars, time_limit)
+    source = getattr(file, 'name', str(file))
     try:
-        logger.info(f"Starting PDF extraction for file: {getattr(file, 'name', str(file))}")
-        pdf_reader = PyPDF2.PdfReader(file)
-        text = ""
-        for i, page in enumerate(pdf_reader.pages):
-            page_text = page.extract_text()
-            logger.info(f"Extracted {len(page_text) if page_text else 0} chars from page {i}")
-            if page_text:
-                text += page_text + "\n"
-        logger.info(f"Total extracted text length: {len(text)}")
-        logger.info(f"Sample extracted text: {text[:200]}")
-        return text
+        return collect_text(iter_pdf_pages(file, max_pages), source, max_chars, time_limit)
     except Exception as e:
+        if raise_errors:
+            raise CVExtractionError(f"Error extracting text from PDF: {str(e)}") from e
         logger.error(f"Error extracting text from PDF: {str(e)}")
         return ""
 
-def extract_text_from_docx(file) -> str:
-    """Extract text from a DOCX file."""
+
+def extract_text_from_docx(file, max_chars: Optional[int] = None, time_limit: Optional[float] = None,
+                           raise_errors: bool = False) -> str:
+    """Extract text from a DOCX file, with tables and headers as CV_EXTRACTION_DOCX_TABLES/HEADERS say."""
     if not DOCX_SUPPORT:
-        logger.warning("DOCX extraction not available - python-docx not installed")
-        return ""
+        return unreadable("DOCX extraction not available - python-docx not installed", raise_errors)
+    _, max_chars, time_limit = extraction_limits(None, max_chars, time_limit)
+    source = getattr(file, 'name', str(file))
     try:
-        logger.info(f"Starting DOCX extraction for file: {getattr(file, 'name', str(file))}")
-        doc = docx.Document(file)
-        text = ""
-        for i, paragraph in enumerate(doc.paragraphs):
-            logger.info(f"Extracted {len(paragraph.text)} chars from paragraph {i}")
-            text += paragraph.text + "\n"
-        logger.info(f"Total extracted text length: {len(text)}")
-        logger.info(f"Sample extracted text: {text[:200]}")
-        return text
+        blocks = iter_docx_blocks(
+            file,
+            tables=getattr(settings, 'CV_EXTRACTION_DOCX_TABLES', True),
+            headers=getattr(settings, 'CV_EXTRACTION_DOCX_HEADERS', True),
+        )
+        return collect_text(blocks, source, max_chars, time_limit)
     except Exception as e:
+        if raise_errors:
+            raise CVExtractionError(f"Error extracting text from DOCX: {str(e)}") from e
         logger.error(f"Error extracting text from DOCX: {str(e)}")
         return ""
 
-def extract_cv_text(file) -> str:
-    """Extract text from a CV file (PDF or DOCX)."""
+
+def extract_cv_text(file, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                    time_limit: Optional[float] = None, raise_errors: bool = False) -> str:
+    """
+    Extract normalized text from a CV file (PDF or DOCX), reading at most
+    CV_EXTRACTION_MAX_PAGES pages, CV_EXTRACTION_MAX_CHARS characters and
+    for CV_EXTRACTION_TIME_LIMIT seconds unless other limits are given.
+
+    Unreadable files (corrupt, legacy .doc, or a format whose library is
+    missing) give "" or, with raise_errors, a CVExtractionError.
+    """
     filename = file.name.lower()
-    
+
     if filename.endswith('.pdf'):
-        return extract_text_from_pdf(file)
-    elif filename.endswith(('.doc', '.docx')):
-        return extract_text_from_docx(file)
+        return extract_text_from_pdf(file, max_pages, max_chars, time_limit, raise_errors)
+    elif filename.endswith('.docx'):
+        return extract_text_from_docx(file, max_chars, time_limit, raise_errors)
+    elif filename.endswith('.doc'):
+        # Word 97-2003 files are OLE2 containers, which python-docx cannot open
+        return unreadable("Legacy .doc files cannot be read; upload the CV as DOCX or PDF", raise_errors)
     else:
-        logger.warning(f"Unsupported file type: {filename}")
-        return "" 
\ No newline at end of file
+        return unreadable(f"Unsupported file type: {filename}", raise_errors)
@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+from datetime import timedelta
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from core.utils.content_storage import content_hash
+from core.utils.skill_extractor import update_user_skills
+from core.utils.cv_duplicates import update_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+def get_job_model():
+    return apps.get_model('core', 'CVExtractionJob')
+
+
+def queue_cv_extraction(user_details):
+    """
+    Queue text extraction for the CV just saved on user_details, replacing
+    any job still waiting for an older file. With CV_EXTRACTION_ASYNC off
+    the text is extracted once the current transaction commits.
+    """
+    CVExtractionJob = get_job_model()
+    CVExtractionJob.objects.filter(user_details=user_details, status=CVExtractionJob.PENDING).delete()
+    job = CVExtractionJob.objects.create(
+        user_details=user_details, cv_file=user_details.cv_file.name, run_after=timezone.now()
+    )
+    if not getattr(settings, 'CV_EXTRACTION_ASYNC', True):
+        transaction.on_commit(lambda: run_inline(job.pk))
+    return job
+
+
+def run_inline(job_id):
+    job = claim(job_id)
+    if job is None:
+        return
+    text = extracted_text(job)
+    if text is not None:
+        complete(job, text)
+        return
+    try:
+        with default_storage.open(job.cv_file, 'rb') as f:
+            text = extract(f)
+    except Exception as e:
+        fail(job, f'{type(e).__name__}: {str(e)}')
+    else:
+        complete(job, text)
+
+
+def extract(file):
+    # Imported here, so the optional parser libraries only load where text is extracted.
+    # Unreadable CVs raise, so their job fails instead of completing with no text.
+    from core.utils.cv_extractor import extract_cv_text
+    return extract_cv_text(file, raise_errors=True)
+
+
+def set_details_status(job, status, **fields):
+    # Only while the profile still holds the CV this job was queued for
+    UserDetails = apps.get_model('core', 'UserDetails')
+    return UserDetails.objects.filter(pk=job.user_details_id, cv_file=job.cv_file).update(
+        cv_extraction_status=status, updated_at=timezone.now(), **fields
+    )
+
+
+def claim(job_id):
+    """Mark a pending job as running; None if another worker got it first."""
+    CVExtractionJob = get_job_model()
+    now = timezone.now()
+    claimed = CVExtractionJob.objects.filter(pk=job_id, status=CVExtractionJob.PENDING).update(
+        status=CVExtractionJob.RUNNING, locked_at=now, attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return None
+    job = CVExtractionJob.objects.get(pk=job_id)
+    set_details_status(job, CVExtractionJob.RUNNING)
+    return job
+
+
+def claim_next():
+    """Claim the oldest job that is due, or return None when there is none."""
+    CVExtractionJob = get_job_model()
+    while True:
+        job_id = CVExtractionJob.objects.filter(
+            status=CVExtractionJob.PENDING, run_after__lte=timezone.now()
+        ).order_by('run_after', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        job = claim(job_id)
+        if job is not None:
+            return job
+
+
+def text_hash(name):
+    """Value of UserDetails.cv_text_hash for text extracted from the stored file `name`."""
+    from core.utils.cv_extractor import EXTRACTOR_VERSION
+    return f'{EXTRACTOR_VERSION}:{content_hash(default_storage, name)}'
+
+
+def extracted_text(job):
+    """
+    Text already extracted from the same file by this extractor version for
+    another profile (CVs uploaded again are stored as the same blob), or
+    None; such jobs need no extraction. Empty texts are never reused.
+    """
+    UserDetails = apps.get_model('core', 'UserDetails')
+    try:
+        current_hash = text_hash(job.cv_file)
+    except OSError:
+        # Extraction reports the missing or unreadable file
+        return None
+    return UserDetails.objects.filter(cv_text_hash=current_hash, cv_text__isnull=False).exclude(
+        pk=job.user_details_id
+    ).exclude(cv_text='').values_list('cv_text', flat=True).first()
+
+
+def complete(job, text):
+    CVExtractionJob = get_job_model()
+    with transaction.atomic():
+        # Empty text gets no hash, so it is neither reused nor skipped as unchanged by reextract_cv_texts
+        cv_text_hash = text_hash(job.cv_file) if text else ''
+        if set_details_status(job, CVExtractionJob.DONE, cv_text=text, cv_text_hash=cv_text_hash):
+            update_user_skills({job.user_details.user_id: text})
+            update_duplicates({job.user_details_id: text})
+        CVExtractionJob.objects.filter(pk=job.pk).update(status=CVExtractionJob.DONE, locked_at=None, error='')
+
+
+def fail(job, error):
+    """Schedule another attempt with exponential backoff, or give up after CV_EXTRACTION_MAX_ATTEMPTS."""
+    CVExtractionJob = get_job_model()
+    max_attempts = getattr(settings, 'CV_EXTRACTION_MAX_ATTEMPTS', 3)
+    logger.warning(f"CV extraction job {job.pk} failed (attempt {job.attempts} of {max_attempts}): {error}")
+    with transaction.atomic():
+        if job.attempts < max_attempts:
+            delay = getattr(settings, 'CV_EXTRACTION_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+            CVExtractionJob.objects.filter(pk=job.pk).update(
+                status=CVExtractionJob.PENDING, locked_at=None, error=error,
+                run_after=timezone.now() + timedelta(seconds=delay)
+            )
+            set_details_status(job, CVExtractionJob.PENDING)
+        else:
+            CVExtractionJob.objects.filter(pk=job.pk).update(status=CVExtractionJob.FAILED, locked_at=None, error=error)
+            set_details_status(job, CVExtractionJob.FAILED)
+
+
+def release_stale(timeout):
+    """Put running jobs whose worker died back in the queue (or fail them after the last attempt)."""
+    CVExtractionJob = get_job_model()
+    cutoff = timezone.now() - timedelta(seconds=timeout * 2)
+    stale = list(CVExtractionJob.objects.filter(status=CVExtractionJob.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        fail(job, 'Worker stopped while running the job')
+    return len(stale)
+
+
+def queue_counts():
+    CVExtractionJob = get_job_model()
+    counts = {status: 0 for status, label in CVExtractionJob.STATUS_CHOICES}
+    for row in CVExtractionJob.objects.values('status').annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+    return counts
+
+
+def _extract_in_child(name, conn):
+    # Runs in its own process, so a stuck parser can be killed; the parent writes the result
+    if not apps.ready:
+        django.setup()
+    try:
+        with default_storage.open(name, 'rb') as f:
+            conn.send(('ok', extract(f)))
+    except Exception as e:
+        conn.send(('error', f'{type(e).__name__}: {str(e)}'))
+    finally:
+        conn.close()
+
+
+def start_child(job):
+    """Start extracting job's CV in a child process; returns (process, result connection)."""
+    context = multiprocessing.get_context()
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_extract_in_child, args=(job.cv_file, child_conn), daemon=True)
+    process.start()
+    child_conn.close()
+    return process, parent_conn
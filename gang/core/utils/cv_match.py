@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import math
+import time
+import shutil
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from scipy import sparse
+    MATCH_SUPPORT = True
+except ImportError:
+    MATCH_SUPPORT = False
+    logger.warning("NumPy/SciPy not installed. CV matching will not be available.")
+
+# Words, keeping 'c++', 'c#' and 'node.js' whole
+TOKEN_RE = re.compile(r'\w[\w+#]*(?:\.\w+)*')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has have i in is it its of on or our that the their this to was '
+    'we were will with you your'.split()
+)
+
+# Build files; CURRENT names the directory of the build in use
+CURRENT_FILE = 'CURRENT'
+
+
+def term_frequencies(text):
+    return Counter(
+        token for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS and not token.isdigit()
+    )
+
+
+def index_dir():
+    return getattr(settings, 'CV_MATCH_INDEX_DIR', os.path.join(settings.BASE_DIR, 'cv_match_index'))
+
+
+class CVMatchIndex:
+    """
+    TF-IDF vectors of CV texts for cosine-similarity matching.
+
+    The base matrix is built in one go and stored by term (CSC), so scoring a
+    job description only reads the columns of its own terms; loaded from a
+    build directory its arrays are memory-mapped and shared between worker
+    processes. CVs that change afterwards go into a small in-memory delta
+    that supersedes their base row. IDF weights are fixed when the base is
+    built (terms new since then get the highest weight); a rebuild with
+    `manage.py build_cv_match_index` recalibrates them and folds the delta in.
+    """
+
+    def __init__(self, matrix, ids, terms, idf, synced_at):
+        self.matrix = matrix
+        self.ids = ids
+        self.rows = {int(profile_id): row for row, profile_id in enumerate(ids)}
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.idf = idf
+        self.new_term_idf = math.log(1 + len(ids)) + 1
+        self.synced_at = synced_at
+        # profile id -> (columns, weights) of CVs changed since the build
+        self.delta = {}
+        # (alive, delta matrix, delta ids) read by top(); replaced whole, never changed in place,
+        # so queries running while the index is updated see one consistent version
+        self.snapshot = (
+            np.ones(len(ids), dtype=np.float32),
+            sparse.csc_matrix((0, 0), dtype=np.float32),
+            np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def build(cls, rows, synced_at):
+        """Index (profile id, cv_text) pairs."""
+        vocabulary = {}
+        document_frequency = []
+        ids = []
+        documents = []
+        for profile_id, text in rows:
+            frequencies = term_frequencies(text or '')
+            if not frequencies:
+                continue
+            columns = []
+            for term in frequencies:
+                column = vocabulary.setdefault(term, len(vocabulary))
+                if column == len(document_frequency):
+                    document_frequency.append(0)
+                document_frequency[column] += 1
+                columns.append(column)
+            ids.append(profile_id)
+            documents.append((columns, [1 + math.log(count) for count in frequencies.values()]))
+
+        idf = np.log((1 + len(ids)) / (1 + np.asarray(document_frequency, dtype=np.float64))) + 1
+        indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+        for row, (columns, weights) in enumerate(documents):
+            indptr[row + 1] = indptr[row] + len(columns)
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.float32)
+        for row, (columns, weights) in enumerate(documents):
+            start, end = indptr[row], indptr[row + 1]
+            indices[start:end] = columns
+            data[start:end] = weights
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(documents), len(vocabulary)))
+        # tf * idf, then every row scaled to unit length so a dot product is the cosine
+        matrix = sparse.csr_matrix(matrix.multiply(idf.astype(np.float32).reshape(1, -1)))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix = sparse.csr_matrix(matrix.multiply((1 / norms).astype(np.float32).reshape(-1, 1)))
+        terms = sorted(vocabulary, key=vocabulary.get)
+        return cls(matrix.tocsc(), np.asarray(ids, dtype=np.int64), terms, idf.astype(np.float32), synced_at)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'data.npy'), self.matrix.data)
+        np.save(os.path.join(directory, 'indices.npy'), self.matrix.indices)
+        np.save(os.path.join(directory, 'indptr.npy'), self.matrix.indptr)
+        np.save(os.path.join(directory, 'ids.npy'), self.ids)
+        np.save(os.path.join(directory, 'idf.npy'), self.idf)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'terms': terms, 'synced_at': self.synced_at.isoformat(), 'shape': self.matrix.shape}, f)
+
+    @classmethod
+    def load(cls, directory):
+        def array(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        matrix = sparse.csc_matrix(
+            (array('data'), array('indices'), array('indptr')), shape=tuple(meta['shape']), copy=False
+        )
+        return cls(matrix, np.asarray(array('ids')), meta['terms'], array('idf'),
+                   datetime.fromisoformat(meta['synced_at']))
+
+    def __len__(self):
+        alive, _, delta_ids = self.snapshot
+        return int(alive.sum()) + len(delta_ids)
+
+    def update(self, texts):
+        """
+        Replace (or, with no text, remove) the vectors of CVs: texts maps
+        profile id to cv_text. The new state is built aside and swapped in;
+        callers serialize updates (get_index() holds its lock).
+        """
+        if not texts:
+            return
+        alive = self.snapshot[0].copy()
+        delta = dict(self.delta)
+        for profile_id, text in texts.items():
+            row = self.rows.get(profile_id)
+            if row is not None:
+                alive[row] = 0
+            delta.pop(profile_id, None)
+            frequencies = term_frequencies(text or '')
+            if frequencies:
+                columns = [self.vocabulary.setdefault(term, len(self.vocabulary)) for term in frequencies]
+                weights = np.array([
+                    (1 + math.log(count)) * self.term_idf(column) for column, count in zip(columns, frequencies.values())
+                ], dtype=np.float32)
+                delta[profile_id] = (np.array(columns, dtype=np.int32), weights / np.linalg.norm(weights))
+        delta_ids = np.fromiter(delta, dtype=np.int64, count=len(delta))
+        self.delta = delta
+        self.snapshot = (alive, self.delta_matrix(delta, delta_ids), delta_ids)
+
+    def term_idf(self, column):
+        return float(self.idf[column]) if column < len(self.idf) else self.new_term_idf
+
+    def query_vector(self, text):
+        """(columns, unit-length weights) of the indexed terms in text."""
+        columns, weights = [], []
+        for term, count in term_frequencies(text).items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append((1 + math.log(count)) * self.term_idf(column))
+        weights = np.array(weights, dtype=np.float32)
+        if len(weights):
+            weights /= np.linalg.norm(weights)
+        return np.array(columns, dtype=np.int32), weights
+
+    def delta_matrix(self, delta, delta_ids):
+        columns = [delta[profile_id][0] for profile_id in delta_ids]
+        indptr = np.zeros(len(columns) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in columns], out=indptr[1:])
+        return sparse.csr_matrix(
+            (
+                np.concatenate([delta[profile_id][1] for profile_id in delta_ids] or [np.empty(0, np.float32)]),
+                np.concatenate(columns or [np.empty(0, np.int32)]),
+                indptr,
+            ),
+            shape=(len(columns), len(self.vocabulary)),
+        ).tocsc()
+
+    def top(self, text, k):
+        """Up to k (profile id, cosine similarity) pairs, best first, with a similarity above 0."""
+        columns, weights = self.query_vector(text)
+        if not len(columns):
+            return []
+        alive, delta, delta_ids = self.snapshot
+        base = columns < self.matrix.shape[1]
+        # Only the postings of the query's terms are read
+        scores = self.matrix[:, columns[base]] @ weights[base] * alive
+        ids = self.ids
+        if len(delta_ids):
+            # Terms added to the vocabulary after this snapshot are in none of its rows
+            inside = columns < delta.shape[1]
+            scores = np.concatenate([scores, delta[:, columns[inside]] @ weights[inside]])
+            ids = np.concatenate([ids, delta_ids])
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+def build_from_database():
+    """Index the extracted text of every profile with a CV."""
+    UserDetails = apps.get_model('core', 'UserDetails')
+    started = timezone.now()
+    rows = (
+        UserDetails.objects.filter(cv_file__isnull=False).exclude(cv_file='')
+        .exclude(cv_text__isnull=True).exclude(cv_text='')
+        .values_list('id', 'cv_text').iterator(chunk_size=2000)
+    )
+    return CVMatchIndex.build(rows, started)
+
+
+def write_build(index, root=None):
+    """
+    Store a build (anything with a save(directory) method) under root, by
+    default CV_MATCH_INDEX_DIR, and switch CURRENT to it; returns its directory.
+    """
+    root = root or index_dir()
+    name = f'build-{time.time_ns()}'
+    index.save(os.path.join(root, name))
+    with open(os.path.join(root, f'{CURRENT_FILE}.tmp'), 'w') as f:
+        f.write(name)
+    os.replace(os.path.join(root, f'{CURRENT_FILE}.tmp'), os.path.join(root, CURRENT_FILE))
+    # Processes still using an older build keep their memory-mapped files until they reload
+    for entry in os.listdir(root):
+        if entry.startswith('build-') and entry != name:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return os.path.join(root, name)
+
+
+def current_build(root=None):
+    try:
+        with open(os.path.join(root or index_dir(), CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+_lock = threading.Lock()
+_state = {'index': None, 'build': None, 'checked': 0.0}
+
+
+def get_index():
+    """
+    This process's index, loaded from the current build (or, with none,
+    built from the database) and brought up to date with the CVs changed
+    since, at most once every CV_MATCH_REFRESH_SECONDS.
+    """
+    with _lock:
+        now = time.monotonic()
+        if _state['index'] is not None and now - _state['checked'] < getattr(settings, 'CV_MATCH_REFRESH_SECONDS', 30):
+            return _state['index']
+        build = current_build()
+        if _state['index'] is None or build != _state['build']:
+            if build:
+                _state['index'] = CVMatchIndex.load(os.path.join(index_dir(), build))
+            else:
+                logger.warning("No CV match index built; indexing CVs in this process (run build_cv_match_index)")
+                _state['index'] = build_from_database()
+            _state['build'] = build
+        refresh(_state['index'])
+        _state['checked'] = now
+        return _state['index']
+
+
+def refresh(index):
+    """
+    Re-index CVs updated since the last refresh, read through the partial
+    (updated_at, id) index on profiles with a CV. The window overlaps the
+    previous one, so rows committed late with an older updated_at are not
+    missed. Removed CVs drop out when matches are loaded.
+    """
+    UserDetails = apps.get_model('core', 'UserDetails')
+    started = timezone.now()
+    since = index.synced_at - timedelta(seconds=getattr(settings, 'CV_MATCH_REFRESH_SECONDS', 30) + 60)
+    changed = UserDetails.objects.filter(cv_file__isnull=False, updated_at__gte=since)
+    index.update({
+        profile_id: text if cv_file else None
+        for profile_id, cv_file, text in changed.values_list('id', 'cv_file', 'cv_text').iterator(chunk_size=2000)
+    })
+    index.synced_at = started
@@ -0,0 +1,282 @@
+import re
+from django.db import connection, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Coalesce, RowNumber
+from core.models.user_details import UserDetails
+from core.models.user_skills import UserSkill
+
+FTS_TABLE = 'cv_fts'
+
+# Profiles with a CV, indexed by user_details.id. Column order matters for bm25() weights.
+# The update trigger only reindexes a row when an indexed column really changed, because
+# UserDetails.save() writes every column. Migrations that make SQLite rebuild the
+# user_details table drop these triggers with it and must create them again afterwards.
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(full_name, bio, cv_text, tokenize = 'unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS cv_fts_insert AFTER INSERT ON user_details
+        WHEN new.cv_file IS NOT NULL AND new.cv_file != ''
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, full_name, bio, cv_text)
+            VALUES (new.id, new.full_name, new.bio, new.cv_text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cv_fts_update
+        AFTER UPDATE OF full_name, bio, cv_text, cv_file ON user_details
+        WHEN old.full_name IS NOT new.full_name OR old.bio IS NOT new.bio
+            OR old.cv_text IS NOT new.cv_text OR old.cv_file IS NOT new.cv_file
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, full_name, bio, cv_text)
+            SELECT new.id, new.full_name, new.bio, new.cv_text
+            WHERE new.cv_file IS NOT NULL AND new.cv_file != '';
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cv_fts_delete AFTER DELETE ON user_details
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS cv_fts_delete',
+    'DROP TRIGGER IF EXISTS cv_fts_update',
+    'DROP TRIGGER IF EXISTS cv_fts_insert',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# bm25() weights for full_name, bio and cv_text
+BM25_WEIGHTS = (5.0, 2.0, 1.0)
+
+_available = None
+
+
+def is_available():
+    """True when the cv_fts index exists and can be queried."""
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+                )
+                _available = cursor.fetchone() is not None
+    return _available
+
+
+def create_index():
+    global _available
+    with connection.cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+    _available = True
+
+
+def drop_index():
+    global _available
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+    _available = False
+
+
+def rebuild_index(batch_size=5000):
+    """
+    Repopulate the index from the user_details table, one id range per
+    transaction, like post_search.rebuild_index(). Yields the number of
+    profiles indexed per batch.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT MAX(id) FROM (SELECT id FROM user_details WHERE id > %s ORDER BY id LIMIT %s)',
+                    [last_id, batch_size]
+                )
+                upper = cursor.fetchone()[0]
+                if upper is None:
+                    cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid > %s', [last_id])
+                    break
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid > %s AND rowid <= %s', [last_id, upper]
+                )
+                cursor.execute(
+                    f"""INSERT INTO {FTS_TABLE}(rowid, full_name, bio, cv_text)
+                        SELECT id, full_name, bio, cv_text FROM user_details
+                        WHERE id > %s AND id <= %s AND cv_file IS NOT NULL AND cv_file != ''""",
+                    [last_id, upper]
+                )
+                indexed = cursor.rowcount
+        last_id = upper
+        yield indexed
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+
+
+def parse_query(query):
+    """
+    Split search input into clauses: a list of OR-alternatives, each a list
+    of terms that must all match. A term is a (words, prefix) pair; several
+    words make a phrase. "Quoted text" is a phrase, OR between two terms
+    makes them alternatives and a trailing '*' matches a prefix. Everything
+    else that isn't a word character is ignored, so input can never be read
+    as an FTS5 operator.
+    """
+    clauses = [[]]
+    for phrase, token in re.findall(r'"([^"]*)"?|(\S+)', query):
+        if token == 'OR':
+            if clauses[-1]:
+                clauses.append([])
+            continue
+        if token == 'AND':
+            continue
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                clauses[-1].append((words, False))
+            continue
+        for word in re.findall(r'\w+\*?', token):
+            clauses[-1].append(([word.rstrip('*')], word.endswith('*')))
+    return [clause for clause in clauses if clause]
+
+
+def build_match_query(query):
+    """FTS5 MATCH expression for search input; '' when it has no words."""
+    alternatives = []
+    for clause in parse_query(query):
+        terms = [f'"{" ".join(words)}"' + ('*' if prefix else '') for words, prefix in clause]
+        alternatives.append(' AND '.join(terms))
+    if len(alternatives) > 1:
+        return ' OR '.join(f'({alternative})' for alternative in alternatives)
+    return alternatives[0] if alternatives else ''
+
+
+def with_skills(queryset, skill_ids):
+    """
+    Profiles whose user has every one of the skills: one lookup on the
+    user_skills skill_id index per skill instead of a scan of the CV texts.
+    """
+    for skill_id in skill_ids:
+        queryset = queryset.filter(user_id__in=UserSkill.objects.filter(skill_id=skill_id).values('user_id'))
+    return queryset
+
+
+def skills_condition(skill_ids):
+    """SQL restricting cv_fts rows to profiles with all the skills, and its parameters."""
+    if not skill_ids:
+        return '', []
+    sql, params = with_skills(UserDetails.objects.all(), skill_ids).values('id').query.sql_with_params()
+    return f'AND {FTS_TABLE}.rowid IN ({sql})', list(params)
+
+
+def search(query, offset, limit, skill_ids=()):
+    """
+    BM25-ranked (user_details id, score, snippet) triples for profiles whose
+    CV, name or bio match query, and whose user has all of skill_ids. FTS5's
+    bm25() is lower for better matches, so the score is its negation. Of
+    near-duplicate CVs (one cv_cluster_id) only the best match is returned,
+    and snippets are only made for the page.
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+    skills_sql, skills_params = skills_condition(skill_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT rowid, score FROM (
+                    SELECT rowid, score,
+                           ROW_NUMBER() OVER (PARTITION BY cluster ORDER BY score DESC, rowid) AS duplicate_rank
+                    FROM (
+                        SELECT {FTS_TABLE}.rowid AS rowid, -bm25({FTS_TABLE}, %s, %s, %s) AS score,
+                               COALESCE(user_details.cv_cluster_id, {FTS_TABLE}.rowid) AS cluster
+                        FROM {FTS_TABLE} JOIN user_details ON user_details.id = {FTS_TABLE}.rowid
+                        WHERE {FTS_TABLE} MATCH %s {skills_sql}
+                    )
+                )
+                WHERE duplicate_rank = 1
+                ORDER BY score DESC, rowid
+                LIMIT %s OFFSET %s""",
+            [*BM25_WEIGHTS, match, *skills_params, limit, offset]
+        )
+        page = cursor.fetchall()
+        if not page:
+            return []
+        cursor.execute(
+            f"""SELECT rowid, snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 24)
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s AND rowid IN ({', '.join(['%s'] * len(page))})""",
+            [match, *(pk for pk, _ in page)]
+        )
+        snippets = dict(cursor.fetchall())
+    return [(pk, score, snippets.get(pk)) for pk, score in page]
+
+
+def count(query, limit, skill_ids=()):
+    """Number of matching profiles, near-duplicates counted once, counting no further than limit."""
+    match = build_match_query(query)
+    if not match:
+        return 0
+    skills_sql, skills_params = skills_condition(skill_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT COUNT(*) FROM (
+                    SELECT DISTINCT COALESCE(user_details.cv_cluster_id, {FTS_TABLE}.rowid)
+                    FROM {FTS_TABLE} JOIN user_details ON user_details.id = {FTS_TABLE}.rowid
+                    WHERE {FTS_TABLE} MATCH %s {skills_sql} LIMIT %s
+                )""",
+            [match, *skills_params, limit]
+        )
+        return cursor.fetchone()[0]
+
+
+class RankedCVSearch:
+    """Search results as a source for RankedPagePagination."""
+
+    def __init__(self, query, skill_ids=()):
+        self.query = query
+        self.skill_ids = skill_ids
+
+    def fetch(self, offset, limit):
+        return search(self.query, offset, limit, self.skill_ids)
+
+    def count(self, limit):
+        return count(self.query, limit, self.skill_ids)
+
+
+class ScanCVSearch:
+    """
+    Profiles with a CV and all of skill_ids, most recently updated first,
+    near-duplicates collapsed and without scores or snippets. Without the
+    FTS5 index, query words are matched by LIKE scans with the same
+    AND/OR/phrase rules; prefixes then match anywhere in a word, as LIKE
+    cannot tell.
+    """
+
+    def __init__(self, query, skill_ids=()):
+        self.query = query
+        self.skill_ids = skill_ids
+
+    def matches(self):
+        clauses = parse_query(self.query)
+        if not clauses and not self.skill_ids:
+            return UserDetails.objects.none()
+        condition = Q()
+        for clause in clauses:
+            matches = Q()
+            for words, prefix in clause:
+                text = ' '.join(words)
+                matches &= Q(cv_text__icontains=text) | Q(full_name__icontains=text) | Q(bio__icontains=text)
+            condition |= matches
+        profiles = UserDetails.objects.filter(condition).exclude(cv_file__isnull=True).exclude(cv_file='')
+        # The most recently updated of near-duplicate CVs
+        return with_skills(profiles, self.skill_ids).annotate(duplicate_rank=Window(
+            RowNumber(), partition_by=Coalesce('cv_cluster_id', 'id'), order_by=[F('updated_at').desc(), F('id').desc()]
+        )).filter(duplicate_rank=1)
+
+    def fetch(self, offset, limit):
+        ids = self.matches().order_by('-updated_at', '-id').values_list('id', flat=True)[offset:offset + limit]
+        return [(pk, None, None) for pk in ids]
+
+    def count(self, limit):
+        return self.matches()[:limit].count()
@@ -0,0 +1,77 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'posts:feed:version'
+HITS_KEY = 'posts:feed:hits'
+MISSES_KEY = 'posts:feed:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')]
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing or evicted; add() so a concurrent first writer is not overwritten
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_feed_version():
+    version = get_cache().get(VERSION_KEY)
+    if version is None:
+        get_cache().add(VERSION_KEY, 1, timeout=None)
+        version = get_cache().get(VERSION_KEY, 1)
+    return version
+
+
+def bump_feed_version():
+    """
+    Invalidate every cached feed page once the current transaction commits.
+
+    Bumping after commit means a reader can never cache pre-commit rows under
+    the new version; pages cached under older versions simply stop being read.
+    """
+    transaction.on_commit(lambda: _incr(VERSION_KEY))
+
+
+def page_cache_key(request, page_number):
+    """Key for a feed page, or None if the page is past FEED_CACHE_PAGES."""
+    if page_number >= getattr(settings, 'FEED_CACHE_PAGES', 3):
+        return None
+    # The absolute URL covers host, interest, page size and cursor
+    url_hash = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'posts:feed:v{get_feed_version()}:{url_hash}'
+
+
+def get_page(key):
+    data = get_cache().get(key)
+    _incr(HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+def set_page(key, data):
+    get_cache().set(key, data, timeout=getattr(settings, 'FEED_CACHE_TIMEOUT', 300))
+
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'version': get_feed_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
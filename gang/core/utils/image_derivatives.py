@@ -0,0 +1,264 @@
+import os
+import logging
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from core.utils.feed_cache import bump_feed_version
+
+logger = logging.getLogger(__name__)
+
+# (model label, image field) pairs that have derivatives, stored in <field>_variants
+IMAGE_FIELDS = [
+    ('core.Post', 'image'),
+    ('core.Comment', 'image'),
+    ('core.UserDetails', 'profile_picture'),
+    ('core.UserDetails', 'background_image'),
+]
+
+
+def get_sizes():
+    """Derivative name -> longest side in pixels."""
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', {'thumb': 160, 'feed': 720, 'full': 1600})
+
+
+def derivative_name(source, size):
+    # posts/3/12_photo.png -> derivatives/posts/3/12_photo.feed.jpg; a content-addressed
+    # storage keeps only the extension and files the JPEG by its own hash
+    return f'derivatives/{os.path.splitext(source)[0]}.{size}.jpg'
+
+
+def render_derivatives(storage, source):
+    """
+    A re-encoded JPEG of `source` for every configured size, as {size: bytes}.
+
+    Orientation from EXIF is applied to the pixels, then all metadata is
+    dropped. Images are only ever scaled down. Nothing is written, so worker
+    processes can render while the caller alone stores the files.
+    """
+    sizes = get_sizes()
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 82)
+    images = {}
+    with storage.open(source, 'rb') as f, Image.open(f) as image:
+        # Let the JPEG decoder skip straight to roughly the largest size we need
+        largest = max(sizes.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no alpha: flatten transparent areas onto white
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        for size, longest_side in sorted(sizes.items(), key=lambda item: -item[1]):
+            # Each size is scaled from the previous, larger one
+            image.thumbnail((longest_side, longest_side), Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+            images[size] = buffer.getvalue()
+    return images
+
+
+def store_derivatives(label, field_name, source, images):
+    """Save rendered derivatives and return {'source': source, size: stored name, ...}."""
+    storage = apps.get_model(label)._meta.get_field(field_name).storage
+    variants = {'source': source}
+    for size, data in images.items():
+        variants[size] = storage.save(derivative_name(source, size), ContentFile(data))
+    return variants
+
+
+def save_variants(model, pk, field_name, variants):
+    """
+    Record derivatives unless the image was replaced while they were rendered,
+    and release whichever set of derivative files is no longer referenced.
+    """
+    storage = model._meta.get_field(field_name).storage
+    with transaction.atomic():
+        rows = model.objects.filter(pk=pk, **{field_name: variants['source']})
+        previous = rows.values_list(f'{field_name}_variants', flat=True).first()
+        # updated_at moves too, so ETags and cached feed pages pick up the new URLs
+        updated = rows.update(**{f'{field_name}_variants': variants, 'updated_at': timezone.now()})
+        for name in variant_names(previous if updated else variants):
+            transaction.on_commit(partial(storage.delete, name))
+    if updated:
+        bump_feed_version()
+    return updated
+
+
+def render(label, field_name, source):
+    """{size: JPEG bytes} of one stored image, or None if it cannot be read as an image."""
+    storage = apps.get_model(label)._meta.get_field(field_name).storage
+    try:
+        return render_derivatives(storage, source)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f"Could not render derivatives of {label}.{field_name} ({source}): {str(e)}")
+        return None
+
+
+def is_stale(instance, field_name):
+    source = getattr(instance, field_name).name
+    return bool(source) and getattr(instance, f'{field_name}_variants', {}).get('source') != source
+
+
+def get_job_model():
+    return apps.get_model('core', 'ImageDerivativeJob')
+
+
+def queue_derivatives(instance, *field_names):
+    """
+    Queue rendering of the derivatives of new or replaced images, replacing
+    jobs still waiting for older ones. Jobs are rows written in the current
+    transaction, so they survive restarts; `manage.py image_derivative_worker`
+    runs them. With IMAGE_DERIVATIVES_ASYNC off they run once it commits.
+    """
+    ImageDerivativeJob = get_job_model()
+    for field_name in field_names:
+        if not is_stale(instance, field_name):
+            continue
+        target = {'model_label': instance._meta.label, 'object_id': instance.pk, 'field_name': field_name}
+        ImageDerivativeJob.objects.filter(status=ImageDerivativeJob.PENDING, **target).delete()
+        job = ImageDerivativeJob.objects.create(
+            source=getattr(instance, field_name).name, run_after=timezone.now(), **target
+        )
+        if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+            transaction.on_commit(partial(run_inline, job.pk))
+
+
+def run_inline(job_id):
+    job = claim(job_id)
+    if job is None:
+        return
+    try:
+        variants = render_job(job)
+    except Exception as e:
+        fail(job, f'{type(e).__name__}: {str(e)}')
+    else:
+        complete(job, variants)
+
+
+def is_current(job):
+    """Whether the row still holds the image the job was queued for."""
+    model = apps.get_model(job.model_label)
+    return model.objects.filter(pk=job.object_id, **{job.field_name: job.source}).exists()
+
+
+def render_job(job):
+    """Stored derivatives of the job's image; None if it was replaced or cannot be read."""
+    if not is_current(job):
+        return None
+    images = render(job.model_label, job.field_name, job.source)
+    if images is None:
+        return None
+    return store_derivatives(job.model_label, job.field_name, job.source, images)
+
+
+def claim(job_id):
+    """Mark a pending job as running; None if another worker got it first."""
+    ImageDerivativeJob = get_job_model()
+    claimed = ImageDerivativeJob.objects.filter(pk=job_id, status=ImageDerivativeJob.PENDING).update(
+        status=ImageDerivativeJob.RUNNING, locked_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return None
+    return ImageDerivativeJob.objects.get(pk=job_id)
+
+
+def claim_next():
+    """Claim the oldest job that is due, or return None when there is none."""
+    ImageDerivativeJob = get_job_model()
+    while True:
+        job_id = ImageDerivativeJob.objects.filter(
+            status=ImageDerivativeJob.PENDING, run_after__lte=timezone.now()
+        ).order_by('run_after', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        job = claim(job_id)
+        if job is not None:
+            return job
+
+
+def complete(job, variants):
+    """Record the rendered derivatives; a job for a replaced or unreadable image just ends."""
+    ImageDerivativeJob = get_job_model()
+    if variants is not None:
+        save_variants(apps.get_model(job.model_label), job.object_id, job.field_name, variants)
+    ImageDerivativeJob.objects.filter(pk=job.pk).update(status=ImageDerivativeJob.DONE, locked_at=None, error='')
+
+
+def fail(job, error):
+    """Schedule another attempt with exponential backoff, or give up after IMAGE_DERIVATIVE_MAX_ATTEMPTS."""
+    ImageDerivativeJob = get_job_model()
+    max_attempts = getattr(settings, 'IMAGE_DERIVATIVE_MAX_ATTEMPTS', 3)
+    logger.warning(f"Image derivative job {job.pk} failed (attempt {job.attempts} of {max_attempts}): {error}")
+    if job.attempts < max_attempts:
+        delay = getattr(settings, 'IMAGE_DERIVATIVE_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+        ImageDerivativeJob.objects.filter(pk=job.pk).update(
+            status=ImageDerivativeJob.PENDING, locked_at=None, error=error,
+            run_after=timezone.now() + timedelta(seconds=delay)
+        )
+    else:
+        ImageDerivativeJob.objects.filter(pk=job.pk).update(
+            status=ImageDerivativeJob.FAILED, locked_at=None, error=error
+        )
+
+
+def heartbeat(jobs):
+    """Refresh the lock of jobs a live worker is still running."""
+    ImageDerivativeJob = get_job_model()
+    job_ids = [job.pk for job in jobs]
+    if job_ids:
+        ImageDerivativeJob.objects.filter(pk__in=job_ids, status=ImageDerivativeJob.RUNNING).update(
+            locked_at=timezone.now()
+        )
+
+
+def release_stale(timeout):
+    """
+    Put running jobs whose worker died back in the queue (or fail them after
+    the last attempt): workers refresh the locks of the jobs they hold every
+    poll, so only jobs not refreshed for twice `timeout` are taken.
+    """
+    ImageDerivativeJob = get_job_model()
+    cutoff = timezone.now() - timedelta(seconds=timeout * 2)
+    stale = list(ImageDerivativeJob.objects.filter(status=ImageDerivativeJob.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        fail(job, 'Worker stopped while running the job')
+    return len(stale)
+
+
+def queue_counts():
+    ImageDerivativeJob = get_job_model()
+    counts = {status: 0 for status, label in ImageDerivativeJob.STATUS_CHOICES}
+    for row in ImageDerivativeJob.objects.values('status').annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+    return counts
+
+
+def variant_names(variants):
+    """Stored derivative file names in a *_variants value."""
+    return [name for size, name in (variants or {}).items() if size != 'source']
+
+
+def variant_urls(instance, field_name, request=None):
+    """{size: url} for an image field, or None until its derivatives are ready."""
+    field = getattr(instance, field_name)
+    variants = getattr(instance, f'{field_name}_variants', None) or {}
+    if not field or variants.get('source') != field.name:
+        return None
+    urls = {}
+    for size, name in variants.items():
+        if size == 'source':
+            continue
+        url = field.storage.url(name)
+        urls[size] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,64 @@
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core import signing
+
+# Kept apart from other signatures made with SECRET_KEY
+SALT = 'core.media'
+
+
+def max_age():
+    return getattr(settings, 'MEDIA_SIGNED_URL_MAX_AGE', 3600)
+
+
+def signing_period_start():
+    """
+    Start of the current signing period, half of MEDIA_SIGNED_URL_MAX_AGE
+    long, as a UTC datetime. URLs are signed with this time rather than the
+    current one, so a response stays the same within a period, and one
+    revalidated with a 304 until the period ends still has a URL valid for
+    at least half the max age.
+    """
+    period = max(1, max_age() // 2)
+    return datetime.fromtimestamp(int(time.time()) // period * period, timezone.utc)
+
+
+class PeriodSigner(signing.TimestampSigner):
+    def timestamp(self):
+        return signing.b62_encode(int(signing_period_start().timestamp()))
+
+
+def can_read_cv(user, details):
+    """Whether user may download the CV of a profile: its owner and Company users."""
+    return user.is_authenticated and (user.pk == details.user_id or user.user_type == 'Company')
+
+
+def signed_url(field_file, request=None):
+    """
+    URL of a stored file that MediaView serves without a login for
+    MEDIA_SIGNED_URL_MAX_AGE seconds from the start of the signing period,
+    for links opened outside the app (a browser has no bearer token).
+    Views whose responses carry one add signing_period_start() to their
+    validator state.
+    """
+    # sign() returns 'name:timestamp:signature'; the name is already in the path
+    signature = PeriodSigner(salt=SALT).sign(field_file.name)[len(field_file.name) + 1:]
+    url = f'{field_file.url}?sig={signature}'
+    return request.build_absolute_uri(url) if request else url
+
+
+def has_valid_signature(name, signature):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            f'{name}:{signature}', max_age=max_age()
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def cv_url(details, request):
+    """Signed URL of a profile's CV for those who may read it, otherwise None."""
+    if not details.cv_file or request is None or not can_read_cv(request.user, details):
+        return None
+    return signed_url(details.cv_file, request)
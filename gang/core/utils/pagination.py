@@ -0,0 +1,286 @@
+import base64
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(field, pk_field, key, reverse=False):
+    """Rows strictly after (value, pk) in descending order, or before it when reverse."""
+    value, pk = key
+    op = 'gt' if reverse else 'lt'
+    return Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'{pk_field}__{op}': pk})
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on an (ordering_field, id) key, newest first.
+
+    Pages are selected with a WHERE on the last key seen instead of an OFFSET,
+    so every request reads at most page_size + 1 rows, and pages stay stable
+    when rows are inserted or soft deleted between requests.
+    """
+    ordering_field = 'created_at'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'CURSOR_PAGE_SIZE', 20)
+        max_page_size = getattr(settings, 'CURSOR_MAX_PAGE_SIZE', 100)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested <= 0:
+            return page_size
+        return min(requested, max_page_size)
+
+    def encode_cursor(self, item, page_number, reverse=False):
+        key = getattr(item, self.ordering_field)
+        payload = {'v': key.isoformat(), 'id': item.pk, 'p': page_number}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            value = parse_datetime(payload['v'])
+            pk = int(payload['id'])
+            reverse = bool(payload.get('r'))
+            page_number = int(payload.get('p', 0))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse, page_number
+
+    def get_page_number(self, request):
+        """Zero-based index of the requested page, as carried by the cursor."""
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return 0
+        return cursor[3]
+
+    def fetch(self, queryset, key, reverse, limit):
+        """
+        Up to `limit` rows following `key` in page order, or preceding it
+        (nearest first) when reverse is set. `key` is None for the first page.
+        """
+        field = self.ordering_field
+        if key is None:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        elif reverse:
+            # Walking back towards newer rows: read ascending from the key
+            queryset = queryset.filter(keyset_filter(field, 'id', key, reverse=True)).order_by(field, 'id')
+        else:
+            queryset = queryset.filter(keyset_filter(field, 'id', key)).order_by(f'-{field}', '-id')
+        return list(queryset[:limit])
+
+    def peek(self, queryset, request):
+        """
+        The rows the page for `request` is built from, plus the row after it,
+        without paginating. Pass a values_list() queryset to read only the
+        columns needed, e.g. for conditional GET validators.
+        """
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            key, reverse = None, False
+        else:
+            value, pk, reverse, _ = cursor
+            key = (value, pk)
+        return self.fetch(queryset, key, reverse, self.get_page_size(request) + 1)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            key, reverse, self.page_number = None, False, 0
+        else:
+            value, pk, reverse, self.page_number = cursor
+            key = (value, pk)
+
+        results = self.fetch(queryset, key, reverse, self.page_size + 1)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_item = None
+        self.previous_item = None
+        if results:
+            if reverse:
+                self.next_item = results[-1]
+                if has_more:
+                    self.previous_item = results[0]
+            else:
+                if has_more:
+                    self.next_item = results[-1]
+                if cursor is not None:
+                    self.previous_item = results[0]
+        return results
+
+    def get_next_link(self):
+        if self.next_item is None:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.next_item, self.page_number + 1)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if self.previous_item is None:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.previous_item, max(self.page_number - 1, 0), reverse=True)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CreatedAtCursorPagination(KeysetPagination):
+    """Newest-first pages on (created_at, id)."""
+    ordering_field = 'created_at'
+
+
+class UpdatedAtCursorPagination(KeysetPagination):
+    """Most recently updated first, on (updated_at, id)."""
+    ordering_field = 'updated_at'
+
+
+class RankedPagination(KeysetPagination):
+    """
+    Pages over a relevance-ranked source, with the offset carried in an opaque
+    cursor. Rank order has no stable key to seek on, so the source is asked
+    for fetch(offset, limit) instead.
+    """
+
+    def encode_offset(self, offset):
+        raw = json.dumps({'o': offset}, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_offset(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return 0
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            offset = int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['o'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return offset
+
+    def get_page_number(self, request):
+        return self.decode_offset(request) // self.get_page_size(request)
+
+    def paginate_queryset(self, source, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.offset = self.decode_offset(request)
+        results = list(source.fetch(self.offset, self.page_size + 1))
+        self.has_more = len(results) > self.page_size
+        return results[:self.page_size]
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_offset(self.offset + self.page_size))
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        url = self.request.build_absolute_uri()
+        offset = max(self.offset - self.page_size, 0)
+        return replace_query_param(url, self.cursor_query_param, self.encode_offset(offset))
+
+
+class RankedPagePagination(RankedPagination):
+    """
+    RankedPagination addressed by ?page=<n> (from 1) instead of a cursor, for
+    ranked results a client may jump around in. The response also carries a
+    total_estimate: exact on the last page, otherwise the source's count()
+    of matches, which stops at RANKED_COUNT_LIMIT (or just past the current
+    page) so a broad query is never counted in full.
+    """
+    page_query_param = 'page'
+    invalid_page_message = 'Invalid page'
+
+    def decode_offset(self, request):
+        try:
+            page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if page < 1:
+            raise NotFound(self.invalid_page_message)
+        return (page - 1) * self.get_page_size(request)
+
+    def paginate_queryset(self, source, request, view=None):
+        results = super().paginate_queryset(source, request, view)
+        self.page = self.offset // self.page_size + 1
+        if self.has_more:
+            limit = max(getattr(settings, 'RANKED_COUNT_LIMIT', 1000), self.offset + self.page_size + 1)
+            self.total_estimate = source.count(limit)
+        else:
+            self.total_estimate = self.offset + len(results)
+        return results
+
+    def page_link(self, page):
+        url = self.request.build_absolute_uri()
+        if page == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page)
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        return self.page_link(self.page + 1)
+
+    def get_previous_link(self):
+        if self.page <= 1:
+            return None
+        return self.page_link(self.page - 1)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'page': self.page,
+            'total_estimate': self.total_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['page'] = {'type': 'integer'}
+        response_schema['properties']['total_estimate'] = {'type': 'integer'}
+        return response_schema
@@ -0,0 +1,179 @@
+import re
+from django.db import connection, transaction, OperationalError
+
+FTS_TABLE = 'posts_fts'
+
+# Column order matters for bm25() weights and snippet() below. Migrations that make
+# SQLite rebuild the posts or users table must drop the triggers first and recreate
+# them afterwards (see 0012_image_variants).
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(title, content, username, tokenize = 'unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts
+        WHEN new.is_deleted = 0
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, content, username)
+            VALUES (new.id, new.title, new.content, (SELECT username FROM users WHERE id = new.user_id));
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_update
+        AFTER UPDATE OF title, content, user_id, is_deleted ON posts
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, title, content, username)
+            SELECT new.id, new.title, new.content, username FROM users
+            WHERE id = new.user_id AND new.is_deleted = 0;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_username AFTER UPDATE OF username ON users
+        BEGIN
+            UPDATE {FTS_TABLE} SET username = new.username
+            WHERE rowid IN (SELECT id FROM posts WHERE user_id = new.id);
+        END""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_fts_username',
+    'DROP TRIGGER IF EXISTS posts_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_fts_update',
+    'DROP TRIGGER IF EXISTS posts_fts_insert',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# bm25() weights for title, content and username
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_available = None
+
+
+def fts5_supported():
+    """True when the database is SQLite compiled with FTS5."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Some builds load FTS5 without reporting the compile option
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.fts5_probe')
+            return True
+        except OperationalError:
+            return False
+
+
+def is_available():
+    """True when the posts_fts index exists and can be queried."""
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+                )
+                _available = cursor.fetchone() is not None
+    return _available
+
+
+def create_index():
+    global _available
+    with connection.cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+    _available = True
+
+
+def drop_index():
+    global _available
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+    _available = False
+
+
+def rebuild_index(batch_size=5000):
+    """
+    Repopulate the index from the posts table, one id range per transaction.
+
+    Each range is deleted and re-inserted together, so searches keep working
+    during the rebuild and rows written meanwhile by the triggers are not
+    duplicated. Yields the number of posts indexed per batch.
+    """
+    last_id = 0
+    while True:
+        # Short transactions so API writers are not locked out for the whole rebuild
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT MAX(id) FROM (SELECT id FROM posts WHERE id > %s ORDER BY id LIMIT %s)',
+                    [last_id, batch_size]
+                )
+                upper = cursor.fetchone()[0]
+                if upper is None:
+                    # Drop entries for hard-deleted posts past the last batch
+                    cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid > %s', [last_id])
+                    break
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid > %s AND rowid <= %s', [last_id, upper]
+                )
+                cursor.execute(
+                    f"""INSERT INTO {FTS_TABLE}(rowid, title, content, username)
+                        SELECT p.id, p.title, p.content, u.username
+                        FROM posts p JOIN users u ON u.id = p.user_id
+                        WHERE p.id > %s AND p.id <= %s AND p.is_deleted = 0""",
+                    [last_id, upper]
+                )
+                indexed = cursor.rowcount
+        last_id = upper
+        yield indexed
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+
+
+def build_match_query(query):
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Every word must match; words ending in '*', and the last word (so results
+    follow typing), match as prefixes. Words are quoted so FTS5 operators in
+    the input are treated as text.
+    """
+    words = re.findall(r'\w+\*?', query)
+    terms = []
+    for i, word in enumerate(words):
+        prefix = word.endswith('*') or i == len(words) - 1
+        word = word.rstrip('*')
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' AND '.join(terms)
+
+
+def search(query, offset, limit):
+    """BM25-ranked (post id, snippet) pairs for non-deleted posts matching query."""
+    match = build_match_query(query)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT rowid, snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 16)
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY bm25({FTS_TABLE}, %s, %s, %s), rowid
+                LIMIT %s OFFSET %s""",
+            [match, *BM25_WEIGHTS, limit, offset]
+        )
+        return cursor.fetchall()
+
+
+class RankedPostSearch:
+    """Search results as a source for RankedPagination."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def fetch(self, offset, limit):
+        return search(self.query, offset, limit)
@@ -0,0 +1,124 @@
+import time
+import bisect
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from core.models.posts import Post
+from core.models.comments import Comment, thread_path_upper_bound
+from core.utils.feed_cache import bump_feed_version
+from core.utils.image_derivatives import variant_names
+
+
+def retention_cutoff(days=None):
+    """Items soft-deleted before this moment are due for purging."""
+    if days is None:
+        days = getattr(settings, 'SOFT_DELETE_RETENTION_DAYS', 30)
+    return timezone.now() - timedelta(days=days)
+
+
+def image_files(queryset):
+    """
+    Stored names of the images of the rows in queryset, with their
+    derivatives; deleting the rows releases them (see release_stored_files).
+    """
+    names = []
+    for image, variants in queryset.values_list('image', 'image_variants'):
+        names.append(image)
+        names.extend(variant_names(variants))
+    return names
+
+
+def purge_posts(cutoff, batch_size):
+    """
+    Hard-delete posts soft-deleted before `cutoff`, together with their
+    comments and timeline entries. Yields (posts, image files released) per batch.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            post_ids = list(
+                Post.objects.filter(is_deleted=True, updated_at__lt=cutoff, id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not post_ids:
+                break
+            files = len(image_files(Post.objects.filter(id__in=post_ids)))
+            files += len(image_files(Comment.objects.filter(post_id__in=post_ids)))
+            # Files are released once the batch commits, so a rolled back batch never loses them
+            Post.objects.filter(id__in=post_ids).delete()
+            bump_feed_version()
+        last_id = post_ids[-1]
+        yield len(post_ids), files
+
+
+def purge_comments(cutoff, batch_size):
+    """
+    Hard-delete comments soft-deleted before `cutoff`, together with the
+    deleted replies under them. A comment with live replies anywhere below
+    it stays soft-deleted, so other users' replies keep their thread; it is
+    purged by a later run once they are gone. Yields (comments, image files
+    released) per batch.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            comments = list(
+                Comment.objects.filter(is_deleted=True, updated_at__lt=cutoff, id__gt=last_id)
+                .order_by('id')[:batch_size]
+            )
+            if not comments:
+                break
+            last_id = comments[-1].id
+            comments.sort(key=lambda comment: comment.thread_path)
+            live_paths = sorted(
+                Comment.objects.filter(subtree_filter(comments), is_deleted=False).values_list('thread_path', flat=True)
+            )
+            # In path order a subtree is contiguous, so comments under another one in the batch are skipped
+            roots = []
+            for comment in comments:
+                if roots and comment.thread_path.startswith(roots[-1].thread_path):
+                    continue
+                # The first live path at or after this comment's is inside its subtree if below the bound
+                position = bisect.bisect_left(live_paths, comment.thread_path)
+                if position < len(live_paths) and live_paths[position] < thread_path_upper_bound(comment.thread_path):
+                    continue
+                roots.append(comment)
+            count, files = 0, 0
+            if roots:
+                removed = Comment.objects.filter(subtree_filter(roots))
+                count = removed.count()
+                files = len(image_files(removed))
+                for comment in roots:
+                    comment.delete(hard_delete=True)
+        yield count, files
+
+
+def subtree_filter(comments):
+    """Q matching the comments and everything under them."""
+    subtrees = Q()
+    for comment in comments:
+        subtrees |= Q(
+            thread_path__gte=comment.thread_path,
+            thread_path__lt=thread_path_upper_bound(comment.thread_path)
+        )
+    return subtrees
+
+
+def purge_deleted(days=None, batch_size=None, pause=0):
+    """
+    Purge everything past the retention window: posts first, then comments.
+
+    Each batch is its own short transaction, and `pause` seconds between
+    batches let API writers take the SQLite write lock. Yields
+    ('posts' | 'comments', rows, image files released) per batch.
+    """
+    cutoff = retention_cutoff(days)
+    if batch_size is None:
+        batch_size = getattr(settings, 'PURGE_BATCH_SIZE', 200)
+    for kind, purge in (('posts', purge_posts), ('comments', purge_comments)):
+        for rows, files in purge(cutoff, batch_size):
+            yield kind, rows, files
+            if pause:
+                time.sleep(pause)
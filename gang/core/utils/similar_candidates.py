@@ -0,0 +1,230 @@
+import os
+import json
+import math
+import zlib
+import logging
+import threading
+from collections import defaultdict
+from django.apps import apps
+from django.conf import settings
+from core.utils.cv_match import term_frequencies, write_build, current_build
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    SIMILAR_SUPPORT = True
+except ImportError:
+    SIMILAR_SUPPORT = False
+    logger.warning("NumPy not installed. Similar candidates will not be available.")
+
+# Length of the hashed feature vectors; builds record it and FEATURES_VERSION, and are
+# only used while both match
+DIMENSIONS = 512
+FEATURES_VERSION = 1
+
+# Share of a vector given to each kind of feature
+FEATURE_WEIGHTS = {'cv': 1.0, 'skills': 0.7, 'interests': 0.3}
+
+# k-means for the inverted lists is trained on at most this many vectors per list
+TRAINING_VECTORS_PER_LIST = 64
+TRAINING_ITERATIONS = 10
+
+
+def index_dir():
+    return getattr(settings, 'SIMILAR_CANDIDATES_INDEX_DIR', os.path.join(settings.BASE_DIR, 'similar_candidates_index'))
+
+
+def hash_features(weights):
+    """
+    Unit-length vector of {feature: weight}, each feature hashed to a
+    position and a sign (CRC32, so vectors agree between processes).
+    """
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for feature, weight in weights.items():
+        digest = zlib.crc32(feature.encode())
+        vector[digest % DIMENSIONS] += weight if digest & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def vectorize(text, skill_ids, interest_ids):
+    """Feature vector of a profile: its CV's words, its skills and its interests."""
+    parts = (
+        ('cv', {term: 1 + math.log(count) for term, count in term_frequencies(text or '').items()}),
+        ('skills', {f'skill:{skill_id}': 1.0 for skill_id in skill_ids}),
+        ('interests', {f'interest:{interest_id}': 1.0 for interest_id in interest_ids}),
+    )
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for kind, weights in parts:
+        if weights:
+            vector += FEATURE_WEIGHTS[kind] * hash_features(weights)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def vectorize_rows(rows):
+    """(ids, vectors) of (profile id, cv_text, skill ids, interest ids) rows, without the empty ones."""
+    ids, vectors = [], []
+    for profile_id, text, skill_ids, interest_ids in rows:
+        vector = vectorize(text, skill_ids, interest_ids)
+        if vector.any():
+            ids.append(profile_id)
+            vectors.append(vector)
+    if not vectors:
+        return np.empty(0, dtype=np.int64), np.empty((0, DIMENSIONS), dtype=np.float32)
+    return np.asarray(ids, dtype=np.int64), np.vstack(vectors)
+
+
+def profile_rows(profiles):
+    """(profile id, cv_text, skill ids, interest ids) of (profile id, user id, cv_text) triples, in three queries."""
+    UserSkill = apps.get_model('core', 'UserSkill')
+    UserInterest = apps.get_model('core', 'UserInterest')
+    user_ids = [user_id for _, user_id, _ in profiles]
+    skills = defaultdict(list)
+    for user_id, skill_id in UserSkill.objects.filter(user_id__in=user_ids).values_list('user_id', 'skill_id'):
+        skills[user_id].append(skill_id)
+    interests = defaultdict(list)
+    for user_id, interest_id in UserInterest.objects.filter(user_id__in=user_ids).values_list('user_id', 'interest_id'):
+        interests[user_id].append(interest_id)
+    return [(pk, text, skills[user_id], interests[user_id]) for pk, user_id, text in profiles]
+
+
+def nearest(vectors, centroids, chunk_size=10000):
+    """Index of the most similar centroid of every vector, computed a chunk at a time."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        assignments[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, lists, seed=0):
+    """Spherical k-means over a sample of the vectors."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), lists * TRAINING_VECTORS_PER_LIST), replace=False)]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(TRAINING_ITERATIONS):
+        assignments = nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Lists left without vectors start again from random ones
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms[empty] = 1
+        centroids = (sums / norms[:, None]).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index of profile vectors for approximate nearest-neighbour
+    search. Vectors are partitioned among `lists` k-means centroids and
+    stored list after list, so a query compares itself with the centroids
+    and then only with the vectors of the `probes` closest lists: more
+    probes find more of the true nearest neighbours, fewer answer faster.
+    Loaded from a build directory, the vectors are memory-mapped.
+    """
+
+    def __init__(self, centroids, offsets, ids, vectors):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, ids, vectors, lists=None):
+        if lists is None:
+            lists = getattr(settings, 'SIMILAR_CANDIDATES_LISTS', None) or int(math.sqrt(len(ids)))
+        lists = max(1, min(lists, len(ids)))
+        if len(ids):
+            centroids = train_centroids(vectors, lists)
+        else:
+            centroids = np.zeros((1, DIMENSIONS), dtype=np.float32)
+        assignments = nearest(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=len(centroids)), out=offsets[1:])
+        return cls(centroids, offsets, ids[order], vectors[order])
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ('centroids', 'offsets', 'ids', 'vectors'):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'dimensions': DIMENSIONS, 'features_version': FEATURES_VERSION}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta != {'dimensions': DIMENSIONS, 'features_version': FEATURES_VERSION}:
+            raise ValueError(f'{directory} was built with other features; run build_similar_candidates_index')
+        arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                  for name in ('centroids', 'offsets', 'ids', 'vectors')]
+        return cls(*arrays)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def lists(self):
+        return len(self.centroids)
+
+    def search(self, vector, k, probes, exclude=None):
+        """Up to k (profile id, cosine similarity) pairs, best first, from the `probes` lists closest to vector."""
+        probes = max(1, min(probes, self.lists))
+        closest = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+        scores, ids = [], []
+        for position in closest:
+            start, end = self.offsets[position], self.offsets[position + 1]
+            if start < end:
+                scores.append(self.vectors[start:end] @ vector)
+                ids.append(self.ids[start:end])
+        if not scores:
+            return []
+        scores, ids = np.concatenate(scores), np.concatenate(ids)
+        if exclude is not None:
+            scores[ids == exclude] = -np.inf
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+_lock = threading.Lock()
+_state = {'index': None, 'build': None}
+
+
+def get_index():
+    """This process's index, memory-mapped from the current build; None if none was built."""
+    with _lock:
+        build = current_build(index_dir())
+        if build is None:
+            return None
+        if build != _state['build']:
+            _state['index'] = IVFIndex.load(os.path.join(index_dir(), build))
+            _state['build'] = build
+        return _state['index']
+
+
+def preload():
+    """
+    Load the index when a server process starts, so the first request does
+    not pay for it; with none built yet, requests load it once it is. The
+    centroids and list offsets, read by every query, are paged in here.
+    """
+    if not SIMILAR_SUPPORT:
+        return
+    try:
+        index = get_index()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load the similar candidates index: {str(e)}")
+        return
+    if index is not None:
+        index.centroids.sum()
+        index.offsets.sum()
+
+
+def write_index(index):
+    return write_build(index, index_dir())
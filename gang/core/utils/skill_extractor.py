@@ -0,0 +1,148 @@
+import re
+from collections import Counter, deque
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Max
+
+# (skills version, SkillMatcher) built by this process
+_matcher = None
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    return WHITESPACE_RE.sub(' ', text.lower()).strip()
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over skill names and aliases: finds every one of
+    them in a single pass over the text, however many skills there are.
+    Matches must start and end at word boundaries, so 'java' is not found in
+    'javascript' nor 'go' in 'good'; matching ignores case and runs of
+    whitespace.
+    """
+
+    def __init__(self, patterns):
+        # Node 0 is the root; goto[node][char] -> node, outputs[node] -> [(skill id, length)]
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        self.skill_ids = {}
+        for pattern, skill_id in patterns:
+            pattern = normalize(pattern)
+            if pattern:
+                self.add(pattern, skill_id)
+        self.link()
+
+    def add(self, pattern, skill_id):
+        self.skill_ids.setdefault(pattern, skill_id)
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            node = next_node
+        self.outputs[node].append((skill_id, len(pattern)))
+
+    def link(self):
+        # Breadth first, so a node's failure link is ready before its children's
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                # A node also ends every pattern its failure link ends
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def lookup(self, name):
+        """Skill id for an exact skill name or alias, or None."""
+        return self.skill_ids.get(normalize(name))
+
+    def find(self, text):
+        """Counter of skill id -> number of mentions in text."""
+        text = normalize(text)
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        counts = Counter()
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for skill_id, length in outputs[node]:
+                start = end - length
+                # Word boundaries only matter next to letters and digits ('c++', '.net')
+                starts_word = start == 0 or not (text[start - 1].isalnum() and text[start].isalnum())
+                ends_word = end == len(text) or not (text[end].isalnum() and text[end - 1].isalnum())
+                if starts_word and ends_word:
+                    counts[skill_id] += 1
+        return counts
+
+
+def get_skills_version():
+    """
+    State of the Skill table as (count, highest id, latest updated_at), read
+    from the database so every process, web or worker, sees the same: a
+    delete lowers the count, an insert raises the highest id and an edit
+    moves updated_at. QuerySet.update() does not touch updated_at; run
+    `manage.py extract_skills` after bulk updates.
+    """
+    Skill = apps.get_model('core', 'Skill')
+    state = Skill.objects.aggregate(count=Count('id'), last_id=Max('id'), updated_at=Max('updated_at'))
+    return state['count'], state['last_id'], state['updated_at']
+
+
+def build_matcher():
+    Skill = apps.get_model('core', 'Skill')
+    patterns = []
+    for skill_id, name, aliases in Skill.objects.values_list('id', 'name', 'aliases'):
+        patterns.append((name, skill_id))
+        patterns.extend((alias, skill_id) for alias in aliases or [])
+    return SkillMatcher(patterns)
+
+
+def get_matcher():
+    """This process's matcher, rebuilt from the Skill table only after it changed."""
+    global _matcher
+    version = get_skills_version()
+    if _matcher is None or _matcher[0] != version:
+        _matcher = (version, build_matcher())
+    return _matcher[1]
+
+
+def save_user_skills(found):
+    """
+    Store the skills found in the CVs of several users: found maps user id
+    to a Counter of skill id -> mentions. Skills are upserted with their
+    mention count; CV-only skills (no proficiency set) that are no longer
+    mentioned are removed and others keep their row with zero mentions.
+    """
+    if not found:
+        return
+    UserSkill = apps.get_model('core', 'UserSkill')
+    with transaction.atomic():
+        UserSkill.objects.bulk_create(
+            [
+                UserSkill(user_id=user_id, skill_id=skill_id, proficiency_level=0, cv_mentions=mentions)
+                for user_id, counts in found.items() for skill_id, mentions in counts.items()
+            ],
+            update_conflicts=True, unique_fields=['user', 'skill'], update_fields=['cv_mentions'],
+        )
+        for user_id, counts in found.items():
+            gone = UserSkill.objects.filter(user_id=user_id, cv_mentions__gt=0).exclude(skill_id__in=list(counts))
+            gone.filter(proficiency_level=0).delete()
+            gone.update(cv_mentions=0)
+
+
+def update_user_skills(texts):
+    """Extract and store the skills in CV texts: texts maps user id to cv_text."""
+    matcher = get_matcher()
+    save_user_skills({user_id: matcher.find(text or '') for user_id, text in texts.items()})
@@ -0,0 +1,57 @@
+import heapq
+from itertools import islice
+from core.models.posts import Post
+from core.models.interests import Interest
+from core.models.timelines import TimelineEntry
+from core.utils.pagination import KeysetPagination, keyset_filter
+
+
+class Timeline:
+    """
+    A user's personalized post stream.
+
+    Posts fanned out on write are read with one scan of the user's timeline
+    index. Posts in the user's fan-out-on-read interests are pulled from one
+    bounded stream per such interest and merged in.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def fetch(self, key, reverse, limit):
+        if reverse:
+            entry_order, post_order = ('created_at', 'post_id'), ('created_at', 'id')
+        else:
+            entry_order, post_order = ('-created_at', '-post_id'), ('-created_at', '-id')
+
+        entries = TimelineEntry.objects.filter(user=self.user, post__is_deleted=False)
+        if key is not None:
+            entries = entries.filter(keyset_filter('created_at', 'post_id', key, reverse))
+        entries = entries.select_related('post__user').order_by(*entry_order)[:limit]
+        streams = [[entry.post for entry in entries]]
+
+        # Large interests are few, and each stream reads at most `limit` rows
+        large_interests = Interest.objects.filter(
+            fanout_on_read=True,
+            userinterest__user=self.user
+        ).values_list('id', flat=True)
+        for interest_id in large_interests:
+            posts = Post.objects.filter(
+                interest_id=interest_id,
+                fanned_out=False,
+                is_deleted=False
+            ).exclude(user=self.user)
+            if key is not None:
+                posts = posts.filter(keyset_filter('created_at', 'id', key, reverse))
+            streams.append(list(posts.select_related('user').order_by(*post_order)[:limit]))
+
+        merged = heapq.merge(*streams, key=lambda post: (post.created_at, post.id), reverse=not reverse)
+        return list(islice(merged, limit))
+
+
+class TimelinePagination(KeysetPagination):
+    """Keyset pages over a Timeline, newest first, on (created_at, post id)."""
+    ordering_field = 'created_at'
+
+    def fetch(self, timeline, key, reverse, limit):
+        return timeline.fetch(key, reverse, limit)
@@ -0,0 +1,127 @@
+import os
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from core.utils.uploads import upload_rules
+
+# Leading bytes by extension as (offset, signature) pairs, any of which must match.
+# Extensions without an entry (plain text, ...) are not checked.
+OLE2 = (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')
+ZIP = (0, b'PK\x03\x04')
+ISO_MEDIA = [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'wide'), (4, b'free'), (4, b'skip')]
+MAGIC_NUMBERS = {
+    '.pdf': [(0, b'%PDF-')],
+    '.doc': [OLE2], '.xls': [OLE2], '.ppt': [OLE2],
+    '.docx': [ZIP], '.xlsx': [ZIP], '.pptx': [ZIP],
+    '.png': [(0, b'\x89PNG\r\n\x1a\n')],
+    '.jpg': [(0, b'\xff\xd8\xff')], '.jpeg': [(0, b'\xff\xd8\xff')],
+    '.gif': [(0, b'GIF87a'), (0, b'GIF89a')],
+    '.mp4': ISO_MEDIA, '.mov': ISO_MEDIA,
+    '.avi': [(8, b'AVI ')],
+    '.mkv': [(0, b'\x1a\x45\xdf\xa3')], '.webm': [(0, b'\x1a\x45\xdf\xa3')],
+}
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload too large.'
+    default_code = 'upload_too_large'
+
+
+class UploadContentMismatch(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'File content does not match its type.'
+    default_code = 'upload_content_mismatch'
+
+
+def matches_magic_number(ext, head):
+    signatures = MAGIC_NUMBERS.get(ext)
+    if not signatures:
+        return True
+    return any(head[offset:offset + len(signature)] == signature for offset, signature in signatures)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Runs ahead of Django's own upload handlers and stops the request as soon
+    as a file grows past the limit of its type, or when its first chunk does
+    not look like its extension, instead of after the whole body is spooled.
+
+    `field_types` maps file field names to UPLOAD_FILE_TYPES keys. A file
+    whose type is not known yet (None, or a field that isn't listed) is held
+    to the strictest limit among the types accepting its extension, or to
+    UPLOAD_MAX_SIZE if none does. The rejection is kept in `error` for
+    UploadLimitMixin to raise.
+    """
+
+    def __init__(self, request=None, field_types=None):
+        super().__init__(request)
+        self.field_types = field_types or {}
+        self.error = None
+
+    def max_size(self, file_type, ext=None):
+        if file_type:
+            rules = upload_rules(file_type)
+            return rules['max_size'] if rules else settings.UPLOAD_MAX_SIZE
+        limits = [
+            rules['max_size'] for rules in getattr(settings, 'UPLOAD_FILE_TYPES', {}).values()
+            if ext in rules['extensions']
+        ]
+        return min(limits, default=settings.UPLOAD_MAX_SIZE)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Every file at its limit plus the form fields Django accepts anyway
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        limit += sum(self.max_size(file_type) for file_type in self.field_types.values()) or settings.UPLOAD_MAX_SIZE
+        if content_length > limit:
+            raise UploadTooLarge({'error': f'Request too large (max {limit // (1024 * 1024)}MB)'})
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.ext = os.path.splitext(self.file_name or '')[1].lower()
+        self.limit = self.max_size(self.field_types.get(field_name), self.ext)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.limit:
+            self.reject(UploadTooLarge(
+                {'error': f'{self.file_name} is too large (max {self.limit // (1024 * 1024)}MB)'}
+            ))
+        if start == 0 and not matches_magic_number(self.ext, raw_data):
+            self.reject(UploadContentMismatch(
+                {'error': f'{self.file_name} is not a valid {self.ext} file'}
+            ))
+        return raw_data
+
+    def reject(self, error):
+        self.error = error
+        # Stop reading the body right here rather than draining it
+        raise StopUpload(connection_reset=True)
+
+    def file_complete(self, file_size):
+        # The handlers after this one build the file
+        return None
+
+
+class UploadLimitMixin:
+    """
+    For views taking multipart uploads: file fields in `upload_field_types`
+    are checked by LimitedUploadHandler while the body is read, before the
+    view runs. Authentication and permissions are checked first, so
+    anonymous bodies are never read at all.
+    """
+    upload_field_types = {}
+
+    def get_upload_field_types(self):
+        return self.upload_field_types
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not request.content_type.startswith('multipart/form-data'):
+            return
+        handler = LimitedUploadHandler(request._request, self.get_upload_field_types())
+        request._request.upload_handlers = [handler, *request._request.upload_handlers]
+        # Parse now, so a rejected upload never reaches the handler method
+        request.data
+        if handler.error is not None:
+            raise handler.error
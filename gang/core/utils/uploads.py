@@ -0,0 +1,154 @@
+import os
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from core.models.upload_sessions import UploadSession, UploadChunk
+from core.models.user_files import UserFile
+
+# Body of a chunk PUT is copied to the staging file in pieces of this size
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or session request that cannot be accepted; the message is shown to the client."""
+
+
+class StagedFile(File):
+    """A file already on disk, which the storage can move into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_rules(file_type):
+    """{'extensions': [...], 'max_size': bytes} for a file type, or None if it has no limits."""
+    return getattr(settings, 'UPLOAD_FILE_TYPES', {}).get(file_type)
+
+
+def check_upload(file_type, filename, size):
+    """Error message if a file breaks the extension or size rules of its type, else None."""
+    rules = upload_rules(file_type)
+    if rules is None:
+        return None
+    ext = os.path.splitext(filename)[1]
+    if ext.lower() not in rules['extensions']:
+        return f"Invalid file type. Allowed types: {', '.join(rules['extensions'])}"
+    if size > rules['max_size']:
+        return f"File too large (max {rules['max_size'] // (1024 * 1024)}MB)"
+    return None
+
+
+def staging_path(session):
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, f'{session.id}.part')
+
+
+def start_session(session):
+    """Create the staging file at its final size; chunks are written into it at their offsets."""
+    os.makedirs(settings.UPLOAD_STAGING_ROOT, exist_ok=True)
+    with open(staging_path(session), 'wb') as f:
+        # Sparse on most file systems, so nothing is written until the chunks arrive
+        f.truncate(session.size)
+
+
+def write_chunk(session, index, stream, sha256):
+    """
+    Copy chunk `index` from `stream` into the staging file and record it
+    once its length and SHA-256 check out. Chunks may arrive in any order
+    and in parallel, and a chunk can be sent again to replace it.
+    """
+    if session.file:
+        raise UploadError('Upload is already complete')
+    if not 0 <= index < session.chunk_count:
+        raise UploadError(f'Chunk index must be between 0 and {session.chunk_count - 1}')
+    if not sha256:
+        raise UploadError('X-Chunk-SHA256 header is required')
+
+    expected = session.chunk_length(index)
+    # Not received any more until the new bytes have been verified
+    UploadChunk.objects.filter(session=session, index=index).delete()
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        f = open(staging_path(session), 'r+b')
+    except FileNotFoundError:
+        raise UploadError('Upload session has expired')
+    with f:
+        f.seek(index * session.chunk_size)
+        while True:
+            data = stream.read(min(COPY_BUFFER_SIZE, expected + 1 - written)) if stream else b''
+            if not data:
+                break
+            written += len(data)
+            if written > expected:
+                raise UploadError(f'Chunk {index} must be {expected} bytes')
+            digest.update(data)
+            f.write(data)
+    if written != expected:
+        raise UploadError(f'Chunk {index} must be {expected} bytes, got {written}')
+    if digest.hexdigest() != sha256.lower():
+        raise UploadError(f'Checksum mismatch for chunk {index}')
+
+    UploadChunk.objects.update_or_create(
+        session=session, index=index, defaults={'size': written, 'sha256': digest.hexdigest()}
+    )
+    # Keeps an active session from being collected
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+
+
+def missing_chunks(session):
+    received = set(session.chunks.values_list('index', flat=True))
+    return [index for index in range(session.chunk_count) if index not in received]
+
+
+def complete_session(session):
+    """
+    Hand the assembled staging file to the storage, which moves it into
+    place, and return the stored name. Completing twice returns the same name.
+    """
+    if session.file:
+        return session.file
+    missing = missing_chunks(session)
+    if missing:
+        raise UploadError(f"Missing chunks: {', '.join(str(index) for index in missing)}")
+    path = staging_path(session)
+    name = f'user_{session.user_id}/{session.file_type}/{session.filename}'
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        raise UploadError('Upload session has expired')
+    with transaction.atomic():
+        with f:
+            session.file = default_storage.save(name, StagedFile(f, name=name))
+        # The session only remembers the name; the UserFile row holds the stored file's reference
+        UserFile.objects.create(
+            user_id=session.user_id, file_type=session.file_type, file=session.file,
+            original_filename=session.filename, size=session.size
+        )
+        session.save(update_fields=['file', 'updated_at'])
+        session.chunks.all().delete()
+    # Still there if an identical file was stored already
+    if os.path.exists(path):
+        os.remove(path)
+    return session.file
+
+
+def discard_session(session):
+    if os.path.exists(staging_path(session)):
+        os.remove(staging_path(session))
+    session.delete()
+
+
+def expire_sessions(hours=None):
+    """Delete sessions idle for longer than `hours`, with their staging files. Returns how many."""
+    if hours is None:
+        hours = getattr(settings, 'UPLOAD_SESSION_EXPIRY_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=hours)
+    expired = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        discard_session(session)
+        expired += 1
+    return expired
@@ -2,23 +2,37 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.core.files.storage import default_storage
 import os
-import uuid
 import logging
 from core.models.user_details import UserDetails
 from django.db import models
-from core.utils.cv_extractor import extract_cv_text
+from core.models.upload_sessions import UploadSession
+from core.models.user_files import UserFile
+from core.serializers.files import UploadSessionSerializer
+from core.utils.upload_handlers import UploadLimitMixin
+from core.utils.media_urls import signed_url
+from core.utils.uploads import (
+    UploadError, check_upload, upload_rules, start_session, write_chunk, complete_session, discard_session
+)
 
 logger = logging.getLogger(__name__)
 
-class FileUploadView(generics.GenericAPIView):
+class FileUploadView(UploadLimitMixin, generics.GenericAPIView):
     """
     Upload files like videos to the user's directory
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+
+    def get_upload_field_types(self):
+        # file_type is a form field, so it is only known ahead of the file when sent as ?file_type=;
+        # without it the file is held to the strictest type its extension could be
+        return {'file': self.request.query_params.get('file_type')}
     
     def post(self, request, *args, **kwargs):
         file_type = request.data.get('file_type', 'other')
@@ -40,8 +54,8 @@ class FileUploadView(generics.GenericAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Validate file size (10MB limit)
-            if file_obj.size > 10 * 1024 * 1024:
+            # Validate file size (UPLOAD_FILE_TYPES limit, 10MB by default)
+            if file_obj.size > upload_rules('cv')['max_size']:
                 logger.warning(f"CV file too large - User ID: {request.user.id}, Filename: {file_obj.name}, Size: {file_obj.size}")
                 return Response(
                     {"error": "CV file too large (max 10MB)"},
@@ -52,15 +66,12 @@ class FileUploadView(generics.GenericAPIView):
                 # Get or create user details
                 user_details, created = UserDetails.objects.get_or_create(user=request.user)
                 
-                # Save the CV file to the user's profile
+                # Save the CV file to the user's profile; this queues its text extraction
                 user_details.cv_file = file_obj
-                # Extract text from CV file and save it
-                cv_text = extract_cv_text(file_obj)
-                user_details.cv_text = cv_text
                 user_details.save()
                 
-                # Get the URL for the saved file
-                file_url = request.build_absolute_uri(user_details.cv_file.url)
+                # Signed, so the app can open it in a browser
+                file_url = signed_url(user_details.cv_file, request)
                 
                 logger.info(f"CV file uploaded successfully - User ID: {request.user.id}, Filename: {file_obj.name}")
                 
@@ -70,7 +81,8 @@ class FileUploadView(generics.GenericAPIView):
                     "file_url": file_url,
                     "size": file_obj.size,
                     "cv_url": file_url,
-                    "cv_original_filename": file_obj.name
+                    "cv_original_filename": file_obj.name,
+                    "cv_extraction_status": user_details.cv_extraction_status
                 }, status=status.HTTP_201_CREATED)
                 
             except Exception as e:
@@ -81,70 +93,92 @@ class FileUploadView(generics.GenericAPIView):
                 )
         
         # Handle other file types
-        elif file_type == 'video':
-            allowed_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
-            max_size = 100 * 1024 * 1024  # 100MB
-            
-            # Check extension
-            _, ext = os.path.splitext(file_obj.name)
-            if ext.lower() not in allowed_extensions:
-                return Response(
-                    {"error": f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Check size
-            if file_obj.size > max_size:
-                return Response(
-                    {"error": "File too large (max 100MB)"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        elif file_type == 'document':
-            allowed_extensions = ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx', '.ppt', '.pptx']
-            max_size = 20 * 1024 * 1024  # 20MB
-            
-            # Check extension
-            _, ext = os.path.splitext(file_obj.name)
-            if ext.lower() not in allowed_extensions:
-                return Response(
-                    {"error": f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Check size
-            if file_obj.size > max_size:
-                return Response(
-                    {"error": "File too large (max 20MB)"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        else:
+            error = check_upload(file_type, file_obj.name, file_obj.size)
+            if error:
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
                 
-        # Generate a unique filename to prevent overwrites
-        original_filename = file_obj.name
-        filename, ext = os.path.splitext(original_filename)
-        unique_filename = f"{filename}_{uuid.uuid4().hex[:8]}{ext}"
-        
-        # Create user-specific folder with user ID
-        user_folder = f"user_{request.user.id}/{file_type}"
-        user_folder_path = os.path.join(settings.MEDIA_ROOT, user_folder)
-        os.makedirs(user_folder_path, exist_ok=True)
-        
-        # Save the file
-        file_path = os.path.join(user_folder_path, unique_filename)
-        with open(file_path, 'wb+') as destination:
-            for chunk in file_obj.chunks():
-                destination.write(chunk)
+        # The storage names the file by its content, so repeated uploads share one copy;
+        # the UserFile row holds this upload's reference to it
+        user_file = UserFile.objects.create(
+            user=request.user, file_type=file_type, file=file_obj,
+            original_filename=file_obj.name, size=file_obj.size
+        )
+        file_name = user_file.file.name
         
         # Return the URL to the file
-        file_url = f"{settings.MEDIA_URL}{user_folder}/{unique_filename}"
-        absolute_url = request.build_absolute_uri(file_url)
+        absolute_url = request.build_absolute_uri(user_file.file.url)
         
         return Response({
-            "file_name": unique_filename,
+            "file_name": os.path.basename(file_name),
             "file_type": file_type,
             "file_url": absolute_url,
             "size": file_obj.size
         }, status=status.HTTP_201_CREATED)
 
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a resumable upload: POST file_type, filename and size, then PUT
+    each chunk and POST to complete/. Lost chunks are sent again after
+    checking received_chunks on the session.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = UploadSessionSerializer
+
+    def perform_create(self, serializer):
+        session = serializer.save(user=self.request.user)
+        start_session(session)
+        logger.info(f"Upload session started - User ID: {self.request.user.id}, Session: {session.id}, Size: {session.size}")
+
+class UploadSessionDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Show which chunks of an upload have arrived, or abandon it
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_session(instance)
+
+class UploadChunkView(APIView):
+    """
+    PUT the raw bytes of chunk <index> with its hex SHA-256 in X-Chunk-SHA256.
+    Chunks may be sent in parallel and in any order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, index):
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        try:
+            write_chunk(session, index, request.stream, request.headers.get('X-Chunk-SHA256', ''))
+        except UploadError as e:
+            logger.warning(f"Chunk rejected - User ID: {request.user.id}, Session: {session.id}, Error: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"index": index, "size": session.chunk_length(index)})
+
+class UploadSessionCompleteView(APIView):
+    """
+    Assemble an upload once all of its chunks have arrived
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        try:
+            file_name = complete_session(session)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"Upload session completed - User ID: {request.user.id}, Session: {session.id}")
+        return Response({
+            "file_name": os.path.basename(file_name),
+            "file_type": session.file_type,
+            "file_url": request.build_absolute_uri(default_storage.url(file_name)),
+            "size": session.size
+        }, status=status.HTTP_201_CREATED)
+
 def get_upload_path(instance, filename):
     # File will be uploaded to MEDIA_ROOT/user_<id>/<filename>
     return f'user_{instance.user.id}/{filename}' 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import re
+import logging
+import mimetypes
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views import View
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from core.models.user_details import UserDetails
+from core.utils.content_storage import BLOB_PREFIX, is_blob
+from core.utils.media_urls import has_valid_signature
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    (start, end) byte positions, inclusive, for a single `bytes=` range;
+    None to send the whole file (no, malformed or multi-part range) and
+    False if the range starts past the end of the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes
+        if int(last) == 0:
+            return False
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class RangeFile:
+    """Reads `length` bytes of an open file from `start`, for FileResponse."""
+
+    def __init__(self, f, start, length):
+        self.file = f
+        self.remaining = length
+        f.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class MediaView(View):
+    """
+    Serve files under MEDIA_ROOT.
+
+    After authorizing the request, the bytes are handed to the front-end
+    server (MEDIA_SENDFILE = 'x-accel-redirect' for nginx, 'x-sendfile' for
+    Apache/lighttpd) or, without one, streamed by FileResponse with support
+    for single byte ranges, so videos can seek and downloads resume.
+    Content-addressed blobs never change, so they are cached for good.
+    """
+    http_method_names = ['get', 'head']
+    # Set by is_authorized() for CVs, which are never cached publicly
+    is_cv = False
+
+    def get_user(self, request):
+        """The user of the session or of a JWT bearer token, or None."""
+        if request.user.is_authenticated:
+            return request.user
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+        return authenticated[0] if authenticated else None
+
+    def is_authorized(self, request, name):
+        """
+        Whether the file `name`, relative to MEDIA_ROOT and normalized, may
+        be sent. With MEDIA_REQUIRE_AUTH every file needs a signed-in user;
+        CVs, whoever asks, only go to the profiles holding them and to
+        Company users. A URL signed by core.utils.media_urls stands in for
+        the user until it expires.
+        """
+        # Half-written blobs and dot files are never served
+        if name.startswith(f'{BLOB_PREFIX}/tmp/') or any(part.startswith('.') for part in name.split('/')):
+            return False
+        signature = request.GET.get('sig')
+        if signature and has_valid_signature(name, signature):
+            # Signed URLs are only handed out for CVs; keep them out of shared caches
+            self.is_cv = True
+            return True
+        user = self.get_user(request)
+        if user is None and getattr(settings, 'MEDIA_REQUIRE_AUTH', True):
+            return False
+        cv_owners = set(UserDetails.objects.filter(cv_file=name).values_list('user_id', flat=True))
+        if cv_owners:
+            self.is_cv = True
+            return user is not None and (user.pk in cv_owners or user.user_type == 'Company')
+        return True
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404
+        # The checks below see the name as the file system will, e.g. blobs//tmp/x as blobs/tmp/x
+        path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+        if not self.is_authorized(request, path):
+            raise Http404
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+
+        if is_blob(path):
+            # The name is the SHA-256 of the content
+            etag = quote_etag(os.path.splitext(os.path.basename(path))[0])
+        else:
+            etag = quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.file_response(request, path, full_path, stat.st_size, etag, last_modified)
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        response['Accept-Ranges'] = 'bytes'
+        self.patch_cache_control(response, path)
+        return response
+
+    def patch_cache_control(self, response, path):
+        private = getattr(settings, 'MEDIA_REQUIRE_AUTH', True) or self.is_cv
+        visibility = {'private': True} if private else {'public': True}
+        if is_blob(path):
+            patch_cache_control(response, max_age=31536000, immutable=True, **visibility)
+        else:
+            patch_cache_control(response, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600), **visibility)
+
+    def file_response(self, request, path, full_path, size, etag, last_modified):
+        content_type, encoding = mimetypes.guess_type(full_path)
+        if encoding or not content_type:
+            # Compressed files are sent as they are, not as their decompressed type
+            content_type = 'application/octet-stream'
+
+        sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+        if sendfile:
+            # The front-end server sends the bytes and answers Range requests itself
+            response = HttpResponse(content_type=content_type)
+            if sendfile == 'x-accel-redirect':
+                response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+            else:
+                response['X-Sendfile'] = full_path
+            return response
+
+        byte_range = None
+        if request.method == 'GET' and self.range_applies(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+        elif byte_range:
+            response = FileResponse(RangeFile(open(full_path, 'rb'), start, length), content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(length)
+        return response
+
+    def range_applies(self, request, etag, last_modified):
+        # If-Range: only send a part if the client's copy is still the current one
+        if_range = request.headers.get('If-Range')
+        if not if_range or not request.headers.get('Range'):
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+        return parse_http_date_safe(if_range) == last_modified
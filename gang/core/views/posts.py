@@ -4,33 +4,194 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db.models import Q
 from core.models.posts import Post
-from core.models.comments import Comment
+from core.models.comments import Comment, thread_path_upper_bound
 from core.serializers.posts import PostSerializer, CommentSerializer
 from core.models.interests import Interest
 from core.serializers.interests import InterestSerializer
+from core.utils.pagination import CreatedAtCursorPagination, UpdatedAtCursorPagination, RankedPagination
+from core.utils.comment_tree import CommentTree, get_thread_depth
+from core.utils.conditional import ConditionalGetMixin, queryset_state, row_state
+from core.utils import feed_cache, post_search
+from core.utils.timeline import Timeline, TimelinePagination
 from django.http import Http404
 import json
 
 
-class PostListCreateView(generics.ListCreateAPIView):
+class FieldSelectionMixin:
+    """
+    Pass ?fields= and ?expand= to the serializer context on reads.
+
+    ?fields=id,title whitelists output fields, ?expand=comments / ?expand=replies
+    opts into nested data, down to ?depth= reply levels. include_replies=true
+    is accepted as an alias for expand=replies.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is None or self.request.method != 'GET':
+            return context
+        params = self.request.query_params
+        fields = {name.strip() for name in params.get('fields', '').split(',') if name.strip()}
+        expand = {name.strip() for name in params.get('expand', '').split(',') if name.strip()}
+        if params.get('include_replies', '').lower() == 'true':
+            expand.add('replies')
+        context['fields'] = fields or None
+        context['expand'] = expand
+        return context
+
+    def is_expanded(self, name, context=None):
+        context = context if context is not None else self.get_serializer_context()
+        if name not in context.get('expand', ()):
+            return False
+        return not context.get('fields') or name in context['fields']
+
+    def is_detail(self):
+        return (self.lookup_url_kwarg or self.lookup_field) in self.kwargs
+
+
+class PostPageMixin(ConditionalGetMixin, FieldSelectionMixin):
+    """
+    List a page of posts; comment trees are only fetched for ?expand=comments.
+    """
+
+    def get_validator_state(self):
+        if self.is_detail():
+            # Post, counter and author in one small query; empty for a 404
+            post_id = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            state = row_state(
+                self.get_queryset().filter(pk=post_id), 'updated_at', 'comment_count', 'user__updated_at'
+            )
+            post_ids = [post_id]
+        else:
+            rows = self.get_validator_rows()
+            state = tuple(value for row in rows for value in row)
+            post_ids = [row[0] for row in rows]
+        if self.is_expanded('comments'):
+            state += queryset_state(Comment.objects.filter(post_id__in=post_ids, is_deleted=False))
+        return state
+
+    def get_last_modified(self, state):
+        # The newest post of a page goes back in time when one is deleted, so lists only get an ETag
+        return super().get_last_modified(state) if self.is_detail() else None
+
+    def get_validator_rows(self):
+        """(id, updated_at, comment_count, author updated_at) of the posts on the requested page."""
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            'id', 'updated_at', 'comment_count', 'user__updated_at'
+        )
+        return self.paginator.peek(queryset, self.request)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, context=self.get_page_context(page))
+        response = self.get_paginated_response(serializer.data)
+        response.content_type = "application/json; charset=utf-8"
+        return response
+
+    def get_page_context(self, posts):
+        context = self.get_serializer_context()
+        if self.is_expanded('comments', context):
+            context['comment_tree'] = CommentTree.for_posts(
+                [post.id for post in posts], get_thread_depth(self.request)
+            )
+        return context
+
+
+class CommentPageMixin(ConditionalGetMixin, FieldSelectionMixin):
+    """
+    List a page of comments; replies are only fetched for ?expand=replies,
+    down to ?depth= levels with one range scan per thread.
+    """
+
+    def get_validator_state(self):
+        if self.is_detail():
+            comment_id = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            rows = list(self.get_queryset().filter(pk=comment_id).values_list(
+                'id', 'updated_at', 'reply_count', 'user__updated_at', 'thread_path'
+            ))
+        else:
+            queryset = self.filter_queryset(self.get_queryset()).values_list(
+                'id', 'updated_at', 'reply_count', 'user__updated_at', 'thread_path'
+            )
+            rows = self.paginator.peek(queryset, self.request)
+        state = tuple(value for row in rows for value in row[:-1])
+        if self.is_expanded('replies') and rows:
+            # The replies under each comment are one range of thread paths
+            subtrees = Q()
+            for row in rows:
+                subtrees |= Q(thread_path__gt=row[-1], thread_path__lt=thread_path_upper_bound(row[-1]))
+            state += queryset_state(Comment.objects.filter(subtrees, is_deleted=False))
+        return state
+
+    def get_last_modified(self, state):
+        # As for posts, lists only get an ETag
+        return super().get_last_modified(state) if self.is_detail() else None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, context=self.get_page_context(page))
+        response = self.get_paginated_response(serializer.data)
+        response.content_type = "application/json; charset=utf-8"
+        return response
+
+    def get_page_context(self, comments):
+        context = self.get_serializer_context()
+        if self.is_expanded('replies', context):
+            context['comment_tree'] = CommentTree.for_threads(comments, get_thread_depth(self.request))
+        return context
+
+
+class PostListCreateView(PostPageMixin, generics.ListCreateAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def get_queryset(self):
         # Return only non-deleted posts by default
-        return Post.objects.filter(is_deleted=False).order_by('-created_at')
+        queryset = Post.objects.filter(is_deleted=False).select_related('user').order_by('-created_at')
+        interest = self.request.query_params.get('interest')
+        if interest and interest.isdigit():
+            queryset = queryset.filter(interest_id=interest)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_cached_page(self):
+        """
+        (cache key, cached entry) of the requested feed page, looked up once
+        per request. The key is None past FEED_CACHE_PAGES, the entry None on
+        a miss.
+        """
+        if not hasattr(self, '_cached_page'):
+            cache_key = feed_cache.page_cache_key(self.request, self.paginator.get_page_number(self.request))
+            self._cached_page = (cache_key, feed_cache.get_page(cache_key) if cache_key else None)
+        return self._cached_page
+
+    def get_validator_state(self):
+        cache_key, entry = self.get_cached_page()
+        if entry is not None:
+            # Cached pages keep the validators they were built with, so a hit runs no query
+            return entry['state']
+        self.validator_state = super().get_validator_state()
+        return self.validator_state
+
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(
-            serializer.data,
-            content_type="application/json; charset=utf-8"
-        )
+        # The first pages of the feed are served from a cache keyed by the feed version
+        cache_key, entry = self.get_cached_page()
+        if cache_key is None:
+            return super().list(request, *args, **kwargs)
+        if entry is not None:
+            response = Response(entry['data'], content_type="application/json; charset=utf-8")
+            response['X-Feed-Cache'] = 'hit'
+            return response
+        response = super().list(request, *args, **kwargs)
+        feed_cache.set_page(cache_key, {'state': self.validator_state, 'data': response.data})
+        response['X-Feed-Cache'] = 'miss'
+        return response
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -43,14 +204,49 @@ class PostListCreateView(generics.ListCreateAPIView):
         )
 
 
-class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ForYouPostListView(PostPageMixin, generics.ListAPIView):
+    """
+    Personalized feed of posts in the interests the user follows.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimelinePagination
+
+    def get_queryset(self):
+        return Timeline(self.request.user)
+
+    def get_validator_rows(self):
+        posts = self.paginator.peek(self.get_queryset(), self.request)
+        return [(post.id, post.updated_at, post.comment_count, post.user.updated_at) for post in posts]
+
+
+class FeedCacheStatsView(views.APIView):
+    """
+    Hit/miss statistics for the post feed cache. Staff only.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(feed_cache.get_stats())
+
+    def delete(self, request):
+        feed_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class PostDetailView(PostPageMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     
     def get_queryset(self):
         # Include both deleted and non-deleted posts for retrieval
-        return Post.objects.all()
+        return Post.objects.select_related('user')
+
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_object()
+        serializer = self.get_serializer(post, context=self.get_page_context([post]))
+        return Response(serializer.data)
 
     def perform_update(self, serializer):
         post = self.get_object()
@@ -83,23 +279,29 @@ class PostHardDeleteView(views.APIView):
             return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class UserPostListView(generics.ListAPIView):
+class UserPostListView(PostPageMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         username = self.kwargs.get('username')
         # Only return non-deleted posts by default
-        return Post.objects.filter(user__username=username, is_deleted=False).order_by('-created_at')
+        return Post.objects.filter(
+            user__username=username, is_deleted=False
+        ).select_related('user').order_by('-created_at')
 
 
-class DeletedPostListView(generics.ListAPIView):
+class DeletedPostListView(PostPageMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UpdatedAtCursorPagination
     
     def get_queryset(self):
         # Only return the current user's deleted posts
-        return Post.objects.filter(user=self.request.user, is_deleted=True).order_by('-updated_at')
+        return Post.objects.filter(
+            user=self.request.user, is_deleted=True
+        ).select_related('user').order_by('-updated_at')
 
 
 class PostRestoreView(views.APIView):
@@ -124,20 +326,55 @@ class PostRestoreView(views.APIView):
             return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class SearchPostView(generics.ListAPIView):
+class SearchPostView(PostPageMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'content', 'user__username']
     
     def get_queryset(self):
         # Only search non-deleted posts
-        return Post.objects.filter(is_deleted=False).order_by('-created_at')
+        return Post.objects.filter(is_deleted=False).select_related('user').order_by('-created_at')
+
+    def use_full_text_search(self, query):
+        return post_search.is_available() and bool(post_search.build_match_query(query))
 
+    def get_validator_rows(self):
+        query = self.request.query_params.get(filters.SearchFilter.search_param, '')
+        if not self.use_full_text_search(query):
+            return super().get_validator_rows()
+        hits = RankedPagination().paginate_queryset(post_search.RankedPostSearch(query), self.request, view=self)
+        return list(self.get_queryset().filter(id__in=[post_id for post_id, _ in hits]).values_list(
+            'id', 'updated_at', 'comment_count', 'user__updated_at'
+        ).order_by('id'))
 
-class CommentListCreateView(generics.ListCreateAPIView):
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get(filters.SearchFilter.search_param, '')
+        if not self.use_full_text_search(query):
+            # No FTS5 index (or no search words): SearchFilter LIKE scans, newest first
+            return super().list(request, *args, **kwargs)
+
+        # BM25-ranked full-text search with highlighted snippets
+        paginator = RankedPagination()
+        hits = paginator.paginate_queryset(post_search.RankedPostSearch(query), request, view=self)
+        posts = self.get_queryset().in_bulk([post_id for post_id, _ in hits])
+        page = [posts[post_id] for post_id, _ in hits if post_id in posts]
+        snippets = dict(hits)
+
+        context = self.get_page_context(page)
+        serializer = self.get_serializer(page, many=True, context=context)
+        results = serializer.data
+        if not context.get('fields') or 'snippet' in context['fields']:
+            for item in results:
+                item['snippet'] = snippets.get(item['id'])
+        return paginator.get_paginated_response(results)
+
+
+class CommentListCreateView(CommentPageMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def get_queryset(self):
@@ -147,21 +384,13 @@ class CommentListCreateView(generics.ListCreateAPIView):
             post_id=post_id, 
             parent_comment=None,
             is_deleted=False
-        ).order_by('-created_at')
+        ).select_related('user').order_by('-created_at')
 
     def perform_create(self, serializer):
         post_id = self.kwargs.get('post_id')
         post = Post.objects.get(id=post_id)
         serializer.save(user=self.request.user, post=post)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(
-            serializer.data,
-            content_type="application/json; charset=utf-8"
-        )
-
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -173,20 +402,25 @@ class CommentListCreateView(generics.ListCreateAPIView):
         )
 
 
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetailView(CommentPageMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     
     def get_queryset(self):
         # Include both deleted and non-deleted comments for retrieval
-        return Comment.objects.all()
+        return Comment.objects.select_related('user')
     
     def get_object(self):
         obj = super().get_object()
         if obj.is_deleted:
             raise Http404("Comment not found")
         return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        comment = self.get_object()
+        serializer = self.get_serializer(comment, context=self.get_page_context([comment]))
+        return Response(serializer.data)
     
     def perform_update(self, serializer):
         comment = self.get_object()
@@ -200,6 +434,28 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()  # This uses our overridden delete method for soft delete
 
 
+class CommentThreadView(CommentPageMixin, generics.RetrieveAPIView):
+    """
+    Retrieve a comment with the replies under it, down to ?depth= levels.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Comment.objects.filter(is_deleted=False).select_related('user')
+
+    def get_serializer_context(self):
+        # Replies are what this endpoint is for
+        context = super().get_serializer_context()
+        context['expand'] = context.get('expand', set()) | {'replies'}
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        comment = self.get_object()
+        serializer = self.get_serializer(comment, context=self.get_page_context([comment]))
+        return Response(serializer.data)
+
+
 class CommentHardDeleteView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
     
@@ -219,13 +475,16 @@ class CommentHardDeleteView(views.APIView):
             return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class DeletedCommentListView(generics.ListAPIView):
+class DeletedCommentListView(CommentPageMixin, generics.ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UpdatedAtCursorPagination
     
     def get_queryset(self):
         # Only return the current user's deleted comments
-        return Comment.objects.filter(user=self.request.user, is_deleted=True).order_by('-updated_at')
+        return Comment.objects.filter(
+            user=self.request.user, is_deleted=True
+        ).select_related('user').order_by('-updated_at')
 
 
 class CommentRestoreView(views.APIView):
@@ -273,9 +532,10 @@ class CommentReplyCreateView(generics.CreateAPIView):
         )
 
 
-class UserCommentListView(generics.ListAPIView):
+class UserCommentListView(CommentPageMixin, generics.ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         username = self.kwargs.get('username')
@@ -283,7 +543,7 @@ class UserCommentListView(generics.ListAPIView):
         return Comment.objects.filter(
             user__username=username, 
             is_deleted=False
-        ).order_by('-created_at')
+        ).select_related('user').order_by('-created_at')
 
 
 class InterestListView(generics.ListAPIView):
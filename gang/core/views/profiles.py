@@ -3,23 +3,43 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 import logging
 from rest_framework.exceptions import PermissionDenied
-from django.db.models import Q
 import re
 
 from core.models.user_details import UserDetails
-from core.serializers.profiles import UserDetailsSerializer, UserDetailsUpdateSerializer
-from core.utils.cv_extractor import extract_cv_text
+from core.serializers.profiles import (
+    UserDetailsSerializer, UserDetailsUpdateSerializer, CVSearchResultSerializer, CVMatchResultSerializer
+)
+from core.utils.upload_handlers import UploadLimitMixin
+from core.utils.uploads import upload_rules
+from core.utils.conditional import ConditionalGetMixin, row_state
+from core.utils.media_urls import signing_period_start
+from core.utils.pagination import RankedPagePagination
+from core.utils import cv_search, cv_match, similar_candidates
+from core.utils.skill_extractor import get_matcher
 
 logger = logging.getLogger(__name__)
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalGetMixin, UploadLimitMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve and update the authenticated user's profile
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    upload_field_types = {
+        'cv_file': 'cv',
+        'profile_picture': 'profile_picture',
+        'background_image': 'background_image',
+    }
+
+    def get_validator_state(self):
+        # cv_url is signed for the current signing period
+        return (
+            *row_state(UserDetails.objects.filter(user=self.request.user), 'updated_at', 'user__updated_at'),
+            signing_period_start(),
+        )
     
     def get_object(self):
         try:
@@ -65,32 +85,36 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Validate file size (10MB limit)
-                if cv_file.size > 10 * 1024 * 1024:
+                # Validate file size (UPLOAD_FILE_TYPES limit, 10MB by default)
+                if cv_file.size > upload_rules('cv')['max_size']:
                     logger.warning(f"File too large - User ID: {request.user.id}, Filename: {cv_file.name}, Size: {cv_file.size}")
                     return Response(
                         {"error": "CV file too large (max 10MB)"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Extract text from CV file
-                cv_text = extract_cv_text(cv_file)
-                instance.cv_text = cv_text
-                instance.cv_file = cv_file
-                instance.save()
-                logger.info(f"CV file saved successfully - User ID: {request.user.id}, Filename: {cv_file.name}")
-            
+            # Saving a new cv_file queues its text extraction; the response carries cv_extraction_status
             return super().patch(request, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error in PATCH request - User ID: {request.user.id}, Error: {str(e)}")
             raise
 
-class PublicUserProfileView(generics.RetrieveAPIView):
+class PublicUserProfileView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     Retrieve another user's public profile by username
     """
     serializer_class = UserDetailsSerializer
     permission_classes = [permissions.AllowAny]
+
+    def get_validator_state(self):
+        # cv_url is signed for the current signing period, and only for those who may read the CV
+        return (
+            *row_state(
+                UserDetails.objects.filter(user__username=self.kwargs.get('username')), 'updated_at', 'user__updated_at'
+            ),
+            getattr(self.request.user, 'user_type', None),
+            signing_period_start(),
+        )
     
     def get_object(self):
         try:
@@ -104,74 +128,178 @@ class PublicUserProfileView(generics.RetrieveAPIView):
 
 class CVSearchView(generics.ListAPIView):
     """
-    Search users by CV content.
+    Search users by CV content, name and bio.
     Only accessible by company users.
+
+    Words must all match; OR between words makes alternatives, "quoted text"
+    is a phrase and word* matches a prefix. Results are BM25-ranked from the
+    FTS5 index and paginated by ?page=, with a total_estimate; each carries
+    its score and a `snippet` with the matched terms in <mark> tags. Of
+    near-duplicate CVs (see cv_duplicates) only the best match is listed.
+
+    ?skills=Python,Django (or "Python AND Django") only keeps users with all
+    of the skills extracted from their CV, by name or alias; with no q, all
+    of them are listed, most recently updated first.
     """
-    serializer_class = UserDetailsSerializer
+    serializer_class = CVSearchResultSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RankedPagePagination
 
     def get_queryset(self):
-        # Log user type
-        logger.info(f"CV search attempt - User: {self.request.user.username}, User Type: {self.request.user.user_type}")
-        
-        # Only company users can search CVs
-        if self.request.user.user_type != 'Company':
-            logger.warning(f"Access denied - User {self.request.user.username} is not a company user")
-            return UserDetails.objects.none()
-
-        # Get search query from query parameters
-        query = self.request.query_params.get('q', '').strip()
-        if not query:
-            logger.info("Empty search query")
-            return UserDetails.objects.none()
-
-        # Clean and prepare search terms
-        # Remove punctuation and split into words
-        search_terms = re.findall(r'\w+', query.lower())
-        if not search_terms:
-            logger.info("No valid search terms after cleaning")
-            return UserDetails.objects.none()
-
-        # Log total number of CVs in database
-        total_cvs = UserDetails.objects.filter(cv_file__isnull=False).count()
-        logger.info(f"Total CVs in database: {total_cvs}")
-
-        # Build the search query
-        # Use Q objects to create a more flexible search
-        search_query = Q()
-        for term in search_terms:
-            # Search in cv_text (case-insensitive)
-            search_query |= Q(cv_text__icontains=term)
-            # Also search in user's full name and bio
-            search_query |= Q(full_name__icontains=term)
-            search_query |= Q(bio__icontains=term)
-
-        # Get users with CVs that match the search
-        # Exclude users without CVs
-        queryset = UserDetails.objects.filter(
-            search_query,
-            cv_file__isnull=False
-        ).select_related('user')
-
-        # Log detailed search information
-        logger.info(f"""
-        CV search details:
-        - User: {self.request.user.username}
-        - Query: {query}
-        - Search terms: {search_terms}
-        - Total CVs: {total_cvs}
-        - Matching CVs: {queryset.count()}
-        - First few matches: {[{'username': q.user.username, 'has_cv': bool(q.cv_file)} for q in queryset[:3]]}
-        """)
-        
-        return queryset
+        # Only the columns CVSearchResultSerializer reads
+        return UserDetails.objects.select_related('user').only(
+            'id', 'full_name', 'location', 'cv_file', 'user__username'
+        )
+
+    def get_skill_ids(self):
+        """Ids of the ?skills= filter, or None if one of them is not a known skill."""
+        names = re.split(r'\s*(?:,|\bAND\b)\s*', self.request.query_params.get('skills', ''))
+        matcher = get_matcher()
+        skill_ids = [matcher.lookup(name) for name in names if name.strip()]
+        return None if None in skill_ids else skill_ids
+
+    def get_search_source(self, query, skill_ids):
+        if cv_search.is_available() and cv_search.build_match_query(query):
+            return cv_search.RankedCVSearch(query, skill_ids)
+        # Only skills, or no FTS5 index: most recently updated first
+        return cv_search.ScanCVSearch(query, skill_ids)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # If no results found, return a helpful message
-        if not queryset.exists():
-            return Response([])
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        paginator = self.paginator
+        query = request.query_params.get('q', '').strip()
+        skill_ids = self.get_skill_ids()
+        # Only company users can search CVs
+        if request.user.user_type != 'Company':
+            logger.warning(f"CV search denied - User {request.user.username} is not a company user")
+            query, skill_ids = '', []
+        elif skill_ids is None:
+            # Nobody has a skill that doesn't exist
+            query, skill_ids = '', []
+        hits = paginator.paginate_queryset(self.get_search_source(query, skill_ids), request, view=self)
+
+        profiles = self.get_queryset().in_bulk([pk for pk, _, _ in hits])
+        page = []
+        for pk, score, snippet in hits:
+            profile = profiles.get(pk)
+            if profile is not None:
+                profile.score = score
+                profile.snippet = snippet
+                page.append(profile)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data) 
+
+class CVMatchView(generics.GenericAPIView):
+    """
+    Candidates whose CV best matches a job description.
+    Only accessible by company users.
+
+    POST {"description": "...", "k": 20} returns the k CVs (at most
+    CV_MATCH_MAX_RESULTS) with the highest TF-IDF cosine similarity to the
+    description, best first. Scoring runs over the in-memory CV matrix of
+    cv_match, which follows CV changes within CV_MATCH_REFRESH_SECONDS.
+    """
+    serializer_class = CVMatchResultSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if request.user.user_type != 'Company':
+            raise PermissionDenied("Only company users can match CVs")
+        if not cv_match.MATCH_SUPPORT:
+            return Response(
+                {"error": "CV matching is not available"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        description = str(request.data.get('description') or '').strip()
+        if not description:
+            return Response({"error": "A job description is required"}, status=status.HTTP_400_BAD_REQUEST)
+        max_results = getattr(settings, 'CV_MATCH_MAX_RESULTS', 100)
+        try:
+            k = int(request.data.get('k', 20))
+        except (TypeError, ValueError):
+            k = 0
+        if not 1 <= k <= max_results:
+            return Response(
+                {"error": f"k must be between 1 and {max_results}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        index = cv_match.get_index()
+        # A few spare matches make up for CVs removed since the index was refreshed
+        matches = index.top(description, k + 10)
+        profiles = UserDetails.objects.select_related('user').only(
+            'id', 'full_name', 'location', 'cv_file', 'user__username'
+        ).exclude(cv_file__isnull=True).exclude(cv_file='').in_bulk([pk for pk, _ in matches])
+        results = []
+        for pk, score in matches:
+            profile = profiles.get(pk)
+            if profile is not None and len(results) < k:
+                profile.score = score
+                results.append(profile)
+        return Response({
+            'indexed': len(index),
+            'results': self.get_serializer(results, many=True).data,
+        })
+
+class SimilarCandidatesView(generics.GenericAPIView):
+    """
+    Candidates like the user `username`, by their CV, skills and interests.
+    Only accessible by company users.
+
+    ?k= results (at most SIMILAR_CANDIDATES_MAX_RESULTS) come from the
+    nearest-neighbour index built by `manage.py build_similar_candidates_index`.
+    ?probes= (SIMILAR_CANDIDATES_PROBES by default, or every list of a
+    smaller index) is how many of its lists are searched: more finds more of the truly closest candidates, fewer
+    answers faster.
+    """
+    serializer_class = CVMatchResultSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def query_int(self, name, default, maximum):
+        """?name= as an int from 1 to maximum, or None; left out, default capped at maximum."""
+        if name not in self.request.query_params:
+            # A small index has fewer lists than the default probes
+            return min(default, maximum)
+        try:
+            value = int(self.request.query_params[name])
+        except ValueError:
+            value = 0
+        return value if 1 <= value <= maximum else None
+
+    def get(self, request, *args, **kwargs):
+        if request.user.user_type != 'Company':
+            raise PermissionDenied("Only company users can look for similar candidates")
+        index = similar_candidates.get_index() if similar_candidates.SIMILAR_SUPPORT else None
+        if index is None:
+            return Response(
+                {"error": "Similar candidates are not available"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        max_results = getattr(settings, 'SIMILAR_CANDIDATES_MAX_RESULTS', 100)
+        k = self.query_int('k', 10, max_results)
+        probes = self.query_int('probes', getattr(settings, 'SIMILAR_CANDIDATES_PROBES', 8), index.lists)
+        if k is None or probes is None:
+            return Response(
+                {"error": f"k must be between 1 and {max_results} and probes between 1 and {index.lists}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        profile = get_object_or_404(
+            UserDetails.objects.only('id', 'user_id', 'cv_text'), user__username=self.kwargs['username']
+        )
+        [row] = similar_candidates.profile_rows([(profile.id, profile.user_id, profile.cv_text)])
+        vector = similar_candidates.vectorize(*row[1:])
+        # A few spare matches make up for CVs removed since the index was built
+        matches = index.search(vector, k + 10, probes, exclude=profile.id) if vector.any() else []
+        profiles = UserDetails.objects.select_related('user').only(
+            'id', 'full_name', 'location', 'cv_file', 'user__username'
+        ).exclude(cv_file__isnull=True).exclude(cv_file='').in_bulk([pk for pk, _ in matches])
+        results = []
+        for pk, score in matches:
+            candidate = profiles.get(pk)
+            if candidate is not None and len(results) < k:
+                candidate.score = score
+                results.append(candidate)
+        return Response({
+            'probes': probes,
+            'lists': index.lists,
+            'results': self.get_serializer(results, many=True).data,
+        })
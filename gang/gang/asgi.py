@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gang.settings')
 
 application = get_asgi_application()
+
+# Server processes load the similar candidates index now rather than on the first request
+from core.utils import similar_candidates  # noqa: E402
+
+similar_candidates.preload()
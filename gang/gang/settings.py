@@ -148,6 +148,68 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/blobs/ and reference
+# counted in MediaBlob (see core.utils.content_storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.utils.content_storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Extension and size rules per upload type (FileUploadView file_type, profile files).
+# Multipart bodies are cut off as soon as a file passes its limit (the strictest limit of the
+# types accepting its extension when /files/upload/ is not sent ?file_type=), or UPLOAD_MAX_SIZE
+# for files of no listed type; UPLOAD_SESSION_FILE_TYPES can also be sent as resumable
+# chunked uploads (/api/uploads/)
+UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+UPLOAD_SESSION_FILE_TYPES = ['video', 'document']
+UPLOAD_FILE_TYPES = {
+    'video': {
+        'extensions': ['.mp4', '.mov', '.avi', '.mkv', '.webm'],
+        'max_size': 100 * 1024 * 1024,
+    },
+    'document': {
+        'extensions': ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx', '.ppt', '.pptx'],
+        'max_size': 20 * 1024 * 1024,
+    },
+    'cv': {
+        'extensions': ['.pdf', '.doc', '.docx'],
+        'max_size': 10 * 1024 * 1024,
+    },
+    'profile_picture': {
+        'extensions': ['.png', '.jpg', '.jpeg', '.gif'],
+        'max_size': 5 * 1024 * 1024,
+    },
+    'background_image': {
+        'extensions': ['.png', '.jpg', '.jpeg', '.gif'],
+        'max_size': 10 * 1024 * 1024,
+    },
+}
+# Chunks are written into one file per session here until the upload is completed;
+# `manage.py expire_upload_sessions` removes sessions idle for longer than the expiry
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_STAGING_ROOT = os.path.join(BASE_DIR, 'upload_staging')
+UPLOAD_SESSION_EXPIRY_HOURS = 24
+# Sessions a user may have open (started, not completed) at once; each stages up to a full file
+UPLOAD_SESSION_MAX_OPEN = 5
+
+# Media is served by core.views.media.MediaView. Set MEDIA_SENDFILE to 'x-accel-redirect'
+# (nginx, with an internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT)
+# or 'x-sendfile' (Apache mod_xsendfile, lighttpd) to let the front-end server send the
+# bytes; without one Django streams them, with Range support. Files other than
+# content-addressed blobs are cached for MEDIA_CACHE_MAX_AGE seconds. With MEDIA_REQUIRE_AUTH
+# only signed-in users (session or JWT bearer token) get media; CVs only ever go to their
+# owner and to Company users. CV links in API responses are signed and open without a login
+# for MEDIA_SIGNED_URL_MAX_AGE seconds.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_REQUIRE_AUTH = True
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_SIGNED_URL_MAX_AGE = 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -171,6 +233,100 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Cursor pagination for post and comment lists (?page_size= is capped at the max)
+CURSOR_PAGE_SIZE = 20
+CURSOR_MAX_PAGE_SIZE = 100
+# Relevance-ranked pages (?page=) report a total_estimate; matches are counted up to this many
+RANKED_COUNT_LIMIT = 1000
+
+# Caches
+# LocMemCache is per process; with several workers use a shared backend such as
+# 'django.core.cache.backends.filebased.FileBasedCache' so feed invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gang-default',
+    }
+}
+
+# Post feed cache: the first FEED_CACHE_PAGES pages of /posts/ are cached per feed version
+FEED_CACHE_ALIAS = 'default'
+FEED_CACHE_PAGES = 3
+FEED_CACHE_TIMEOUT = 300
+
+# Personalized timelines: interests with more followers than this are merged on read
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+TIMELINE_FANOUT_BATCH_SIZE = 500
+
+# Reply levels returned under each comment (?depth= is capped at the max)
+COMMENT_THREAD_DEPTH = 5
+COMMENT_THREAD_MAX_DEPTH = 20
+
+# Soft-deleted posts and comments older than this are hard-deleted, with their images,
+# by `manage.py purge_deleted` (run it from cron); rows removed per transaction
+SOFT_DELETE_RETENTION_DAYS = 30
+PURGE_BATCH_SIZE = 200
+
+# Resized, EXIF-stripped JPEG copies of uploaded images (longest side in pixels), rendered
+# by `manage.py image_derivative_worker` from jobs queued in the database: IMAGE_DERIVATIVE_WORKERS
+# processes, each job retried up to IMAGE_DERIVATIVE_MAX_ATTEMPTS times, waiting
+# IMAGE_DERIVATIVE_RETRY_DELAY seconds (doubling) in between. A render taking longer than
+# IMAGE_DERIVATIVE_TIMEOUT seconds fails its attempt; jobs of a worker that stopped (and so no
+# longer refreshes their locks) are re-queued after twice that. `manage.py generate_image_derivatives`
+# backfills existing uploads. Set IMAGE_DERIVATIVES_ASYNC = False to render right after the upload.
+IMAGE_DERIVATIVE_SIZES = {'thumb': 160, 'feed': 720, 'full': 1600}
+IMAGE_DERIVATIVE_QUALITY = 82
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVE_TIMEOUT = 120
+IMAGE_DERIVATIVE_MAX_ATTEMPTS = 3
+IMAGE_DERIVATIVE_RETRY_DELAY = 30
+IMAGE_DERIVATIVES_ASYNC = True
+
+# CV text is extracted by `manage.py cv_extraction_worker` from jobs queued in the database:
+# CV_EXTRACTION_WORKERS jobs at a time, each killed after CV_EXTRACTION_TIMEOUT seconds and
+# retried up to CV_EXTRACTION_MAX_ATTEMPTS times, waiting CV_EXTRACTION_RETRY_DELAY seconds
+# (doubling) in between. Set CV_EXTRACTION_ASYNC = False to extract right after the upload.
+CV_EXTRACTION_ASYNC = True
+CV_EXTRACTION_WORKERS = 2
+CV_EXTRACTION_TIMEOUT = 60
+CV_EXTRACTION_MAX_ATTEMPTS = 3
+CV_EXTRACTION_RETRY_DELAY = 30
+
+# Limits of a single extraction: text stops after CV_EXTRACTION_MAX_PAGES PDF pages,
+# CV_EXTRACTION_MAX_CHARS characters or CV_EXTRACTION_TIME_LIMIT seconds (keep it below
+# CV_EXTRACTION_TIMEOUT, which kills the worker). DOCX tables and headers/footers are included
+# unless turned off. `manage.py benchmark_cv_extraction` measures throughput and memory.
+CV_EXTRACTION_MAX_PAGES = 30
+CV_EXTRACTION_MAX_CHARS = 100000
+CV_EXTRACTION_TIME_LIMIT = 20
+CV_EXTRACTION_DOCX_TABLES = True
+CV_EXTRACTION_DOCX_HEADERS = True
+
+# Extracted CVs get a MinHash signature (needs NumPy); CVs whose estimated similarity reaches
+# CV_DUPLICATE_THRESHOLD join one near-duplicate cluster, shown once in CV search.
+# `manage.py cv_duplicates` lists the clusters (--rebuild signs every CV again).
+CV_DUPLICATE_THRESHOLD = 0.8
+
+# Job description matching (/cv-match/, needs NumPy and SciPy) scores CVs against a TF-IDF
+# matrix built by `manage.py build_cv_match_index` into CV_MATCH_INDEX_DIR and memory-mapped by
+# every worker; CVs changed since are re-indexed in memory every CV_MATCH_REFRESH_SECONDS.
+# Rebuild it regularly (from cron) to recompute term weights. `manage.py benchmark_cv_match`
+# measures query latency on synthetic corpora.
+CV_MATCH_INDEX_DIR = BASE_DIR / 'cv_match_index'
+CV_MATCH_REFRESH_SECONDS = 30
+CV_MATCH_MAX_RESULTS = 100
+
+# Similar candidates (/users/<username>/similar/, needs NumPy) come from a nearest-neighbour index
+# of CV, skill and interest vectors built by `manage.py build_similar_candidates_index` (run it from
+# cron) into SIMILAR_CANDIDATES_INDEX_DIR and memory-mapped by every worker when it starts
+# (gang/wsgi.py, gang/asgi.py), and again after each rebuild. Vectors are split into
+# SIMILAR_CANDIDATES_LISTS lists (None: the square root of their number), of which a query searches
+# the ?probes= closest, SIMILAR_CANDIDATES_PROBES by default: more probes, better recall but slower.
+SIMILAR_CANDIDATES_INDEX_DIR = BASE_DIR / 'similar_candidates_index'
+SIMILAR_CANDIDATES_LISTS = None
+SIMILAR_CANDIDATES_PROBES = 8
+SIMILAR_CANDIDATES_MAX_RESULTS = 100
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
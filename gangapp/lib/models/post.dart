@@ -96,7 +96,7 @@ class Post {
       isDeleted: json['is_deleted'] as bool? ?? false,
       isLiked: json['is_liked'] as bool? ?? false,
       likesCount: json['likes_count'] as int? ?? 0,
-      commentsCount: json['comments_count'] as int? ?? commentsList.length,
+      commentsCount: json['comment_count'] as int? ?? commentsList.length,
     );
   }
 
@@ -118,7 +118,7 @@ class Post {
       'is_deleted': isDeleted,
       'is_liked': isLiked,
       'likes_count': likesCount,
-      'comments_count': commentsCount,
+      'comment_count': commentsCount,
     };
   }
 
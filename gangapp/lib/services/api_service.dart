@@ -34,6 +34,8 @@ class ApiService {
 
   // Post endpoints
   static const String postsEndpoint = '$baseUrl/posts/';
+  // Items per request from paginated lists (the API allows up to 100)
+  static const int listPageSize = 100;
   static const String userPostsEndpoint = '$baseUrl/posts/user/'; // + username
   static const String searchPostsEndpoint = '$baseUrl/posts/search/';
   static const String deletedPostsEndpoint = '$baseUrl/posts/deleted/';
@@ -55,6 +57,13 @@ class ApiService {
   static const String hardDeleteCommentEndpoint =
       '$baseUrl/comments/'; // + comment_id + /hard-delete/
 
+  // Access token for media requests, which image widgets make without awaiting
+  // getAuthToken(); the server only sends media to signed-in users
+  static String? mediaToken;
+
+  static Map<String, String>? get mediaHeaders =>
+      mediaToken == null ? null : {'Authorization': 'Bearer $mediaToken'};
+
   // Get auth token
   Future<String> getAuthToken() async {
     final prefs = await SharedPreferences.getInstance();
@@ -92,6 +101,7 @@ class ApiService {
           final data = jsonDecode(refreshResponse.body);
           final newToken = data['access'] as String;
           await prefs.setString('access_token', newToken);
+          mediaToken = newToken;
           return newToken;
         } else {
           throw Exception('Failed to refresh token. Please log in again.');
@@ -101,6 +111,7 @@ class ApiService {
       throw Exception('Authentication error: $e');
     }
 
+    mediaToken = token;
     return token;
   }
 
@@ -126,6 +137,7 @@ class ApiService {
       final prefs = await SharedPreferences.getInstance();
       await prefs.setString('access_token', data['access']);
       await prefs.setString('refresh_token', data['refresh']);
+      mediaToken = data['access'];
       await prefs.setString('username', username);
 
       // Save user_type if present in response
@@ -230,6 +242,7 @@ class ApiService {
 
     if (response.statusCode == 200 || response.statusCode == 205) {
       await prefs.remove('access_token');
+      mediaToken = null;
       await prefs.remove('refresh_token');
       return true;
     } else {
@@ -494,6 +507,7 @@ class ApiService {
         }
 
         await prefs.setString('access_token', data['access']);
+        mediaToken = data['access'];
 
         // Verify token was saved
         final savedToken = prefs.getString('access_token');
@@ -527,6 +541,7 @@ class ApiService {
             // Clear tokens if refresh failed
             final prefs = await SharedPreferences.getInstance();
             await prefs.remove('access_token');
+            mediaToken = null;
             await prefs.remove('refresh_token');
             throw Exception('Session expired. Please log in again.');
           }
@@ -538,49 +553,48 @@ class ApiService {
     }
   }
 
-  // Get all posts
-  Future<List<dynamic>> getPosts() async {
-    return _handleTokenRefresh(() async {
-      final token = await getAuthToken();
-      if (token.isEmpty) {
-        throw Exception('No authentication token found. Please log in again.');
-      }
-
+  // List endpoints answer {next, previous, results}; reads up to maxPages pages by following next
+  Future<List<dynamic>> _getPages(String url, String error, {int maxPages = 1}) async {
+    final token = await getAuthToken();
+    final results = <dynamic>[];
+    String? next = url;
+    for (var page = 0; next != null && page < maxPages; page++) {
       final response = await http.get(
-        Uri.parse(postsEndpoint),
+        Uri.parse(next),
         headers: {
           'Content-Type': 'application/json',
           'Authorization': 'Bearer $token',
         },
       );
 
-      if (response.statusCode == 200) {
-        return jsonDecode(response.body);
-      } else if (response.statusCode == 401) {
+      if (response.statusCode == 401) {
         throw Exception('Unauthorized: Invalid or expired token');
-      } else {
-        throw Exception('Failed to load posts: ${response.body}');
+      } else if (response.statusCode != 200) {
+        throw Exception('$error: ${response.body}');
+      }
+      final body = jsonDecode(response.body);
+      results.addAll(body['results']);
+      next = body['next'];
+    }
+    return results;
+  }
+
+  // Get all posts
+  Future<List<dynamic>> getPosts() async {
+    return _handleTokenRefresh(() async {
+      final token = await getAuthToken();
+      if (token.isEmpty) {
+        throw Exception('No authentication token found. Please log in again.');
       }
+
+      // Feeds show each post's comments, which the server leaves out unless expanded
+      return _getPages('$postsEndpoint?page_size=$listPageSize&expand=comments', 'Failed to load posts');
     });
   }
 
   // Get posts by username
   Future<List<dynamic>> getUserPosts(String username) async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse('$userPostsEndpoint$username/'),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
-    );
-
-    if (response.statusCode == 200) {
-      return jsonDecode(response.body);
-    } else {
-      throw Exception('Failed to load user posts: ${response.body}');
-    }
+    return _getPages('$userPostsEndpoint$username/?page_size=$listPageSize&expand=comments', 'Failed to load user posts');
   }
 
   // Get post by ID
@@ -978,23 +992,12 @@ class ApiService {
 
   // Get comments for a post
   Future<List<dynamic>> getComments(int postId) async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse('$baseUrl/posts/$postId/comments/?include_replies=true'),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
+    // Every page, so the whole discussion is shown
+    return _getPages(
+      '$baseUrl/posts/$postId/comments/?include_replies=true&page_size=$listPageSize',
+      'Failed to load comments',
+      maxPages: 50,
     );
-
-    if (response.statusCode == 200) {
-      final List<dynamic> comments = jsonDecode(response.body);
-      print('Fetched comments with replies: $comments'); // Debug print
-      return comments;
-    } else {
-      throw Exception('Failed to load comments: ${response.body}');
-    }
   }
 
   // Create comment
@@ -1294,7 +1297,9 @@ class ApiService {
 
     var request = http.MultipartRequest(
       'POST',
-      Uri.parse(fileUploadEndpoint),
+      // The type is repeated in the URL so the server knows its size limit before reading the file
+      Uri.parse(fileUploadEndpoint).replace(
+          queryParameters: fileType != null ? {'file_type': fileType} : null),
     );
 
     // Add headers
@@ -1350,7 +1355,9 @@ class ApiService {
 
     var request = http.MultipartRequest(
       'POST',
-      Uri.parse(fileUploadEndpoint),
+      // The type is repeated in the URL so the server knows its size limit before reading the file
+      Uri.parse(fileUploadEndpoint).replace(
+          queryParameters: fileType != null ? {'file_type': fileType} : null),
     );
 
     // Add headers
@@ -1397,40 +1404,12 @@ class ApiService {
 
   // Search posts
   Future<List<dynamic>> searchPosts(String query) async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse('$searchPostsEndpoint?search=$query'),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
-    );
-
-    if (response.statusCode == 200) {
-      return jsonDecode(response.body);
-    } else {
-      throw Exception('Failed to search posts: ${response.body}');
-    }
+    return _getPages('$searchPostsEndpoint?search=$query&page_size=$listPageSize', 'Failed to search posts');
   }
 
   // Get deleted posts
   Future<List<dynamic>> getDeletedPosts() async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse(deletedPostsEndpoint),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
-    );
-
-    if (response.statusCode == 200) {
-      return jsonDecode(response.body);
-    } else {
-      throw Exception('Failed to load deleted posts: ${response.body}');
-    }
+    return _getPages('$deletedPostsEndpoint?page_size=$listPageSize', 'Failed to load deleted posts');
   }
 
   // Restore a deleted post
@@ -1471,21 +1450,7 @@ class ApiService {
 
   // Get comments by user
   Future<List<dynamic>> getUserComments(String username) async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse('$userCommentsEndpoint$username/'),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
-    );
-
-    if (response.statusCode == 200) {
-      return jsonDecode(response.body);
-    } else {
-      throw Exception('Failed to load user comments: ${response.body}');
-    }
+    return _getPages('$userCommentsEndpoint$username/?page_size=$listPageSize', 'Failed to load user comments');
   }
 
   // Get a specific comment
@@ -1630,21 +1595,7 @@ class ApiService {
 
   // Get deleted comments
   Future<List<dynamic>> getDeletedComments() async {
-    final token = await getAuthToken();
-
-    final response = await http.get(
-      Uri.parse(deletedCommentsEndpoint),
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer $token',
-      },
-    );
-
-    if (response.statusCode == 200) {
-      return jsonDecode(response.body);
-    } else {
-      throw Exception('Failed to load deleted comments: ${response.body}');
-    }
+    return _getPages('$deletedCommentsEndpoint?page_size=$listPageSize', 'Failed to load deleted comments');
   }
 
   // Restore a deleted comment
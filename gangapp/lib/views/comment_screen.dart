@@ -179,6 +179,7 @@ class _CommentScreenState extends State<CommentScreen> {
           const SizedBox(height: 8),
           Image.network(
             comment.effectiveImageUrl!,
+            headers: ApiService.mediaHeaders,
             width: double.infinity,
             height: 200,
             fit: BoxFit.cover,
@@ -1,4 +1,5 @@
 import 'package:flutter/material.dart';
+import '../../services/api_service.dart';
 import 'dart:io';
 import 'package:http/http.dart' as http;
 import 'dart:convert';
@@ -670,6 +671,7 @@ class _ProfilePageState extends State<ProfilePage> {
                                                   ? Image.network(
                                                       _userDetails[
                                                           'profile_picture_url'],
+                                                      headers: ApiService.mediaHeaders,
                                                       fit: BoxFit.contain,
                                                       errorBuilder: (context,
                                                           error, stackTrace) {
@@ -1078,6 +1080,7 @@ class _ProfilePageState extends State<ProfilePage> {
                         if (imageUrl != null && imageUrl.toString().isNotEmpty)
                           Image.network(
                             imageUrl,
+                            headers: ApiService.mediaHeaders,
                             fit: BoxFit.contain,
                             errorBuilder: (context, error, stackTrace) {
                               return Container(
@@ -1156,7 +1159,7 @@ class _ProfilePageState extends State<ProfilePage> {
                                   ),
                                   const SizedBox(width: 4),
                                   Text(
-                                    '${post['comments_count'] ?? 0}',
+                                    '${post['comment_count'] ?? 0}',
                                     style: const TextStyle(
                                       color: Colors.white,
                                       fontSize: 12,
@@ -103,18 +103,24 @@ class _CVSearchDialogState extends State<CVSearchDialog> {
                               itemCount: _results.length,
                               itemBuilder: (context, index) {
                                 final profile = _results[index];
+                                final fullName = profile['full_name'] ?? '';
+                                // The snippet marks matched words with <mark> tags
+                                final snippet = (profile['snippet'] ?? '')
+                                    .replaceAll(RegExp(r'</?mark>'), '');
                                 return ListTile(
                                   leading: const Icon(Icons.description),
-                                  title:
-                                      Text(profile['user']?['username'] ?? ''),
-                                  subtitle: Text(
-                                      profile['cv_original_filename'] ?? ''),
-                                  trailing: profile['cv_file_url'] != null
+                                  title: Text(fullName.isNotEmpty
+                                      ? fullName
+                                      : profile['username'] ?? ''),
+                                  subtitle: Text(snippet.isNotEmpty
+                                      ? snippet
+                                      : profile['location'] ?? ''),
+                                  trailing: profile['cv_url'] != null
                                       ? IconButton(
                                           icon: const Icon(Icons.download),
                                           tooltip: language.get('Download cv'),
                                           onPressed: () async {
-                                            final url = profile['cv_file_url'];
+                                            final url = profile['cv_url'];
                                             if (url != null) {
                                               try {
                                                 final uri = Uri.parse(url);
@@ -365,6 +365,7 @@ class _PostCardState extends State<PostCard>
                                   borderRadius: BorderRadius.circular(12),
                                   child: Image.network(
                                     comment.effectiveImageUrl!,
+                                    headers: ApiService.mediaHeaders,
                                     fit: BoxFit.cover,
                                     height: 180,
                                     width: double.infinity,
@@ -645,6 +646,7 @@ class _PostCardState extends State<PostCard>
                           borderRadius: BorderRadius.circular(10),
                           child: Image.network(
                             reply.effectiveImageUrl!,
+                            headers: ApiService.mediaHeaders,
                             fit: BoxFit.cover,
                             height: 120,
                             width: double.infinity,
@@ -709,8 +711,9 @@ class _PostCardState extends State<PostCard>
           child: CircleAvatar(
             backgroundColor: Colors.transparent,
             radius: isReply ? 14 : 18,
-            backgroundImage:
-                profileImage != null ? NetworkImage(profileImage) : null,
+            backgroundImage: profileImage != null
+                ? NetworkImage(profileImage, headers: ApiService.mediaHeaders)
+                : null,
             child: profileImage == null
                 ? Text(
                     username.isNotEmpty ? username[0].toUpperCase() : '?',
@@ -850,6 +853,7 @@ class _PostCardState extends State<PostCard>
               borderRadius: BorderRadius.circular(12),
               child: Image.network(
                 widget.post.effectiveImageUrl!,
+                headers: ApiService.mediaHeaders,
                 fit: BoxFit.contain,
                 errorBuilder: (context, error, stackTrace) {
                   return Container(
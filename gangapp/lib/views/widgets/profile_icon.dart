@@ -1,4 +1,5 @@
 import 'package:flutter/material.dart';
+import '../../services/api_service.dart';
 
 /// Widget for displaying a user's profile icon
 class ProfileIcon extends StatelessWidget {
@@ -39,6 +40,7 @@ class ProfileIcon extends StatelessWidget {
       return ClipOval(
         child: Image.network(
           imageUrl!,
+          headers: ApiService.mediaHeaders,
           width: size,
           height: size,
           fit: BoxFit.cover,
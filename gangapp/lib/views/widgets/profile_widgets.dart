@@ -1,4 +1,5 @@
 import 'package:flutter/material.dart';
+import '../../services/api_service.dart';
 import 'package:google_fonts/google_fonts.dart';
 import 'package:transparent_image/transparent_image.dart';
 import 'package:flutter/foundation.dart' show kIsWeb;
@@ -260,6 +261,7 @@ class ProfileWidgets {
       return ClipOval(
         child: Image.network(
           profilePictureUrl,
+          headers: ApiService.mediaHeaders,
           width: size,
           height: size,
           fit: BoxFit.cover,
@@ -297,6 +299,7 @@ class ProfileWidgets {
                 ? ClipOval(
                     child: Image.network(
                       profilePictureUrl,
+                      headers: ApiService.mediaHeaders,
                       width: 100,
                       height: 100,
                       fit: BoxFit.cover,
@@ -358,6 +361,7 @@ class ProfileWidgets {
           else if (backgroundImageUrl != null && backgroundImageUrl.isNotEmpty)
             Image.network(
               backgroundImageUrl,
+              headers: ApiService.mediaHeaders,
               fit: BoxFit.cover,
               alignment: Alignment.center,
               errorBuilder: (context, error, stackTrace) {